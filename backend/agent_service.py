@@ -4,7 +4,7 @@ Advanced Agentic Chat Service
 Multi-step mental-health support agent with:
   • Semantic intent classification (zero-shot via LLM)
   • Dynamic tool orchestration with dependency resolution
-  • Sliding-window + summary-compressed conversation memory
+  • Sliding-window conversation memory plus the session's persisted summary
   • Crisis escalation ladder with configurable thresholds
   • Structured chain-of-thought reasoning before response
   • Retry / fallback across Gemini model variants
@@ -18,19 +18,25 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
+import threading
 import time
 import uuid
-from dataclasses import dataclass, field, asdict
-from datetime import datetime, timezone
+from dataclasses import dataclass, field, asdict, replace
+from datetime import datetime, timedelta, timezone
 from enum import Enum, auto
 from functools import wraps
-from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Set, Tuple
 
 import google.generativeai as genai
 from google.generativeai.types import GenerateContentResponse
 
+from cache import TTLCache, normalize_cache_key
 from config import Config
+from crisis_matcher import CrisisMatcher, CrisisScan
+from deadline import Deadline, deadline_of, output_token_cap, with_deadline
 from gemini_service import gemini_service
+from llm import MODEL_FALLBACK_CHAIN, ErrorKind, RetryPolicy, classify_error, llm_client
+from observability.metrics import metrics
 
 # ─────────────────────────────────────────────
 # Logging
@@ -39,6 +45,12 @@ logger = logging.getLogger(__name__)
 _TRACE = 5  # custom TRACE level below DEBUG
 logging.addLevelName(_TRACE, "TRACE")
 
+# genai.configure swaps the process-wide client, so it runs once per API key,
+# not for every (per-session or sessionless) AgenticChatService
+_UNCONFIGURED = object()
+_configured_key: Any = _UNCONFIGURED
+_configure_lock = threading.Lock()
+
 
 def _trace(msg: str, *args: Any) -> None:  # noqa: D401
     logger.log(_TRACE, msg, *args)
@@ -76,6 +88,21 @@ def _extract_gemini_text(resp: Any) -> str:
     return ""
 
 
+def _chunk_text(chunk: Any) -> str:
+    """Text delta of one streamed chunk; unlike `_extract_gemini_text`, whitespace is kept."""
+    try:
+        return chunk.text or ""
+    except Exception:
+        pass
+    try:
+        cands = getattr(chunk, "candidates", None) or []
+        parts = getattr(getattr(cands[0], "content", None), "parts", None) if cands else None
+        return "".join(getattr(p, "text", "") or "" for p in (parts or []))
+    except Exception as exc:
+        logger.debug("Gemini stream chunk parse failed: %s", exc)
+    return ""
+
+
 def _is_degraded_agent_text(text: Optional[str]) -> bool:
     """True if the model returned an error/boilerplate reply instead of real support."""
     if not text or not str(text).strip():
@@ -125,19 +152,10 @@ class ToolID(str, Enum):
     GRIEF_RITUAL    = "grief_ritual"
 
 
-_MODEL_FALLBACK_CHAIN: Tuple[str, ...] = (
-    "gemini-2.5-flash",
-    "gemini-2.0-flash",
-    "gemini-pro-latest",
-    "gemini-pro",
-)
+_MODEL_FALLBACK_CHAIN: Tuple[str, ...] = MODEL_FALLBACK_CHAIN
 
 _MAX_HISTORY_WINDOW      = 12   # turns kept verbatim
-_SUMMARY_TRIGGER         = 20   # turns before compressing older ones
-_INTENT_CACHE_SECONDS    = 120  # TTL for cached intent classifications
-_GENERATION_TIMEOUT      = 18.0 # seconds
-_MAX_RETRIES             = 3
-_RETRY_BACKOFF_BASE      = 0.6  # seconds
+_GENERATION_TIMEOUT      = Config.LLM_CALL_TIMEOUT_SECONDS  # per attempt; retries share LLM_RETRY_BUDGET_SECONDS
 
 
 # ─────────────────────────────────────────────
@@ -200,6 +218,17 @@ class AgentResponse:
         return asdict(self)
 
 
+@dataclass
+class _TurnPlan:
+    """Everything decided before generation; shared by the one-shot and streaming paths."""
+    user_input: str
+    crisis_level: CrisisLevel
+    intent: Intent
+    tools: List[ToolResult]
+    reasoning: str
+    prompt: str
+
+
 # ─────────────────────────────────────────────
 # Tool Registry
 # ─────────────────────────────────────────────
@@ -360,6 +389,36 @@ _INTENT_TOOL_MAP: Dict[Intent, List[Callable[[], ToolResult]]] = {
     Intent.GENERAL:      [ToolRegistry.breathing],
 }
 
+_TOOL_FACTORIES: Dict[ToolID, Callable[..., ToolResult]] = {
+    ToolID.BREATHING:         ToolRegistry.breathing,
+    ToolID.GROUNDING:         ToolRegistry.grounding,
+    ToolID.PMR:               ToolRegistry.pmr,
+    ToolID.JOURNAL_PROMPT:    ToolRegistry.journal_prompt,
+    ToolID.COGNITIVE_REFRAME: ToolRegistry.cognitive_reframe,
+    ToolID.SAFETY_PLAN:       ToolRegistry.safety_plan,
+    ToolID.CRISIS_HOTLINES:   ToolRegistry.crisis_hotlines,
+    ToolID.SLEEP_HYGIENE:     ToolRegistry.sleep_hygiene,
+    ToolID.GRIEF_RITUAL:      ToolRegistry.grief_ritual,
+}
+_CRISIS_ONLY_TOOLS = frozenset({ToolID.SAFETY_PLAN, ToolID.CRISIS_HOTLINES})
+_MAX_PLANNED_TOOLS = 3
+# Stream events a client must see at most once per turn
+_ONCE_PER_TURN_EVENTS = frozenset({"triage", "intent"})
+
+# Structured-output schema for the combined planning call (Gemini response_schema)
+_TURN_PLAN_SCHEMA: Dict[str, Any] = {
+    "type": "OBJECT",
+    "properties": {
+        "intent": {"type": "STRING", "enum": [i.value for i in Intent]},
+        "reasoning": {"type": "STRING"},
+        "tool_hints": {
+            "type": "ARRAY",
+            "items": {"type": "STRING", "enum": [t.value for t in ToolID]},
+        },
+    },
+    "required": ["intent", "reasoning"],
+}
+
 _CRISIS_LEVEL_KEYWORDS: Dict[CrisisLevel, List[str]] = {
     CrisisLevel.IMMINENT: [
         "going to kill myself", "about to end it", "have a gun", "have pills ready",
@@ -379,16 +438,18 @@ _CRISIS_LEVEL_KEYWORDS: Dict[CrisisLevel, List[str]] = {
     ],
 }
 
+# Built once at import: one pass per message, independent of lexicon size
+_CRISIS_MATCHER = CrisisMatcher(_CRISIS_LEVEL_KEYWORDS)
+
+
+def scan_crisis_text(text: str) -> CrisisScan:
+    """Highest crisis level plus every matched phrase span (offsets into `text`)."""
+    return _CRISIS_MATCHER.scan(text or "")
+
 
 def assess_crisis_text(text: str) -> int:
     """Return crisis level 0 (none) through 4 (imminent) for LangGraph / guardrails."""
-    lower = (text or "").lower()
-    for level in sorted(CrisisLevel, reverse=True):
-        if level == CrisisLevel.NONE:
-            continue
-        if any(kw in lower for kw in _CRISIS_LEVEL_KEYWORDS.get(level, [])):
-            return int(level)
-    return 0
+    return _CRISIS_MATCHER.level(text or "")
 
 
 # ─────────────────────────────────────────────
@@ -413,37 +474,35 @@ def _with_span(name: str):
 # ─────────────────────────────────────────────
 class ConversationMemory:
     """
-    Sliding-window memory with LLM-powered compression for long conversations.
+    Sliding-window memory for one conversation.
 
-    Keeps the last `window_size` turns verbatim.  When total turns exceed
-    `summary_trigger`, older turns are summarised by a lightweight LLM call
-    and stored as a single "summary" pseudo-turn.
+    Keeps the last `window_size` turns verbatim, rendered below the session's
+    running summary. The summary itself is maintained outside the agent: the
+    server folds turns evicted from the stored window into the session's
+    `memory_summary` (see `asummarize_evicted`) and it is loaded on hydration.
     """
 
-    def __init__(
-        self,
-        window_size: int = _MAX_HISTORY_WINDOW,
-        summary_trigger: int = _SUMMARY_TRIGGER,
-    ) -> None:
+    def __init__(self, window_size: int = _MAX_HISTORY_WINDOW) -> None:
         self._turns: List[Turn] = []
         self._summary: str = ""
         self._window_size = window_size
-        self._summary_trigger = summary_trigger
 
     def add(self, turn: Turn) -> None:
         self._turns.append(turn)
 
-    def recent_turns(self) -> List[Turn]:
-        return self._turns[-self._window_size:]
+    def load(self, turns: Optional[Sequence[Turn]] = None, summary: Optional[str] = None) -> None:
+        """Replace verbatim turns and/or the summary with authoritative stored state."""
+        if turns is not None:
+            self._turns = list(turns)
+        if summary is not None:
+            self._summary = summary
 
-    def needs_compression(self) -> bool:
-        return len(self._turns) > self._summary_trigger
+    @property
+    def summary(self) -> str:
+        return self._summary
 
-    def compress(self, summary: str) -> None:
-        """Replace old turns with a summary, keeping recent window intact."""
-        keep = self._turns[-self._window_size:]
-        self._turns = keep
-        self._summary = summary
+    def recent_turns(self) -> List[Turn]:
+        return self._turns[-self._window_size:]
 
     def render(self) -> str:
         lines: List[str] = []
@@ -455,6 +514,82 @@ class ConversationMemory:
         return "\n".join(lines) if lines else "This is the start of the session."
 
 
+# ─────────────────────────────────────────────
+# Intent Cache
+# ─────────────────────────────────────────────
+class IntentCache:
+    """
+    Process-wide intent classification cache shared by every agent instance.
+
+    Keys are normalized text (case/punctuation/whitespace-insensitive). The
+    local tier is a bounded LRU with TTL; with backend="mongo" a TTL-indexed
+    `intent_cache` collection is consulted on a local miss so all workers
+    share classifications. Counters: intent_cache.{hit,miss,evicted,expired}
+    (local) and intent_cache.shared_{hit,miss,error}.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = Config.INTENT_CACHE_SIZE,
+        ttl: float = Config.INTENT_CACHE_TTL_SECONDS,
+        backend: str = Config.INTENT_CACHE_BACKEND,
+    ) -> None:
+        self._local = TTLCache(maxsize=maxsize, ttl=ttl, name="intent_cache")
+        self._ttl = ttl
+        self._shared = backend == "mongo"
+
+    async def aget(self, text: str) -> Optional[Intent]:
+        key = normalize_cache_key(text)
+        if not key:
+            return None
+        hit = self._local.get(key)
+        if hit is not None or not self._shared:
+            return hit
+        try:
+            from database import db
+
+            col = await db.aget_collection("intent_cache")
+            doc = await col.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+        except Exception as exc:
+            metrics.incr("intent_cache.shared_error")
+            logger.debug("Shared intent cache read failed: %s", exc)
+            return None
+        raw = (doc or {}).get("intent")
+        if raw not in Intent._value2member_map_:
+            metrics.incr("intent_cache.shared_miss")
+            return None
+        metrics.incr("intent_cache.shared_hit")
+        intent = Intent(raw)
+        self._local.set(key, intent)
+        return intent
+
+    async def aset(self, text: str, intent: Intent) -> None:
+        key = normalize_cache_key(text)
+        if not key:
+            return
+        self._local.set(key, intent)
+        if not self._shared:
+            return
+        try:
+            from database import db
+
+            col = await db.aget_collection("intent_cache")
+            await col.update_one(
+                {"_id": key},
+                {"$set": {
+                    "intent": intent.value,
+                    "expires_at": datetime.utcnow() + timedelta(seconds=self._ttl),
+                }},
+                upsert=True,
+            )
+        except Exception as exc:
+            metrics.incr("intent_cache.shared_error")
+            logger.debug("Shared intent cache write failed: %s", exc)
+
+
+intent_cache = IntentCache()
+
+
 # ─────────────────────────────────────────────
 # Main Service
 # ─────────────────────────────────────────────
@@ -468,7 +603,7 @@ class AgenticChatService:
       3. Tool planning   — intent → tool map + crisis overrides
       4. CoT reasoning   — structured chain-of-thought plan
       5. Response gen    — grounded generation with tool context
-      6. Memory update   — sliding window + async compression
+      6. Memory update   — sliding window (summary persisted by the server)
     """
 
     def __init__(self, session_id: Optional[str] = None) -> None:
@@ -476,67 +611,81 @@ class AgenticChatService:
         self._api_key   = Config.GEMINI_API_KEY
         self._model_name = Config.GEMINI_MODEL_NAME
         self._memory    = ConversationMemory()
-        self._model_cache: Optional[genai.GenerativeModel] = None
         self._active_model_name: Optional[str] = None
-        self._intent_cache: Dict[str, Tuple[Intent, float]] = {}  # text → (intent, ts)
         self._spans: List[AgentSpan] = []
+        self._turn_lock: Optional[asyncio.Lock] = None
+        self._deadline: Optional[Deadline] = None  # current turn's (from extra_context)
         self._configure()
 
     # ── Setup ───────────────────────────────────────────────────────────────
 
     def _configure(self) -> None:
-        if not self._api_key:
-            logger.warning("GEMINI_API_KEY not set — agent will use fallback responses.")
-            return
-        try:
-            genai.configure(api_key=self._api_key)
-        except Exception as exc:
-            logger.error("Gemini configuration failed: %s", exc)
+        global _configured_key
+        with _configure_lock:
+            if _configured_key == self._api_key:
+                return
+            if not self._api_key:
+                logger.warning("GEMINI_API_KEY not set — agent will use fallback responses.")
+                _configured_key = self._api_key
+                return
+            try:
+                genai.configure(api_key=self._api_key)
+                _configured_key = self._api_key
+            except Exception as exc:
+                logger.error("Gemini configuration failed: %s", exc)
 
     def _get_model(self) -> Optional[genai.GenerativeModel]:
-        if self._model_cache:
-            return self._model_cache
+        # Shared handle for the first model in the chain that is neither missing nor circuit-open
+        picked = llm_client.resolve(self._model_name)
+        if picked is None:
+            logger.error("All model candidates are unavailable.")
+            return None
+        self._active_model_name, model = picked
+        return model
 
-        candidates = (
-            [self._model_name] + list(_MODEL_FALLBACK_CHAIN)
-            if self._model_name and self._model_name not in _MODEL_FALLBACK_CHAIN
-            else list(_MODEL_FALLBACK_CHAIN)
-        )
+    def _optional_budget(self, reserve: Optional[float] = None) -> Optional[float]:
+        """
+        Timeout for an optional LLM stage under the turn's deadline, keeping
+        `reserve` (default: the reply's share) for later stages. None when the
+        turn has no deadline; 0.0 means skip the stage.
+        """
+        if self._deadline is None:
+            return None
+        if reserve is None:
+            reserve = Config.DEADLINE_RESPONSE_RESERVE_SECONDS
+        return self._deadline.optional_budget(reserve=reserve)
 
-        for name in candidates:
-            try:
-                model = genai.GenerativeModel(name)
-                self._model_cache = model
-                self._active_model_name = name
-                _trace("Model loaded: %s", name)
-                return model
-            except Exception:
-                continue
-
-        logger.error("All model candidates failed to load.")
-        return None
+    def _deadline_tags(self) -> Dict[str, Any]:
+        if self._deadline is None:
+            return {}
+        return {"deadline_left_ms": round(self._deadline.remaining() * 1000, 1)}
+
+    def _reply_limits(self) -> Tuple[float, bool, Optional[RetryPolicy], Optional[Dict[str, Any]]]:
+        """
+        (per-attempt timeout, whether the deadline shortened it, retry policy,
+        generation_config) for the reply under the deadline.
+        """
+        if self._deadline is None:
+            return _GENERATION_TIMEOUT, False, None, None
+        # The reply is never skipped: it gets at least DEADLINE_MIN_STAGE_SECONDS
+        left = max(self._deadline.remaining(), Config.DEADLINE_MIN_STAGE_SECONDS)
+        policy = replace(RetryPolicy(), budget_s=min(Config.LLM_RETRY_BUDGET_SECONDS, left))
+        cap = output_token_cap(self._deadline)
+        config = {"max_output_tokens": cap} if cap else None
+        return min(_GENERATION_TIMEOUT, left), left < _GENERATION_TIMEOUT, policy, config
 
     # ── Crisis Detection ─────────────────────────────────────────────────────
 
     def _assess_crisis_level(self, text: str) -> CrisisLevel:
-        lower = text.lower()
-        for level in sorted(CrisisLevel, reverse=True):
-            if level == CrisisLevel.NONE:
-                continue
-            if any(kw in lower for kw in _CRISIS_LEVEL_KEYWORDS.get(level, [])):
-                return level
-        return CrisisLevel.NONE
+        return CrisisLevel(assess_crisis_text(text))
 
     # ── Intent Classification ────────────────────────────────────────────────
 
     async def _classify_intent(self, user_input: str) -> Intent:
-        # Check cache
-        cached = self._intent_cache.get(user_input)
-        if cached:
-            intent, ts = cached
-            if time.monotonic() - ts < _INTENT_CACHE_SECONDS:
-                _trace("Intent cache hit: %s", intent)
-                return intent
+        cached = await intent_cache.aget(user_input)
+        if cached is not None:
+            _trace("Intent cache hit: %s", cached)
+            return cached
 
         model = self._get_model()
         if not model:
@@ -548,14 +697,16 @@ class AgenticChatService:
             "Respond with ONLY the label word, nothing else.\n\n"
             f"Message: {user_input[:400]}"
         )
+        budget = self._optional_budget()
+        if budget == 0.0:
+            return Intent.GENERAL
         try:
-            loop = asyncio.get_running_loop()
-            resp: GenerateContentResponse = await loop.run_in_executor(
-                None, lambda: model.generate_content(prompt)
+            resp: GenerateContentResponse = await llm_client.generate(
+                "intent", model, prompt, timeout=budget, deadline_bound=budget is not None
             )
             raw = _extract_gemini_text(resp).lower()
             intent = Intent(raw) if raw in Intent._value2member_map_ else Intent.GENERAL
-            self._intent_cache[user_input] = (intent, time.monotonic())
+            await intent_cache.aset(user_input, intent)
             return intent
         except Exception as exc:
             logger.warning("Intent classification failed (%s); defaulting to GENERAL.", exc)
@@ -568,6 +719,7 @@ class AgenticChatService:
         intent: Intent,
         crisis_level: CrisisLevel,
         user_input: str,
+        tool_hints: Sequence[ToolID] = (),
     ) -> List[ToolResult]:
         if crisis_level >= CrisisLevel.HIGH:
             tools = [
@@ -599,10 +751,86 @@ class AgenticChatService:
                         tools.append(factory())
                 except Exception as exc:
                     logger.warning("Tool factory %s failed: %s", factory, exc)
+            # Model-suggested extras (non-crisis only; crisis sets are fixed)
+            have = {t.tool_id for t in tools}
+            for hint in tool_hints:
+                if len(tools) >= _MAX_PLANNED_TOOLS:
+                    break
+                factory = _TOOL_FACTORIES.get(hint)
+                if factory is None or hint in have or hint in _CRISIS_ONLY_TOOLS:
+                    continue
+                tools.append(factory(user_input) if hint is ToolID.JOURNAL_PROMPT else factory())
+                have.add(hint)
 
         _trace("Planned %d tool(s) for intent=%s crisis=%s", len(tools), intent, crisis_level)
         return tools
 
+    # ── Combined Planning ────────────────────────────────────────────────────
+
+    async def _plan_turn(
+        self,
+        user_input: str,
+        crisis_level: CrisisLevel,
+        context: str,
+    ) -> Optional[Tuple[Intent, str, List[ToolID]]]:
+        """
+        One structured-output call replacing `_classify_intent` + `_chain_of_thought`.
+        Returns (intent, reasoning, tool_hints), or None so the caller falls back
+        to the two-call path.
+        """
+        model = self._get_model()
+        budget = self._optional_budget()
+        if not model or budget == 0.0:
+            return None
+
+        prompt = (
+            "You are SeraNova's internal planning engine. Return ONE JSON object.\n"
+            "intent: EXACTLY ONE of anxiety, depression, stress, grief, relationship, "
+            "self_esteem, sleep, crisis, general — the user's main mental health concern.\n"
+            "reasoning: answer in ≤3 sentences each (internal, not for the user):\n"
+            "  Q1: What is the user's core emotional need right now?\n"
+            "  Q2: What ONE thing could most help them in the next 10 minutes?\n"
+            "  Q3: What should SeraNova avoid saying to not make things worse?\n"
+            "tool_hints: 0–2 support tools that would fit best, from: "
+            f"{', '.join(t.value for t in ToolID)}.\n\n"
+            f"Crisis level (keyword triage): {crisis_level.value}\n"
+            f"Context:\n{context}\n\n"
+            f"User message: {user_input}"
+        )
+        try:
+            resp = await llm_client.generate(
+                "plan",
+                model,
+                prompt,
+                generation_config={
+                    "response_mime_type": "application/json",
+                    "response_schema": _TURN_PLAN_SCHEMA,
+                },
+                timeout=budget,
+                deadline_bound=budget is not None,
+            )
+            data = json.loads(_extract_gemini_text(resp) or "{}")
+        except Exception as exc:
+            logger.warning("Combined planning failed (%s); using split intent + CoT.", exc)
+            return None
+        if not isinstance(data, dict):
+            return None
+
+        raw_intent = str(data.get("intent", "")).strip().lower()
+        if raw_intent not in Intent._value2member_map_:
+            return None
+        intent = Intent(raw_intent)
+        if crisis_level >= CrisisLevel.MODERATE:
+            intent = Intent.CRISIS
+        else:
+            await intent_cache.aset(user_input, intent)
+        reasoning = str(data.get("reasoning") or "").strip()[:600] or "Reasoning unavailable."
+        hints = [
+            ToolID(h) for h in (data.get("tool_hints") or [])
+            if isinstance(h, str) and h in ToolID._value2member_map_
+        ]
+        return intent, reasoning, hints
+
     # ── Chain-of-Thought Reasoning ───────────────────────────────────────────
 
     async def _chain_of_thought(
@@ -631,43 +859,72 @@ class AgenticChatService:
             f"User message: {user_input}\n\n"
             "Reasoning (internal, not for user):"
         )
+        budget = self._optional_budget()
+        if budget == 0.0:
+            return "Reasoning skipped (time budget)."
         try:
-            loop = asyncio.get_running_loop()
-            resp = await loop.run_in_executor(None, lambda: model.generate_content(prompt))
+            resp = await llm_client.generate(
+                "reasoning", model, prompt, timeout=budget, deadline_bound=budget is not None
+            )
             return _extract_gemini_text(resp)[:600]
         except Exception as exc:
             logger.warning("CoT reasoning failed: %s", exc)
             return "Reasoning unavailable."
 
-    # ── Memory Compression ───────────────────────────────────────────────────
+    # ── Session Summary ──────────────────────────────────────────────────────
 
-    async def _maybe_compress_memory(self) -> None:
-        if not self._memory.needs_compression():
-            return
+    async def asummarize_evicted(
+        self,
+        previous_summary: str,
+        evicted: Sequence[Dict[str, Any]],
+    ) -> str:
+        """
+        Fold message/response pairs that left a session's stored window into
+        its running summary. Only the new pairs are sent, never the whole
+        conversation; returns "" if no model is available or the call fails.
+        """
         model = self._get_model()
-        if not model:
-            return
-
-        turns_text = self._memory.render()
+        if not model or not evicted:
+            return ""
+        lines: List[str] = []
+        for item in evicted:
+            if item.get("message"):
+                lines.append(f"User: {item['message']}")
+            if item.get("response"):
+                lines.append(f"SeraNova: {item['response']}")
         prompt = (
-            "Summarise the following therapy-style conversation in 4–6 bullet points.\n"
+            "Update the running summary of a therapy-style conversation.\n"
+            "Merge the newer exchanges into it; keep 4–6 bullet points overall.\n"
             "Focus on: emotional themes, progress, key disclosures, and tools used.\n"
             "Be compassionate and specific. Use 'The user…' and 'SeraNova…'.\n\n"
-            f"{turns_text}"
+            f"Summary so far:\n{previous_summary or '(none yet)'}\n\n"
+            "Newer exchanges:\n" + "\n".join(lines)
         )
         try:
-            loop = asyncio.get_running_loop()
-            resp = await loop.run_in_executor(None, lambda: model.generate_content(prompt))
-            summary = _extract_gemini_text(resp)
-            if summary:
-                self._memory.compress(summary)
-                logger.info("Memory compressed for session %s.", self.session_id)
+            resp = await llm_client.generate("summary", model, prompt)
+            return _extract_gemini_text(resp)[:2000]
         except Exception as exc:
-            logger.warning("Memory compression failed: %s", exc)
+            logger.warning("Summary update failed: %s", exc)
+            return ""
 
     # ── Response Generation ──────────────────────────────────────────────────
 
-    async def _generate_response(
+    _NO_KEY_REPLY = (
+        "I'm here with you. The AI backbone isn't fully initialised right now, "
+        "but you matter, and what you're feeling is real. "
+        "Take one slow breath with me, then tell me what feels heaviest."
+    )
+    _NO_MODEL_REPLY = (
+        "I'm having trouble reaching my response engine. "
+        "Please try again in a moment — I haven't gone anywhere."
+    )
+    _EXHAUSTED_REPLY = (
+        "Thank you for trusting me with this. I'm having a technical difficulty "
+        "right now, but you deserve support. Please take three slow breaths "
+        "and reach out to someone you trust — I'll be back shortly."
+    )
+
+    def _build_response_prompt(
         self,
         user_input: str,
         context: str,
@@ -677,25 +934,7 @@ class AgenticChatService:
         intent: Intent,
         retrieval_context: str = "",
         crew_notes: str = "",
-    ) -> Tuple[str, str]:
-        """Returns (response_text, model_name_used)."""
-
-        if not self._api_key:
-            return (
-                "I'm here with you. The AI backbone isn't fully initialised right now, "
-                "but you matter, and what you're feeling is real. "
-                "Take one slow breath with me, then tell me what feels heaviest.",
-                "fallback",
-            )
-
-        model = self._get_model()
-        if not model:
-            return (
-                "I'm having trouble reaching my response engine. "
-                "Please try again in a moment — I haven't gone anywhere.",
-                "error",
-            )
-
+    ) -> str:
         tools_text = json.dumps(
             [t.to_dict() for t in tools], ensure_ascii=False, indent=2
         )
@@ -733,7 +972,7 @@ class AgenticChatService:
                 f"{crew_notes.strip()}\n\n"
             )
 
-        prompt = (
+        return (
             f"{system_persona}"
             f"{crisis_instruction}"
             f"{rag_block}{crew_block}"
@@ -752,37 +991,73 @@ class AgenticChatService:
             "SeraNova:"
         )
 
-        last_exc: Optional[Exception] = None
-        for attempt in range(1, _MAX_RETRIES + 1):
-            try:
-                loop = asyncio.get_running_loop()
-                resp: GenerateContentResponse = await asyncio.wait_for(
-                    loop.run_in_executor(None, lambda: model.generate_content(prompt)),
-                    timeout=_GENERATION_TIMEOUT,
-                )
-                text = _extract_gemini_text(resp)
-                if not text:
-                    raise ValueError("Empty model response on attempt %d" % attempt)
-                return text, self._active_model_name or "unknown"
-            except Exception as exc:
-                last_exc = exc
-                wait = _RETRY_BACKOFF_BASE * (2 ** (attempt - 1))
-                logger.warning(
-                    "Generation attempt %d/%d failed (%s); retrying in %.1f s",
-                    attempt, _MAX_RETRIES, exc, wait,
-                )
-                await asyncio.sleep(wait)
-                # Invalidate model cache to force re-selection on next attempt
-                if attempt < _MAX_RETRIES:
-                    self._model_cache = None
+    async def _generate_response(self, prompt: str) -> Tuple[str, str]:
+        """Returns (response_text, model_name_used)."""
 
-        logger.error("All generation attempts exhausted. Last error: %s", last_exc)
-        return (
-            "Thank you for trusting me with this. I'm having a technical difficulty "
-            "right now, but you deserve support. Please take three slow breaths "
-            "and reach out to someone you trust — I'll be back shortly.",
-            "error",
-        )
+        if not self._api_key:
+            return self._NO_KEY_REPLY, "fallback"
+
+        if self._get_model() is None:
+            return self._NO_MODEL_REPLY, "error"
+
+        timeout, deadline_bound, policy, generation_config = self._reply_limits()
+        try:
+            # Classified, budgeted retries; models behind an open breaker are skipped
+            resp, name = await llm_client.generate_resilient(
+                "response",
+                prompt,
+                preferred=self._model_name,
+                generation_config=generation_config,
+                timeout=timeout,
+                deadline_bound=deadline_bound,
+                policy=policy,
+            )
+        except Exception as exc:
+            logger.error("Generation failed (%s): %s", classify_error(exc).value, exc)
+            return self._EXHAUSTED_REPLY, "error"
+        text = _extract_gemini_text(resp)
+        if not text:
+            logger.warning("Empty response from %s (blocked or no candidates)", name)
+            return self._EXHAUSTED_REPLY, "error"
+        self._active_model_name = name
+        return text, name
+
+    async def _stream_response(self, prompt: str) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Yield (text_delta, model_name) as Gemini produces them.
+        Falls back to one-shot `_generate_response` (with retries) if streaming
+        fails before the first token; a mid-stream failure ends the stream with
+        whatever text was already delivered.
+        """
+        model = self._get_model() if self._api_key else None
+        if model is None:
+            text, model_used = await self._generate_response(prompt)
+            yield text, model_used
+            return
+
+        emitted = False
+        try:
+            timeout, deadline_bound, _, generation_config = self._reply_limits()
+            stream = llm_client.stream(
+                "response", model, prompt, generation_config=generation_config,
+                timeout=timeout, deadline_bound=deadline_bound,
+            )
+            async for chunk in stream:
+                delta = _chunk_text(chunk)
+                if delta:
+                    emitted = True
+                    yield delta, self._active_model_name or "unknown"
+        except Exception as exc:
+            logger.warning("Streaming generation failed (%s); emitted=%s", exc, emitted)
+            if emitted:
+                return
+            if classify_error(exc) is ErrorKind.FATAL:
+                # The request itself was rejected (e.g. safety block): a one-shot retry would be too
+                yield self._EXHAUSTED_REPLY, "error"
+                return
+        if not emitted:
+            text, model_used = await self._generate_response(prompt)
+            yield text, model_used
 
     # ── Confidence Scoring ───────────────────────────────────────────────────
 
@@ -803,59 +1078,59 @@ class AgenticChatService:
 
     # ── Public API ───────────────────────────────────────────────────────────
 
-    async def agenerate(
+    async def _prepare_turn(
         self,
         user_input: str,
         extra_context: Optional[Dict[str, Any]] = None,
-    ) -> AgentResponse:
-        """
-        Primary async entry point.
-
-        Steps:
-          1. Crisis triage
-          2. Async intent classification
-          3. Tool planning
-          4. CoT reasoning
-          5. Response generation (with retry)
-          6. Memory update + async compression
-          7. Observability packaging
-        """
+    ) -> _TurnPlan:
+        """Steps 1–4: triage, context, planning (intent + reasoning) and tools (spans recorded)."""
         self._spans = []  # reset per call
+        self._deadline = deadline_of(extra_context)
 
         # 1. Crisis triage
         s1 = AgentSpan(name="crisis_triage")
-        crisis_level = self._assess_crisis_level(user_input)
-        s1.finish(crisis_level=crisis_level.value)
+        scan = scan_crisis_text(user_input)
+        crisis_level = CrisisLevel(scan.level)
+        s1.finish(crisis_level=crisis_level.value, matched=scan.phrases)
         self._spans.append(s1)
 
-        # 2. Intent classification (skip if crisis — always crisis intent)
-        s2 = AgentSpan(name="intent_classification")
-        if crisis_level >= CrisisLevel.MODERATE:
-            intent = Intent.CRISIS
-        else:
-            intent = await self._classify_intent(user_input)
-        s2.finish(intent=intent.value)
-        self._spans.append(s2)
+        # 2. Context rendering
+        context_text = self._memory.render()
 
-        # 3. Tool planning
+        # 3. Planning: one structured call, or intent + CoT as separate calls
+        turn_plan: Optional[Tuple[Intent, str, List[ToolID]]] = None
+        if Config.AGENT_PLANNING_MODE == "combined":
+            sp = AgentSpan(name="turn_plan")
+            turn_plan = await self._plan_turn(user_input, crisis_level, context_text)
+            sp.finish(ok=turn_plan is not None)
+            self._spans.append(sp)
+
+        tool_hints: List[ToolID] = []
+        if turn_plan is not None:
+            intent, reasoning, tool_hints = turn_plan
+        else:
+            # Intent classification (skip if crisis — always crisis intent)
+            s2 = AgentSpan(name="intent_classification")
+            if crisis_level >= CrisisLevel.MODERATE:
+                intent = Intent.CRISIS
+            else:
+                intent = await self._classify_intent(user_input)
+            s2.finish(intent=intent.value)
+            self._spans.append(s2)
+
+            s4 = AgentSpan(name="chain_of_thought")
+            reasoning = await self._chain_of_thought(user_input, intent, crisis_level, context_text)
+            s4.finish()
+            self._spans.append(s4)
+
+        # 4. Tool planning
         s3 = AgentSpan(name="tool_planning")
-        tools = self._plan_tools(intent, crisis_level, user_input)
+        tools = self._plan_tools(intent, crisis_level, user_input, tool_hints)
         s3.finish(tool_count=len(tools))
         self._spans.append(s3)
 
-        # 4. Context rendering
-        context_text = self._memory.render()
-
-        # 5. Chain-of-thought reasoning
-        s4 = AgentSpan(name="chain_of_thought")
-        reasoning = await self._chain_of_thought(user_input, intent, crisis_level, context_text)
-        s4.finish()
-        self._spans.append(s4)
-
-        # 6. Response generation
         extra = extra_context or {}
-        s5 = AgentSpan(name="response_generation")
-        response_text, model_used = await self._generate_response(
+        prompt = self._build_response_prompt(
             user_input=user_input,
             context=context_text,
             tools=tools,
@@ -865,28 +1140,183 @@ class AgenticChatService:
             retrieval_context=str(extra.get("retrieval_context", "") or ""),
             crew_notes=str(extra.get("crew_notes", "") or ""),
         )
-        s5.finish(model=model_used, tokens_approx=len(response_text.split()))
-        self._spans.append(s5)
+        return _TurnPlan(
+            user_input=user_input,
+            crisis_level=crisis_level,
+            intent=intent,
+            tools=tools,
+            reasoning=reasoning,
+            prompt=prompt,
+        )
 
-        # 7. Memory update
-        self._memory.add(Turn(role="user", content=user_input,
-                              intent=intent.value, crisis_level=crisis_level.value))
+    async def _finish_turn(
+        self,
+        plan: _TurnPlan,
+        response_text: str,
+        model_used: str,
+    ) -> AgentResponse:
+        """Memory update, then package the response."""
+        self._memory.add(Turn(role="user", content=plan.user_input,
+                              intent=plan.intent.value, crisis_level=plan.crisis_level.value))
         self._memory.add(Turn(role="assistant", content=response_text))
-        await self._maybe_compress_memory()
 
         return AgentResponse(
             session_id=self.session_id,
-            intent=intent.value,
-            crisis_level=crisis_level.value,
+            intent=plan.intent.value,
+            crisis_level=plan.crisis_level.value,
             response=response_text,
-            tools_used=[t.tool_id.value for t in tools],
-            reasoning_summary=reasoning,
-            confidence=self._compute_confidence(intent, crisis_level, len(tools)),
+            tools_used=[t.tool_id.value for t in plan.tools],
+            reasoning_summary=plan.reasoning,
+            confidence=self._compute_confidence(plan.intent, plan.crisis_level, len(plan.tools)),
             spans=[{"name": s.name, "duration_ms": s.duration_ms, **s.tags}
                    for s in self._spans],
             model_used=model_used,
         )
 
+    async def agenerate(
+        self,
+        user_input: str,
+        extra_context: Optional[Dict[str, Any]] = None,
+    ) -> AgentResponse:
+        """
+        Primary async entry point.
+
+        Steps:
+          1. Crisis triage
+          2. Planning — one structured call (intent + CoT + tool hints),
+             or async intent classification + CoT (AGENT_PLANNING_MODE=split / fallback)
+          3. Tool planning
+          4. Response generation (with retry)
+          5. Memory update
+          6. Observability packaging
+        """
+        plan = await self._prepare_turn(user_input, extra_context)
+
+        # Response generation
+        s5 = AgentSpan(name="response_generation")
+        response_text, model_used = await self._generate_response(plan.prompt)
+        s5.finish(model=model_used, tokens_approx=len(response_text.split()), **self._deadline_tags())
+        self._spans.append(s5)
+
+        return await self._finish_turn(plan, response_text, model_used)
+
+    async def astream(
+        self,
+        user_input: str,
+        extra_context: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of `agenerate`. Yields events:
+          {"event": "triage", ...}  immediately (keyword scan only)
+          {"event": "intent", ...}  once planning is done
+          {"event": "token", "text": ...}  per generated text delta
+          {"event": "done", "result": AgentResponse dict}
+        """
+        yield {"event": "triage", "crisis_level": self._assess_crisis_level(user_input).value}
+        plan = await self._prepare_turn(user_input, extra_context)
+        yield {
+            "event": "intent",
+            "intent": plan.intent.value,
+            "crisis_level": plan.crisis_level.value,
+            "tools_used": [t.tool_id.value for t in plan.tools],
+        }
+
+        s5 = AgentSpan(name="response_generation")
+        parts: List[str] = []
+        model_used = "unknown"
+        first_token_ms: Optional[float] = None
+        async for delta, model_used in self._stream_response(plan.prompt):
+            if first_token_ms is None:
+                first_token_ms = round((time.monotonic() - s5.started_at) * 1000, 2)
+            parts.append(delta)
+            yield {"event": "token", "text": delta}
+        response_text = "".join(parts).strip()
+        s5.finish(model=model_used, tokens_approx=len(response_text.split()),
+                  streamed=True, first_token_ms=first_token_ms, **self._deadline_tags())
+        self._spans.append(s5)
+
+        result = await self._finish_turn(plan, response_text, model_used)
+        yield {"event": "done", "result": result.to_dict()}
+
+    def _hydrate(
+        self,
+        history: Optional[List[Dict[str, Any]]],
+        summary: Optional[str] = None,
+    ) -> None:
+        """
+        Load the legacy `history` list (message/response pairs) into memory.
+        The stored history is authoritative, so it replaces the verbatim window
+        instead of being appended again on every turn of a cached session.
+        A persisted session summary (`memory_summary`) replaces the in-process one.
+        """
+        if summary:
+            self._memory.load(summary=summary)
+        if not history:
+            return
+        turns: List[Turn] = []
+        for item in history:
+            msg  = item.get("message", "") or item.get("user", "")
+            resp = item.get("response", "") or item.get("assistant", "")
+            if msg:
+                turns.append(Turn(role="user", content=msg))
+            if resp:
+                turns.append(Turn(role="assistant", content=resp))
+        self._memory.load(turns)
+
+    @staticmethod
+    def _error_result(exc: Exception) -> Dict[str, Any]:
+        return {
+            "intent": "general",
+            "crisis_level": 0,
+            "response": (
+                "I'm here. Something went wrong on my end. "
+                "Please try again or contact a trusted person if you need support now."
+            ),
+            "tools_used": [],
+            "confidence": 0.0,
+            "agent": {"error": str(exc)},
+        }
+
+    async def agenerate_from_history(
+        self,
+        user_input: str,
+        history: Optional[List[Dict[str, Any]]] = None,
+        extra_context: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Async counterpart of `generate`: hydrates memory from the legacy
+        `history` list and awaits the pipeline on the caller's event loop.
+        """
+        if self._turn_lock is None:
+            self._turn_lock = asyncio.Lock()
+        # One turn at a time per session: memory and spans are per-instance state
+        async with self._turn_lock:
+            self._hydrate(history, (extra_context or {}).get("memory_summary"))
+            try:
+                result = await self.agenerate(user_input, extra_context)
+            except Exception as exc:
+                logger.error("Agent pipeline failed: %s", exc)
+                return self._error_result(exc)
+            return result.to_dict()
+
+    async def astream_from_history(
+        self,
+        user_input: str,
+        history: Optional[List[Dict[str, Any]]] = None,
+        extra_context: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Streaming counterpart of `agenerate_from_history` (same events as `astream`)."""
+        if self._turn_lock is None:
+            self._turn_lock = asyncio.Lock()
+        async with self._turn_lock:
+            self._hydrate(history, (extra_context or {}).get("memory_summary"))
+            try:
+                async for event in self.astream(user_input, extra_context):
+                    yield event
+            except Exception as exc:
+                logger.error("Agent stream failed: %s", exc)
+                yield {"event": "done", "result": self._error_result(exc)}
+
     def generate(
         self,
         user_input: str,
@@ -894,20 +1324,13 @@ class AgenticChatService:
         extra_context: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         """
-        Synchronous shim for legacy callers.
+        Synchronous shim for legacy callers (scripts, workers without a loop).
 
-        Accepts the old `history` list and hydrates memory before calling
-        the async pipeline.
+        Async callers should await `agenerate_from_history` instead; this shim
+        spins up its own event loop.
         """
-        # Hydrate memory from legacy history format
-        if history:
-            for item in history:
-                msg  = item.get("message", "") or item.get("user", "")
-                resp = item.get("response", "") or item.get("assistant", "")
-                if msg:
-                    self._memory.add(Turn(role="user", content=msg))
-                if resp:
-                    self._memory.add(Turn(role="assistant", content=resp))
+        extra_context = with_deadline(extra_context)
+        self._hydrate(history, extra_context.get("memory_summary"))
 
         try:
             # Flask/Werkzeug runs each request in a worker thread with no event loop.
@@ -926,25 +1349,113 @@ class AgenticChatService:
                             asyncio.run,
                             self.agenerate(user_input, extra_context),
                         )
-                        result = future.result(timeout=_GENERATION_TIMEOUT + 60)
+                        # The turn sizes itself to its deadline; the reserve is headroom for the reply
+                        result = future.result(
+                            timeout=deadline_of(extra_context).remaining()
+                            + Config.DEADLINE_RESPONSE_RESERVE_SECONDS
+                        )
                 else:
                     raise
         except Exception as exc:
             logger.error("Sync shim failed: %s", exc)
-            return {
-                "intent": "general",
-                "crisis_level": 0,
-                "response": (
-                    "I'm here. Something went wrong on my end. "
-                    "Please try again or contact a trusted person if you need support now."
-                ),
-                "tools_used": [],
-                "confidence": 0.0,
-                "agent": {"error": str(exc)},
-            }
+            return self._error_result(exc)
 
         return result.to_dict()
 
+    async def agenerate_agent_response(
+        self,
+        user_input: str,
+        history: Optional[List[Dict[str, Any]]] = None,
+        extra_context: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Async route entry point used by the FastAPI handlers.
+        Same routing as `generate_agent_response`, but every stage is awaited on
+        the running loop (LangGraph `ainvoke`, `agenerate`) — no per-request
+        executors or nested event loops. The whole turn, fallback included,
+        runs under extra_context["deadline"] (a new CHAT_DEADLINE_SECONDS one if absent).
+        """
+        extra_context = with_deadline(extra_context)
+        if Config.ORCHESTRATION_MODE == "langgraph":
+            try:
+                from orchestration.orchestrator_service import arun_langgraph_pipeline
+
+                result = await arun_langgraph_pipeline(
+                    user_input, history, extra_context
+                )
+            except Exception as exc:  # noqa: BLE001
+                logger.warning(
+                    "LangGraph orchestration failed, using legacy agent: %s",
+                    exc,
+                    exc_info=True,
+                )
+                result = await session_agents.for_context(extra_context).agenerate_from_history(
+                    user_input=user_input,
+                    history=history,
+                    extra_context=extra_context,
+                )
+        else:
+            result = await session_agents.for_context(extra_context).agenerate_from_history(
+                user_input=user_input,
+                history=history,
+                extra_context=extra_context,
+            )
+
+        return await aapply_degraded_gemini_fallback(
+            result, user_input, deadline=deadline_of(extra_context)
+        )
+
+    async def astream_agent_response(
+        self,
+        user_input: str,
+        history: Optional[List[Dict[str, Any]]] = None,
+        extra_context: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming route entry point. Yields triage/intent/token events as they
+        happen and ends with {"event": "done", ...API payload} — the same dict
+        `agenerate_agent_response` returns, after the degraded-reply fallback.
+        Clients should render the final `response` from the done event.
+        """
+        extra_context = with_deadline(extra_context)
+        result: Optional[Dict[str, Any]] = None
+        streamed = False
+        sent: Set[str] = set()  # once-per-turn events already yielded
+        if Config.ORCHESTRATION_MODE == "langgraph":
+            try:
+                from orchestration.orchestrator_service import astream_langgraph_pipeline
+
+                async for event in astream_langgraph_pipeline(
+                    user_input, history, extra_context
+                ):
+                    if event.get("event") == "done":
+                        result = event.get("result")
+                    else:
+                        streamed = streamed or event.get("event") == "token"
+                        if event.get("event") in _ONCE_PER_TURN_EVENTS:
+                            sent.add(event["event"])
+                        yield event
+            except Exception as exc:  # noqa: BLE001
+                logger.warning(
+                    "LangGraph stream failed (streamed=%s): %s", streamed, exc, exc_info=True
+                )
+                if streamed:
+                    result = self._error_result(exc)
+        if result is None:
+            agent = session_agents.for_context(extra_context)
+            async for event in agent.astream_from_history(
+                user_input, history, extra_context
+            ):
+                if event.get("event") == "done":
+                    result = event.get("result")
+                elif event.get("event") not in sent:  # a failed LangGraph stream already sent it
+                    yield event
+
+        payload = await aapply_degraded_gemini_fallback(
+            result or {}, user_input, deadline=deadline_of(extra_context)
+        )
+        yield {"event": "done", **payload}
+
     def generate_agent_response(
         self,
         user_input: str,
@@ -957,6 +1468,7 @@ class AgenticChatService:
         the in-class AgenticChatService (legacy). Always applies a direct Gemini pass if
         the primary reply is missing or a known error boilerplate.
         """
+        extra_context = with_deadline(extra_context)
         if Config.ORCHESTRATION_MODE == "langgraph":
             try:
                 from orchestration.orchestrator_service import run_langgraph_pipeline
@@ -970,70 +1482,83 @@ class AgenticChatService:
                     exc,
                     exc_info=True,
                 )
-                result = self.generate(
+                result = session_agents.for_context(extra_context).generate(
                     user_input=user_input,
                     history=history,
                     extra_context=extra_context,
                 )
         else:
-            result = self.generate(
+            result = session_agents.for_context(extra_context).generate(
                 user_input=user_input,
                 history=history,
                 extra_context=extra_context,
             )
 
-        return apply_degraded_gemini_fallback(result, user_input)
+        return apply_degraded_gemini_fallback(result, user_input, deadline=deadline_of(extra_context))
 
 
-def apply_degraded_gemini_fallback(
+def _merged_agent_meta(
     result: Dict[str, Any],
-    user_input: str,
-    extra_agent: Optional[Dict[str, Any]] = None,
+    extra_agent: Optional[Dict[str, Any]],
 ) -> Dict[str, Any]:
-    """
-    Public helper: maps flat AgentResponse-style dicts to the API schema and
-    applies direct Gemini if the main reply is missing or known-degraded.
-    Merges optional result[\"orchestration_meta\"] into the response agent payload.
-    """
     om = result.get("orchestration_meta")
     if isinstance(om, dict):
-        merged: Dict[str, Any] = {**(extra_agent or {}), **om}
-    else:
-        merged = dict(extra_agent or {})
+        return {**(extra_agent or {}), **om}
+    return dict(extra_agent or {})
+
+
+def _fallback_budget(deadline: Optional[Deadline]) -> Optional[float]:
+    """Timeout for the direct Gemini pass: None without a deadline, 0.0 if it should be skipped."""
+    if deadline is None:
+        return None
+    budget = deadline.optional_budget()
+    if budget == 0.0:
+        logger.info("Skipping gemini_service fallback: turn deadline reached.")
+    return budget
+
+
+def _degraded_error(result: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+    """(needs_fallback, agent_error) for a flat AgentResponse-style dict."""
     response_text = (result.get("response") or "").strip()
     agent_err: Optional[str] = None
     a = result.get("agent")
     if isinstance(a, dict):
         agent_err = a.get("error")  # type: ignore[assignment]
+    return bool(_is_degraded_agent_text(response_text) or agent_err), agent_err
 
-    if _is_degraded_agent_text(response_text) or agent_err:
-        try:
-            fb = gemini_service.generate_mental_health_response(user_input)
-            fb_text = (fb.get("response") or "").strip()
-            if fb_text and fb.get("intent") != "error":
-                logger.info("Using gemini_service fallback after agent degraded/error.")
-                merge = {
-                    "session_id": result.get("session_id"),
-                    "crisis_level": result.get("crisis_level", 0),
-                    "tools_used": result.get("tools_used", []),
-                    "reasoning_summary": result.get("reasoning_summary", ""),
-                    "model_used": result.get("model_used"),
-                    "spans": result.get("spans", []),
-                    "generated_at": result.get("generated_at"),
-                    "fallback": "gemini_direct",
-                    "prior_error": str(agent_err) if agent_err else None,
-                }
-                if merged:
-                    merge.update(merged)
-                return {
-                    "intent": fb.get("intent", "mental_health_support"),
-                    "response": fb_text,
-                    "confidence": float(fb.get("confidence", 0.85)),
-                    "agent": merge,
-                }
-        except Exception as exc:
-            logger.warning("gemini_service fallback failed: %s", exc)
 
+def _fallback_payload(
+    result: Dict[str, Any],
+    fb: Dict[str, Any],
+    merged: Dict[str, Any],
+    agent_err: Optional[str],
+) -> Optional[Dict[str, Any]]:
+    fb_text = (fb.get("response") or "").strip()
+    if not fb_text or fb.get("intent") == "error":
+        return None
+    logger.info("Using gemini_service fallback after agent degraded/error.")
+    merge = {
+        "session_id": result.get("session_id"),
+        "crisis_level": result.get("crisis_level", 0),
+        "tools_used": result.get("tools_used", []),
+        "reasoning_summary": result.get("reasoning_summary", ""),
+        "model_used": result.get("model_used"),
+        "spans": result.get("spans", []),
+        "generated_at": result.get("generated_at"),
+        "fallback": "gemini_direct",
+        "prior_error": str(agent_err) if agent_err else None,
+    }
+    if merged:
+        merge.update(merged)
+    return {
+        "intent": fb.get("intent", "mental_health_support"),
+        "response": fb_text,
+        "confidence": float(fb.get("confidence", 0.85)),
+        "agent": merge,
+    }
+
+
+def _api_payload(result: Dict[str, Any], merged: Dict[str, Any]) -> Dict[str, Any]:
     ag = {
         "session_id": result.get("session_id"),
         "crisis_level": result.get("crisis_level", 0),
@@ -1053,7 +1578,107 @@ def apply_degraded_gemini_fallback(
     }
 
 
+def apply_degraded_gemini_fallback(
+    result: Dict[str, Any],
+    user_input: str,
+    extra_agent: Optional[Dict[str, Any]] = None,
+    deadline: Optional[Deadline] = None,
+) -> Dict[str, Any]:
+    """
+    Public helper: maps flat AgentResponse-style dicts to the API schema and
+    applies direct Gemini if the main reply is missing or known-degraded.
+    Merges optional result[\"orchestration_meta\"] into the response agent payload.
+    The direct pass is skipped once `deadline` has no usable time left.
+    """
+    merged = _merged_agent_meta(result, extra_agent)
+    degraded, agent_err = _degraded_error(result)
+    if degraded and _fallback_budget(deadline) != 0.0:
+        try:
+            fb = gemini_service.generate_mental_health_response(user_input)
+            payload = _fallback_payload(result, fb, merged, agent_err)
+            if payload:
+                return payload
+        except Exception as exc:
+            logger.warning("gemini_service fallback failed: %s", exc)
+    return _api_payload(result, merged)
+
+
+async def aapply_degraded_gemini_fallback(
+    result: Dict[str, Any],
+    user_input: str,
+    extra_agent: Optional[Dict[str, Any]] = None,
+    deadline: Optional[Deadline] = None,
+) -> Dict[str, Any]:
+    """
+    Async `apply_degraded_gemini_fallback`; the direct Gemini pass uses the
+    async LLM client, bounded by what is left of `deadline`.
+    """
+    merged = _merged_agent_meta(result, extra_agent)
+    degraded, agent_err = _degraded_error(result)
+    budget = _fallback_budget(deadline)
+    if degraded and budget != 0.0:
+        try:
+            fb = await gemini_service.agenerate_mental_health_response(
+                user_input, timeout=budget, deadline_bound=budget is not None
+            )
+            payload = _fallback_payload(result, fb, merged, agent_err)
+            if payload:
+                return payload
+        except Exception as exc:
+            logger.warning("gemini_service fallback failed: %s", exc)
+    return _api_payload(result, merged)
+
+
+# ─────────────────────────────────────────────
+# Per-session agent state
+# ─────────────────────────────────────────────
+class SessionAgentRegistry:
+    """
+    Bounded LRU/TTL registry of per-session AgenticChatService instances.
+
+    Each entry owns one conversation's memory, summary and model handle, so
+    prompt size tracks a single session and process memory stays flat under
+    load. Idle sessions expire after `ttl` seconds; the least recently used
+    are evicted beyond `maxsize`. Hits/misses/evictions are reported under
+    the `agent_sessions.*` metrics.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = Config.AGENT_SESSION_CACHE_SIZE,
+        ttl: float = Config.AGENT_SESSION_TTL_SECONDS,
+    ) -> None:
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, name="agent_sessions")
+
+    def get(self, session_id: Optional[str]) -> AgenticChatService:
+        """
+        Cached state for `session_id`; an ephemeral instance when there is none
+        (cheap: it reuses the configured client and shared model handles).
+        """
+        if not session_id:
+            return AgenticChatService()
+        svc = self._cache.get(session_id)
+        if svc is None:
+            svc = AgenticChatService(session_id=session_id)
+        self._cache.set(session_id, svc)  # insert or refresh the idle TTL
+        return svc
+
+    def for_context(self, extra_context: Optional[Dict[str, Any]]) -> AgenticChatService:
+        sid = (extra_context or {}).get("session_id")
+        return self.get(str(sid) if sid else None)
+
+    def discard(self, session_id: str) -> None:
+        self._cache.pop(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+session_agents = SessionAgentRegistry()
+
+
 # ─────────────────────────────────────────────
 # Module-level singleton (drop-in replacement)
+# Stateless router: conversation state lives in `session_agents`.
 # ─────────────────────────────────────────────
 agentic_chat_service = AgenticChatService()
\ No newline at end of file
@@ -1,39 +1,169 @@
 """Authentication module for password hashing and JWT token management."""
+import asyncio
+import hashlib
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, Optional, Union
 import bcrypt
 import jwt
+from cache import TTLCache
 from config import Config
+from observability.metrics import metrics
 
 
 logger = logging.getLogger(__name__)
 
+HashedPassword = Union[bytes, str]
+
+
+class AuthBusyError(RuntimeError):
+    """Raised when the bcrypt queue is full; callers should answer 503 and let the client retry."""
+
+
+def _as_bytes(hashed: HashedPassword) -> bytes:
+    return hashed.encode("utf-8") if isinstance(hashed, str) else hashed
+
 
 def hash_password(password: str) -> bytes:
 
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=Config.BCRYPT_ROUNDS))
+
+
+def verify_password(password: str, hashed: HashedPassword) -> bool:
+    return bcrypt.checkpw(password.encode("utf-8"), _as_bytes(hashed))
+
+
+def hash_cost(hashed: HashedPassword) -> Optional[int]:
+    """Cost factor encoded in a bcrypt hash ("$2b$12$..." -> 12); None if unparseable."""
+    try:
+        return int(_as_bytes(hashed).split(b"$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed: HashedPassword) -> bool:
+    cost = hash_cost(hashed)
+    return cost is not None and cost < Config.BCRYPT_ROUNDS
+
+
+class _BcryptPool:
+    """
+    Size-limited thread pool for bcrypt so hashing never runs on the event loop.
+
+    At most BCRYPT_WORKERS jobs run and BCRYPT_MAX_QUEUE wait; further submissions
+    raise AuthBusyError. Metrics: auth.bcrypt.{queue_depth,running} gauges and
+    auth.bcrypt.{submitted,rejected,ms} counters.
+    """
+
+    def __init__(self, workers: int, max_queue: int) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="bcrypt")
+        self._capacity = max(1, workers) + max(0, max_queue)
+        self._workers = max(1, workers)
+        self._lock = threading.Lock()
+        self._pending = 0
+        metrics.register_gauge("auth.bcrypt.queue_depth", lambda: max(0, self._pending - self._workers))
+        metrics.register_gauge("auth.bcrypt.running", lambda: min(self._pending, self._workers))
+
+    def _timed(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            metrics.incr("auth.bcrypt.ms", (time.perf_counter() - start) * 1000)
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self._capacity:
+                metrics.incr("auth.bcrypt.rejected")
+                raise AuthBusyError("Too many concurrent sign-ins, please retry shortly")
+            self._pending += 1
+        metrics.incr("auth.bcrypt.submitted")
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._timed, fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
 
+_bcrypt_pool = _BcryptPool(Config.BCRYPT_WORKERS, Config.BCRYPT_MAX_QUEUE)
 
-def verify_password(password: str, hashed: bytes) -> bool:
-    return bcrypt.checkpw(password.encode("utf-8"), hashed)
 
+async def ahash_password(password: str) -> bytes:
+    """`hash_password` on the bcrypt pool; raises AuthBusyError when saturated."""
+    return await _bcrypt_pool.run(hash_password, password)
 
-def generate_token(user_id: str) -> str:
-    payload = {
+
+async def averify_password(password: str, hashed: HashedPassword) -> bool:
+    """`verify_password` on the bcrypt pool; raises AuthBusyError when saturated."""
+    return await _bcrypt_pool.run(verify_password, password, hashed)
+
+
+def generate_token(user_id: str, email: Optional[str] = None, full_name: Optional[str] = None) -> str:
+    payload: Dict[str, Any] = {
         "user_id": user_id,
         "exp": datetime.utcnow() + timedelta(days=Config.JWT_EXPIRATION_DAYS),
     }
+    if Config.JWT_EMBED_PROFILE and email:
+        payload["email"] = email
+        payload["name"] = full_name or ""
     return jwt.encode(payload, Config.JWT_SECRET_KEY, algorithm="HS256")
 
 
-def verify_token(token: str) -> Optional[str]:
-  
+def decode_token(token: str) -> Optional[Dict[str, Any]]:
     try:
-        payload = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=["HS256"])
-        return payload.get("user_id")
+        return jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=["HS256"])
     except (jwt.ExpiredSignatureError, jwt.InvalidTokenError) as e:
         logger.warning("Token verification failed: %s", e)
         return None
 
-   
\ No newline at end of file
+
+def verify_token(token: str) -> Optional[str]:
+    profile = cached_token_profile(token)
+    if profile is not None:
+        return profile["id"]
+    payload = decode_token(token)
+    return payload.get("user_id") if payload else None
+
+
+# --- Verified token -> profile cache ---
+
+_token_profiles = TTLCache(
+    maxsize=Config.TOKEN_CACHE_SIZE,
+    ttl=Config.TOKEN_CACHE_TTL_SECONDS,
+    name="auth.token_cache",
+)
+
+
+def _token_key(token: str) -> str:
+    # Keep digests, not bearer tokens, in memory
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def profile_from_claims(payload: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """User profile from embedded claims (JWT_EMBED_PROFILE tokens); None for id-only tokens."""
+    if not payload.get("user_id") or not payload.get("email"):
+        return None
+    return {"id": payload["user_id"], "email": payload["email"], "full_name": payload.get("name", "")}
+
+
+def cached_token_profile(token: str) -> Optional[Dict[str, str]]:
+    return _token_profiles.get(_token_key(token))
+
+
+def cache_token_profile(token: str, payload: Dict[str, Any], profile: Dict[str, str]) -> None:
+    """Remember a verified token's profile, never past the token's own expiry."""
+    ttl = Config.TOKEN_CACHE_TTL_SECONDS
+    exp = payload.get("exp")
+    if exp:
+        ttl = min(ttl, float(exp) - time.time())
+    if ttl > 0:
+        _token_profiles.set(_token_key(token), dict(profile), ttl=ttl)
+
+
+def invalidate_token(token: str) -> None:
+    """Forget a token's cached profile (logout)."""
+    _token_profiles.pop(_token_key(token))
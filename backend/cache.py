@@ -0,0 +1,138 @@
+"""Bounded LRU + TTL cache (and key normalization) used for per-process agent, response and auth caches."""
+from __future__ import annotations
+
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from observability.metrics import metrics
+
+_PUNCT_RE = re.compile(r"[^\w\s']+", re.UNICODE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_cache_key(text: str) -> str:
+    """Case/whitespace/punctuation-insensitive key: "I feel anxious!!" == "i feel  anxious"."""
+    t = unicodedata.normalize("NFKC", text or "").casefold()
+    t = t.replace("\u2019", "'")
+    t = _PUNCT_RE.sub(" ", t)
+    return _SPACE_RE.sub(" ", t).strip()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL and a hard size bound.
+
+    Expired entries are dropped on read and swept from the LRU end on every
+    write; the cache never holds more than `maxsize` entries. When `name` is given, hits, misses,
+    evictions and expirations are counted in the process metrics registry and
+    the current size is exposed as a gauge.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        name: Optional[str] = None,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+    ) -> None:
+        self._maxsize = max(1, int(maxsize))
+        self._ttl = float(ttl)
+        self._name = name
+        self._on_evict = on_evict
+        self._lock = threading.RLock()
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        if name:
+            metrics.register_gauge(f"{name}.size", self.__len__)
+
+    def _count(self, what: str, n: int = 1) -> None:
+        if self._name and n:
+            metrics.incr(f"{self._name}.{what}", n)
+
+    def _drop(self, key: Hashable, reason: str) -> None:
+        value, _ = self._data.pop(key)
+        self._count(reason)
+        if self._on_evict:
+            try:
+                self._on_evict(key, value)
+            except Exception:  # noqa: BLE001
+                pass
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self._count("miss")
+                return default
+            value, expires = item
+            if expires <= time.monotonic():
+                self._drop(key, "expired")
+                self._count("miss")
+                return default
+            self._data.move_to_end(key)
+            self._count("hit")
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            now = time.monotonic()
+            while self._data:
+                oldest = next(iter(self._data))
+                if self._data[oldest][1] > now:
+                    break
+                self._drop(oldest, "expired")
+            if key in self._data:
+                self._data.pop(key)
+            self._data[key] = (value, now + (self._ttl if ttl is None else ttl))
+            while len(self._data) > self._maxsize:
+                oldest = next(iter(self._data))
+                self._drop(oldest, "evicted")
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, None)
+            return default if item is None else item[0]
+
+    def pop_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Remove every entry matching `predicate(key, value)`; returns how many were removed."""
+        with self._lock:
+            doomed = [k for k, (v, _) in self._data.items() if predicate(k, v)]
+            for k in doomed:
+                self._data.pop(k, None)
+            return len(doomed)
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            now = time.monotonic()
+            doomed = [k for k, (_, exp) in self._data.items() if exp <= now]
+            for k in doomed:
+                self._drop(k, "expired")
+            return len(doomed)
+
+    def values(self) -> List[Any]:
+        with self._lock:
+            now = time.monotonic()
+            return [v for v, exp in self._data.values() if exp > now]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            item = self._data.get(key)
+            return item is not None and item[1] > time.monotonic()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"size": len(self), "maxsize": self._maxsize, "ttl_s": self._ttl}
+        if self._name:
+            for what in ("hit", "miss", "evicted", "expired"):
+                out[what] = metrics.counter(f"{self._name}.{what}")
+        return out
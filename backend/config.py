@@ -18,17 +18,71 @@ class Config:
     # MongoDB Configuration
     MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/")
     MONGODB_DB_NAME = os.getenv("MONGODB_DB_NAME", "serenova_ai")
+    # Connection pool per process; async handlers run pymongo calls on a bounded executor
+    # (keep MONGO_EXECUTOR_WORKERS <= MONGO_MAX_POOL_SIZE so threads never wait on sockets)
+    MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "64"))
+    MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_EXECUTOR_WORKERS = int(os.getenv("MONGO_EXECUTOR_WORKERS", "32"))
+    # Write a chat turn (message insert + session update) in one transaction; needs a replica set
+    # such as Atlas. When off, the two writes are issued concurrently instead.
+    MONGO_TRANSACTIONS = os.getenv("MONGO_TRANSACTIONS", "false").lower() == "true"
     
     # JWT Configuration
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", FLASK_SECRET_KEY)
     JWT_EXPIRATION_DAYS = int(os.getenv("JWT_EXPIRATION_DAYS", "30"))
+    # Put email / full name claims in issued tokens so /auth/verify needs no user lookup
+    JWT_EMBED_PROFILE = os.getenv("JWT_EMBED_PROFILE", "false").lower() == "true"
+    # Verified token -> user profile cache (entries never outlive the token's exp)
+    TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+    TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+    # bcrypt cost factor (2^rounds); hashes below it are upgraded on the next successful login
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    # Dedicated hashing threads (bcrypt releases the GIL) and how many jobs may wait for one;
+    # beyond that signup/login answer 503 instead of stalling the whole worker
+    BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "4"))
+    BCRYPT_MAX_QUEUE = int(os.getenv("BCRYPT_MAX_QUEUE", "64"))
     
     # Gemini Configuration
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
     # Available models: gemini-pro-latest, gemini-2.5-flash, gemini-2.5-pro, gemini-2.0-flash
     # Use gemini-2.5-flash for fast responses, gemini-2.5-pro for better quality
     GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-2.5-flash")
-    
+    # Max in-flight LLM calls per pipeline stage ("stage=N,..."); stages not listed use LLM_DEFAULT_LIMIT
+    LLM_STAGE_LIMITS = os.getenv(
+        "LLM_STAGE_LIMITS",
+        "intent=32,plan=32,reasoning=16,response=64,summary=4,gemini=16,crew=8",
+    )
+    LLM_DEFAULT_LIMIT = int(os.getenv("LLM_DEFAULT_LIMIT", "16"))
+    # How long a model reported missing (404) is skipped before the fallback chain re-probes it
+    LLM_MODEL_RETRY_SECONDS = float(os.getenv("LLM_MODEL_RETRY_SECONDS", "300"))
+    # Retries of transient LLM failures (429 / 5xx / timeouts): attempt cap, full-jitter backoff
+    # base and ceiling, and a wall-clock budget that covers every attempt and sleep of one call
+    LLM_RETRY_ATTEMPTS = int(os.getenv("LLM_RETRY_ATTEMPTS", "3"))
+    LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.6"))
+    LLM_RETRY_MAX_BACKOFF_SECONDS = float(os.getenv("LLM_RETRY_MAX_BACKOFF_SECONDS", "4"))
+    LLM_RETRY_BUDGET_SECONDS = float(os.getenv("LLM_RETRY_BUDGET_SECONDS", "25"))
+    # Per-model circuit breaker: consecutive transient failures before it opens, and how long
+    # it fails fast before letting one probe call through
+    LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+    LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+    # Per-attempt timeout for the reply (deadline-shortened calls are not held against the breaker)
+    LLM_CALL_TIMEOUT_SECONDS = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "18"))
+    # Opt-in hedged requests: if a call in one of LLM_HEDGE_STAGES is still running after the
+    # LLM_HEDGE_PERCENTILE latency of the last LLM_HEDGE_WINDOW calls (floor LLM_HEDGE_MIN_DELAY_SECONDS;
+    # needs LLM_HEDGE_MIN_SAMPLES), race a second one (on the next chain model with LLM_HEDGE_NEXT_MODEL)
+    LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+    LLM_HEDGE_STAGES = [
+        s.strip() for s in os.getenv("LLM_HEDGE_STAGES", "response").split(",") if s.strip()
+    ]
+    LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+    LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "0.5"))
+    LLM_HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "200"))
+    LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    LLM_HEDGE_NEXT_MODEL = os.getenv("LLM_HEDGE_NEXT_MODEL", "false").lower() in ("1", "true", "yes")
+    # Hedges may add at most this share of extra calls (token bucket; LLM_HEDGE_BURST banked at most)
+    LLM_HEDGE_MAX_RATIO = float(os.getenv("LLM_HEDGE_MAX_RATIO", "0.1"))
+    LLM_HEDGE_BURST = float(os.getenv("LLM_HEDGE_BURST", "5"))
+
     # CORS Configuration
     # Strip whitespace from origins and filter out empty strings
     allowed_origins_str = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000,http://localhost:3001")
@@ -40,10 +94,83 @@ class Config:
     # Multi-agent / LangGraph: "langgraph" (default) or "legacy" (original AgenticChatService only)
     ORCHESTRATION_MODE = os.getenv("ORCHESTRATION_MODE", "langgraph").lower().strip()
 
+    # End-to-end budget (SLO) for one chat turn, started when the request arrives
+    CHAT_DEADLINE_SECONDS = float(os.getenv("CHAT_DEADLINE_SECONDS", "20"))
+    # Kept back for the final reply when sizing earlier stages (Crew, RAG, planning / CoT)
+    DEADLINE_RESPONSE_RESERVE_SECONDS = float(os.getenv("DEADLINE_RESPONSE_RESERVE_SECONDS", "8"))
+    # Optional stages that would get less than this are skipped (the reply always gets at least this)
+    DEADLINE_MIN_STAGE_SECONDS = float(os.getenv("DEADLINE_MIN_STAGE_SECONDS", "1.5"))
+    # With less than DEADLINE_FULL_OUTPUT_SECONDS left, the reply's max_output_tokens scales down
+    # linearly from DEADLINE_MAX_OUTPUT_TOKENS (floor DEADLINE_MIN_OUTPUT_TOKENS)
+    DEADLINE_FULL_OUTPUT_SECONDS = float(os.getenv("DEADLINE_FULL_OUTPUT_SECONDS", "8"))
+    DEADLINE_MAX_OUTPUT_TOKENS = int(os.getenv("DEADLINE_MAX_OUTPUT_TOKENS", "1024"))
+    DEADLINE_MIN_OUTPUT_TOKENS = int(os.getenv("DEADLINE_MIN_OUTPUT_TOKENS", "128"))
+
+    # Agent planning: "combined" = one structured JSON call for intent + reasoning + tool hints;
+    # "split" = separate intent classification and chain-of-thought calls (also the fallback)
+    AGENT_PLANNING_MODE = os.getenv("AGENT_PLANNING_MODE", "combined").lower().strip()
+
+    # Intent classification cache: process-wide LRU + TTL on normalized text;
+    # INTENT_CACHE_BACKEND=mongo adds a shared tier (TTL-indexed collection) for all workers
+    INTENT_CACHE_SIZE = int(os.getenv("INTENT_CACHE_SIZE", "5000"))
+    INTENT_CACHE_TTL_SECONDS = int(os.getenv("INTENT_CACHE_TTL_SECONDS", "120"))
+    INTENT_CACHE_BACKEND = os.getenv("INTENT_CACHE_BACKEND", "memory").lower().strip()
+
+    # Per-session agent state (memory, summary): bounded LRU with idle TTL
+    AGENT_SESSION_CACHE_SIZE = int(os.getenv("AGENT_SESSION_CACHE_SIZE", "1000"))
+    AGENT_SESSION_TTL_SECONDS = int(os.getenv("AGENT_SESSION_TTL_SECONDS", "1800"))
+    # Message/response pairs kept on each chat_sessions doc (`recent_turns`) for history hydration
+    SESSION_HISTORY_TURNS = int(os.getenv("SESSION_HISTORY_TURNS", "8"))
+    # Pairs pushed out of that window are folded into the stored `memory_summary` in batches of this size
+    SESSION_SUMMARY_BATCH = int(os.getenv("SESSION_SUMMARY_BATCH", "4"))
+
     # RAG (Chroma persistent path, relative to backend or absolute)
     CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "chroma_data")
+    # Texts per ONNX embedding call (bulk index / multi-query retrieval / backfill)
+    RAG_EMBED_BATCH_SIZE = int(os.getenv("RAG_EMBED_BATCH_SIZE", "64"))
+    # "chroma" = one global collection filtered by session; "local" = per-session mmap'd float32
+    # partitions (exact cosine; hnswlib graph above RAG_ANN_THRESHOLD rows if installed)
+    RAG_BACKEND = os.getenv("RAG_BACKEND", "chroma").lower().strip()
+    RAG_LOCAL_DIR = os.getenv("RAG_LOCAL_DIR", "rag_local")
+    RAG_ANN_THRESHOLD = int(os.getenv("RAG_ANN_THRESHOLD", "5000"))
+    RAG_LOCAL_OPEN_PARTITIONS = int(os.getenv("RAG_LOCAL_OPEN_PARTITIONS", "512"))
+    # Write-behind indexing of finished turns: batched upserts off the request path, with a
+    # JSONL spill file per worker (RAG_SPILL_PATH with the pid inserted: write_behind.<pid>.jsonl;
+    # relative to backend or absolute) replayed on startup after a crash
+    RAG_WRITE_BEHIND = os.getenv("RAG_WRITE_BEHIND", "true").lower() in ("1", "true", "yes")
+    RAG_WRITE_BATCH_SIZE = int(os.getenv("RAG_WRITE_BATCH_SIZE", "32"))
+    RAG_WRITE_LINGER_SECONDS = float(os.getenv("RAG_WRITE_LINGER_SECONDS", "0.05"))
+    RAG_WRITE_MAX_PENDING = int(os.getenv("RAG_WRITE_MAX_PENDING", "2000"))
+    RAG_SPILL_PATH = os.getenv("RAG_SPILL_PATH", "chroma_data/write_behind.jsonl")
+
+    # Opt-in response cache for anonymous /chat/predict-public (exact + semantic match; crisis text bypasses)
+    PUBLIC_CACHE_ENABLED = os.getenv("PUBLIC_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+    PUBLIC_CACHE_SIZE = int(os.getenv("PUBLIC_CACHE_SIZE", "2000"))
+    PUBLIC_CACHE_TTL_SECONDS = int(os.getenv("PUBLIC_CACHE_TTL_SECONDS", "3600"))
+    # Cosine similarity needed for a semantic hit (reuses the RAG embedding model); 0 = exact match only
+    PUBLIC_CACHE_SIMILARITY = float(os.getenv("PUBLIC_CACHE_SIMILARITY", "0.92"))
+
+    # Cursor pagination for session / message listings (default page size and hard cap)
+    SESSIONS_PAGE_SIZE = int(os.getenv("SESSIONS_PAGE_SIZE", "50"))
+    MESSAGES_PAGE_SIZE = int(os.getenv("MESSAGES_PAGE_SIZE", "100"))
+    MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
+    # Startup warm-up (background; GET /ready answers 503 until done) and which components it covers
+    WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+    WARMUP_COMPONENTS = [
+        c.strip() for c in os.getenv("WARMUP_COMPONENTS", "db,rag,graph,crew").split(",") if c.strip()
+    ]
+    WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "60"))
+    # Failed components are retried until this long after startup; then /ready reports ready, degraded
+    WARMUP_MAX_WAIT_SECONDS = float(os.getenv("WARMUP_MAX_WAIT_SECONDS", "90"))
 
     # RAG / monitoring toggles
     RAG_ENABLED = os.getenv("RAG_ENABLED", "true").lower() in ("1", "true", "yes")
     CREW_ENABLED = os.getenv("CREW_ENABLED", "true").lower() in ("1", "true", "yes")
+    # "crew" = two-agent sequential crew; "lite" = one LLM request for both emotion and CBT lines
+    CREW_MODE = os.getenv("CREW_MODE", "crew").lower().strip()
+    CREW_POOL_SIZE = int(os.getenv("CREW_POOL_SIZE", "2"))  # warm crews shared by concurrent turns
+    # Per-branch budgets for the parallel Crew / RAG graph nodes; a branch over budget is skipped
+    CREW_TIMEOUT_SECONDS = float(os.getenv("CREW_TIMEOUT_SECONDS", "6"))
+    RAG_TIMEOUT_SECONDS = float(os.getenv("RAG_TIMEOUT_SECONDS", "2"))
 
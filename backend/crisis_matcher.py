@@ -0,0 +1,149 @@
+"""
+Multi-pattern crisis phrase matcher (Aho–Corasick).
+
+The automaton is built once from a {level: [phrases]} lexicon; each message is
+scanned in a single pass regardless of lexicon size. Text and phrases share one
+normalization (NFKC + casefold, curly quotes -> ', punctuation/dashes/whitespace
+-> single space) so "Self-harm", "self  harm" and "self harm" match alike.
+A match must start on a word boundary ("harm" does not fire inside "pharmacy"),
+but the phrase's last word is matched as a prefix so inflected forms still count
+("self harmed", "suicides", "hopelessly"): in a triage path a missed crisis costs
+more than a false positive. Scripts written without spaces (CJK, Thai, …) match
+as plain substrings.
+"""
+from __future__ import annotations
+
+import unicodedata
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+_APOSTROPHES = {"’", "‘", "ʼ", "`", "´"}
+
+# Scripts that do not separate words with spaces: no boundary check there
+_UNSPACED_RANGES: Tuple[Tuple[int, int], ...] = (
+    (0x0E00, 0x0EFF),  # Thai, Lao
+    (0x1000, 0x109F),  # Myanmar
+    (0x1780, 0x17FF),  # Khmer
+    (0x3040, 0x30FF),  # Hiragana, Katakana
+    (0x3400, 0x4DBF),  # CJK Extension A
+    (0x4E00, 0x9FFF),  # CJK Unified Ideographs
+    (0xF900, 0xFAFF),  # CJK Compatibility Ideographs
+)
+
+
+@dataclass(frozen=True)
+class PhraseMatch:
+    start: int  # offsets into the original (un-normalized) text
+    end: int
+    phrase: str
+    level: int
+
+
+@dataclass(frozen=True)
+class CrisisScan:
+    level: int
+    matches: Tuple[PhraseMatch, ...] = ()
+
+    @property
+    def phrases(self) -> List[str]:
+        return sorted({m.phrase for m in self.matches})
+
+
+def _unspaced(ch: str) -> bool:
+    cp = ord(ch)
+    return any(lo <= cp <= hi for lo, hi in _UNSPACED_RANGES)
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() and not _unspaced(ch)
+
+
+def normalize_with_offsets(text: str) -> Tuple[str, List[int]]:
+    """Normalized text plus, per normalized char, the index of its source char."""
+    out: List[str] = []
+    src: List[int] = []
+    for i, raw in enumerate(text or ""):
+        for ch in unicodedata.normalize("NFKC", raw).casefold():
+            if ch in _APOSTROPHES:
+                ch = "'"
+            elif ch != "'" and not ch.isalnum():
+                ch = " "
+            if ch == " " and (not out or out[-1] == " "):
+                continue
+            out.append(ch)
+            src.append(i)
+    if out and out[-1] == " ":
+        out.pop()
+        src.pop()
+    return "".join(out), src
+
+
+class CrisisMatcher:
+    """Aho–Corasick automaton over a crisis lexicon; reports the highest level and all spans."""
+
+    def __init__(self, lexicon: Mapping[int, Iterable[str]]) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, str, int]]] = [[]]  # (length, phrase, level)
+        for level, phrases in lexicon.items():
+            for phrase in phrases:
+                self._add(phrase, int(level))
+        self._build_failure_links()
+
+    def _add(self, phrase: str, level: int) -> None:
+        norm, _ = normalize_with_offsets(phrase)
+        if not norm:
+            return
+        node = 0
+        for ch in norm:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(norm), phrase, level))
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def scan(self, text: str) -> CrisisScan:
+        norm, src = normalize_with_offsets(text)
+        if not norm:
+            return CrisisScan(level=0)
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        best = 0
+        matches: List[PhraseMatch] = []
+        n = len(norm)
+        for i, ch in enumerate(norm):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, phrase, level in out[node]:
+                s = i - length + 1
+                if s > 0 and _is_word_char(norm[s - 1]) and _is_word_char(norm[s]):
+                    continue
+                e = i
+                if _is_word_char(ch):  # span the whole inflected word ("harm" -> "harmed")
+                    while e + 1 < n and _is_word_char(norm[e + 1]):
+                        e += 1
+                matches.append(PhraseMatch(start=src[s], end=src[e] + 1, phrase=phrase, level=level))
+                if level > best:
+                    best = level
+        return CrisisScan(level=best, matches=tuple(matches))
+
+    def level(self, text: str) -> int:
+        return self.scan(text).level
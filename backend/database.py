@@ -1,8 +1,12 @@
 """Database module for MongoDB connection and initialization."""
+import asyncio
+import functools
 import logging
 import os
 import ssl
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
 from urllib.parse import quote_plus
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, InvalidURI
@@ -16,6 +20,86 @@ IS_PRODUCTION = os.getenv("FLASK_ENV", "development").lower() == "production"
 IS_WINDOWS = sys.platform == 'win32'
 
 
+class AsyncCollection:
+    """Awaitable facade over a pymongo collection.
+
+    Mirrors the pymongo methods used by the API. Each call runs on the database's
+    bounded executor, so concurrent requests overlap their round-trips instead of
+    blocking the event loop. `sync` is the underlying collection for scripts.
+    """
+
+    def __init__(self, collection, executor: ThreadPoolExecutor):
+        self.sync = collection
+        self._executor = executor
+
+    @property
+    def name(self) -> str:
+        return self.sync.name
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(fn, *args, **kwargs)
+        )
+
+    async def find_one(self, *args, **kwargs) -> Optional[dict]:
+        return await self._run(self.sync.find_one, *args, **kwargs)
+
+    async def find(
+        self,
+        filter: Optional[dict] = None,
+        projection: Optional[Any] = None,
+        *,
+        sort: Optional[List[tuple]] = None,
+        skip: int = 0,
+        limit: int = 0,
+    ) -> List[dict]:
+        """Run a find and materialize the cursor on the executor.
+
+        Args:
+            filter: Query document
+            projection: Fields to return
+            sort: List of (key, direction) pairs
+            skip: Number of documents to skip
+            limit: Maximum documents to return (0 = no limit)
+
+        Returns:
+            List of matching documents
+        """
+        def _query() -> List[dict]:
+            cursor = self.sync.find(filter or {}, projection)
+            if sort:
+                cursor = cursor.sort(sort)
+            if skip:
+                cursor = cursor.skip(skip)
+            if limit:
+                cursor = cursor.limit(limit)
+            return list(cursor)
+
+        return await self._run(_query)
+
+    async def count_documents(self, *args, **kwargs) -> int:
+        return await self._run(self.sync.count_documents, *args, **kwargs)
+
+    async def insert_one(self, *args, **kwargs):
+        return await self._run(self.sync.insert_one, *args, **kwargs)
+
+    async def update_one(self, *args, **kwargs):
+        return await self._run(self.sync.update_one, *args, **kwargs)
+
+    async def find_one_and_update(self, *args, **kwargs) -> Optional[dict]:
+        return await self._run(self.sync.find_one_and_update, *args, **kwargs)
+
+    async def delete_one(self, *args, **kwargs):
+        return await self._run(self.sync.delete_one, *args, **kwargs)
+
+    async def delete_many(self, *args, **kwargs):
+        return await self._run(self.sync.delete_many, *args, **kwargs)
+
+    async def bulk_write(self, *args, **kwargs):
+        return await self._run(self.sync.bulk_write, *args, **kwargs)
+
+
 class Database:
     """MongoDB database connection manager."""
     
@@ -23,6 +107,11 @@ class Database:
         self.client = None
         self.db = None
         self._connected = False
+        # Dedicated, bounded pool for pymongo calls made from async handlers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, Config.MONGO_EXECUTOR_WORKERS),
+            thread_name_prefix="mongo",
+        )
         # Do not hard-crash app import if MongoDB is temporarily unavailable.
         # Routes can retry via get_collection(), and /health will reflect DB state.
         try:
@@ -47,6 +136,14 @@ class Database:
         
         return mongo_url
     
+    @staticmethod
+    def _pool_options():
+        """Explicit connection pool sizing shared by every MongoClient we build."""
+        return {
+            'maxPoolSize': Config.MONGO_MAX_POOL_SIZE,
+            'minPoolSize': Config.MONGO_MIN_POOL_SIZE,
+        }
+
     def _connect(self):
         """Establish connection to MongoDB."""
         try:
@@ -69,6 +166,7 @@ class Database:
                     'serverSelectionTimeoutMS': 10000,  # Increased timeout
                     'connectTimeoutMS': 20000,
                     'socketTimeoutMS': 20000,
+                    **self._pool_options(),
                 }
                 
                 # For mongodb+srv (Atlas), ensure TLS is properly configured
@@ -113,6 +211,7 @@ class Database:
                         'serverSelectionTimeoutMS': 10000,
                         'connectTimeoutMS': 20000,
                         'socketTimeoutMS': 20000,
+                        **self._pool_options(),
                     }
                     
                     # For mongodb+srv (Atlas), ensure TLS is properly configured
@@ -213,6 +312,7 @@ class Database:
                         'serverSelectionTimeoutMS': 20000,
                         'connectTimeoutMS': 30000,
                         'socketTimeoutMS': 30000,
+                        **self._pool_options(),
                     }
                     # Process connection string for Atlas
                     fallback_url = Config.MONGO_URL
@@ -310,13 +410,19 @@ class Database:
             sessions_collection = self.db.chat_sessions
             sessions_collection.create_index("user_id")
             sessions_collection.create_index([("user_id", 1), ("last_updated", -1)])
+            # Keyset pages sort on (last_updated, _id): the _id tiebreak must be in the index too
+            sessions_collection.create_index([("user_id", 1), ("last_updated", -1), ("_id", -1)])
             logger.info("Chat sessions collection initialized")
             
             # Messages collection
             messages_collection = self.db.messages
             messages_collection.create_index("session_id")
             messages_collection.create_index([("session_id", 1), ("created_at", 1)])
+            messages_collection.create_index([("session_id", 1), ("created_at", -1), ("_id", -1)])
             logger.info("Messages collection initialized")
+
+            # Shared intent cache (optional tier; entries expire via TTL index)
+            self.db.intent_cache.create_index("expires_at", expireAfterSeconds=0)
             
             logger.info("Database initialized successfully")
         except Exception as e:
@@ -332,6 +438,39 @@ class Database:
             raise ConnectionError("Database is not connected. Please check MongoDB connection.")
         return self.db[collection_name]
 
+    async def aget_collection(self, collection_name):
+        """Get an awaitable collection; reconnects off the event loop if needed."""
+        if not self._connected:
+            loop = asyncio.get_running_loop()
+            col = await loop.run_in_executor(
+                self._executor, self.get_collection, collection_name
+            )
+        else:
+            col = self.db[collection_name]
+        return AsyncCollection(col, self._executor)
+
+    async def atransaction(self, fn):
+        """Run `fn(session)` as one multi-document transaction off the event loop.
+
+        Requires a replica set (Atlas always is); `fn` may be retried on transient errors.
+        """
+        await self.aget_collection("users")
+
+        def _run():
+            with self.client.start_session() as session:
+                return session.with_transaction(fn)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, _run)
+
+    async def aping(self):
+        """Ping the server without blocking the event loop."""
+        await self.aget_collection("users")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self.client.admin.command, 'ping'
+        )
+
 
 # Global database instance
 db = Database()
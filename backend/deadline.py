@@ -0,0 +1,78 @@
+"""
+End-to-end time budget for one chat turn.
+
+fastapi_server starts a `Deadline` (CHAT_DEADLINE_SECONDS) as soon as a chat
+request arrives and hands it down in extra_context["deadline"]. The graph
+branches, the agent's LLM stages and the degraded-reply fallback size their
+timeouts from what is left, and drop optional work (Crew, RAG, planning /
+chain-of-thought) rather than overrun it; the final
+reply shrinks `max_output_tokens` when little time remains.
+"""
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from config import Config
+
+
+class Deadline:
+    """Absolute expiry on the monotonic clock; cheap to copy around in context dicts."""
+
+    __slots__ = ("budget_s", "_started_at", "_expires_at")
+
+    def __init__(self, budget_s: float) -> None:
+        self.budget_s = max(0.0, float(budget_s))
+        self._started_at = time.monotonic()
+        self._expires_at = self._started_at + self.budget_s
+
+    def remaining(self) -> float:
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self._started_at
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self._expires_at
+
+    def timeout(self, cap: Optional[float] = None, reserve: float = 0.0) -> float:
+        """Seconds a stage may take: what is left after `reserve` (kept for later stages), at most `cap`."""
+        left = max(0.0, self.remaining() - reserve)
+        return left if cap is None else min(cap, left)
+
+    def optional_budget(self, cap: Optional[float] = None, reserve: float = 0.0) -> float:
+        """`timeout(cap, reserve)`, or 0.0 (skip the stage) below DEADLINE_MIN_STAGE_SECONDS."""
+        left = self.timeout(cap, reserve)
+        return left if left >= Config.DEADLINE_MIN_STAGE_SECONDS else 0.0
+
+    def __repr__(self) -> str:
+        return f"Deadline(budget_s={self.budget_s:.1f}, remaining={self.remaining():.2f})"
+
+
+def deadline_of(extra: Optional[Mapping[str, Any]]) -> Optional[Deadline]:
+    """The deadline carried in an extra_context dict, if any."""
+    d = extra.get("deadline") if isinstance(extra, Mapping) else None
+    return d if isinstance(d, Deadline) else None
+
+
+def with_deadline(extra: Optional[Dict[str, Any]], budget_s: Optional[float] = None) -> Dict[str, Any]:
+    """Copy of `extra` that carries a deadline (the existing one, or a new CHAT_DEADLINE_SECONDS one)."""
+    out = dict(extra or {})
+    if deadline_of(out) is None:
+        out["deadline"] = Deadline(Config.CHAT_DEADLINE_SECONDS if budget_s is None else budget_s)
+    return out
+
+
+def output_token_cap(deadline: Optional[Deadline]) -> Optional[int]:
+    """
+    max_output_tokens for the final reply: None (model default) with plenty of
+    time left, else DEADLINE_MAX_OUTPUT_TOKENS scaled by the share of
+    DEADLINE_FULL_OUTPUT_SECONDS that remains (never below DEADLINE_MIN_OUTPUT_TOKENS).
+    """
+    if deadline is None:
+        return None
+    left = deadline.remaining()
+    full = Config.DEADLINE_FULL_OUTPUT_SECONDS
+    if full <= 0 or left >= full:
+        return None
+    return max(Config.DEADLINE_MIN_OUTPUT_TOKENS, int(Config.DEADLINE_MAX_OUTPUT_TOKENS * left / full))
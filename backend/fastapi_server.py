@@ -4,24 +4,44 @@ Run: python server.py   or:  uvicorn fastapi_server:app --host 0.0.0.0 --port 50
 """
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 from bson import ObjectId
 from fastapi import Depends, FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, ConfigDict, Field
 from pymongo.errors import DuplicateKeyError
 
-from auth import generate_token, hash_password, verify_password, verify_token
+from auth import (
+    AuthBusyError,
+    ahash_password,
+    averify_password,
+    cache_token_profile,
+    cached_token_profile,
+    decode_token,
+    generate_token,
+    invalidate_token,
+    needs_rehash,
+    profile_from_claims,
+    verify_token,
+)
 from config import Config
 from database import db
+from deadline import Deadline, with_deadline
 from gemini_service import gemini_service
-from agent_service import agentic_chat_service
+from agent_service import agentic_chat_service, session_agents
+from observability.metrics import metrics
 from observability.request_metrics import RequestTimingMiddleware
-from utils import object_id_to_str, str_to_object_id
+from rag.response_cache import public_response_cache
+from rag.write_behind import rag_write_behind
+from utils import decode_cursor, encode_cursor, keyset_after, object_id_to_str, str_to_object_id
+from warmup import warmup_state
 
 
 logging.basicConfig(
@@ -30,7 +50,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="SeraNova AI API", version="2.0")
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    if Config.RAG_ENABLED and Config.RAG_WRITE_BEHIND:
+        await rag_write_behind.start()
+    # Warm up in the background so /health answers at once; /ready flips when done
+    warm = asyncio.create_task(warmup_state.run()) if Config.WARMUP_ENABLED else None
+    try:
+        yield
+    finally:
+        if warm is not None and not warm.done():
+            warm.cancel()
+        # Flush queued RAG turns before the worker exits
+        await rag_write_behind.stop()
+
+
+app = FastAPI(title="SeraNova AI API", version="2.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -89,25 +125,27 @@ async def fa_signup(body: SignupBody):
             raise HTTPException(400, "Invalid email format")
         if len(password) < 8:
             raise HTTPException(400, "Password must be at least 8 characters long")
-        users = db.get_collection("users")
-        if users.find_one({"email": email}):
+        users = await db.aget_collection("users")
+        if await users.find_one({"email": email}):
             raise HTTPException(409, "User with this email already exists")
         doc = {
             "email": email,
-            "password_hash": hash_password(password),
+            "password_hash": await ahash_password(password),
             "full_name": full_name,
             "created_at": datetime.utcnow(),
             "last_login": None,
         }
-        result = users.insert_one(doc)
+        result = await users.insert_one(doc)
         uid = str(result.inserted_id)
         return {
             "message": "User created successfully",
-            "token": generate_token(uid),
+            "token": generate_token(uid, email, full_name),
             "user": {"id": uid, "email": email, "full_name": full_name},
         }
     except DuplicateKeyError:
         raise HTTPException(409, "User with this email already exists")
+    except AuthBusyError as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": "2"})
     except HTTPException:
         raise
     except Exception as e:
@@ -122,21 +160,30 @@ async def fa_login(body: LoginBody):
         password = body.password
         if not email or not password:
             raise HTTPException(400, "Email and password are required")
-        users = db.get_collection("users")
-        user = users.find_one({"email": email})
-        if not user or not verify_password(password, user["password_hash"]):
+        users = await db.aget_collection("users")
+        user = await users.find_one({"email": email})
+        if not user or not await averify_password(password, user["password_hash"]):
             raise HTTPException(401, "Invalid email or password")
         uid = str(user["_id"])
-        users.update_one({"_id": user["_id"]}, {"$set": {"last_login": datetime.utcnow()}})
+        updates: Dict[str, Any] = {"last_login": datetime.utcnow()}
+        if needs_rehash(user["password_hash"]):
+            # Upgrade hashes made with an older BCRYPT_ROUNDS while we hold the plaintext
+            try:
+                updates["password_hash"] = await ahash_password(password)
+            except AuthBusyError:
+                pass
+        await users.update_one({"_id": user["_id"]}, {"$set": updates})
         return {
             "message": "Login successful",
-            "token": generate_token(uid),
+            "token": generate_token(uid, user["email"], user.get("full_name", "")),
             "user": {
                 "id": uid,
                 "email": user["email"],
                 "full_name": user.get("full_name", ""),
             },
         }
+    except AuthBusyError as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": "2"})
     except HTTPException:
         raise
     except Exception as e:
@@ -149,24 +196,32 @@ async def fa_verify(authorization: Optional[str] = Header(None)):
     tok = get_bearer_token(authorization)
     if not tok:
         raise HTTPException(401, "Token is required")
-    uid = verify_token(tok)
-    if not uid:
-        raise HTTPException(401, "Invalid or expired token")
-    user = db.get_collection("users").find_one({"_id": ObjectId(uid)})
-    if not user:
-        raise HTTPException(404, "User not found")
-    return {
-        "valid": True,
-        "user": {
-            "id": uid,
-            "email": user["email"],
-            "full_name": user.get("full_name", ""),
-        },
-    }
+    profile = cached_token_profile(tok)
+    if profile is None:
+        payload = decode_token(tok)
+        if not payload or not payload.get("user_id"):
+            raise HTTPException(401, "Invalid or expired token")
+        profile = profile_from_claims(payload)
+        if profile is None:
+            uid = payload["user_id"]
+            users = await db.aget_collection("users")
+            user = await users.find_one({"_id": ObjectId(uid)}, {"email": 1, "full_name": 1})
+            if not user:
+                raise HTTPException(404, "User not found")
+            profile = {
+                "id": uid,
+                "email": user["email"],
+                "full_name": user.get("full_name", ""),
+            }
+        cache_token_profile(tok, payload, profile)
+    return {"valid": True, "user": profile}
 
 
 @app.post("/auth/logout")
-async def fa_logout():
+async def fa_logout(authorization: Optional[str] = Header(None)):
+    tok = get_bearer_token(authorization)
+    if tok:
+        invalidate_token(tok)
     return {"message": "Logged out successfully"}
 
 
@@ -181,24 +236,77 @@ class MessageBody(BaseModel):
 async def fa_predict(
     body: MessageBody, user_id: str = Depends(require_user)
 ):
-    r = agentic_chat_service.generate_agent_response(
-        user_input=body.message.strip(), history=[]
+    r = await agentic_chat_service.agenerate_agent_response(
+        user_input=body.message.strip(), history=[], extra_context=with_deadline(None)
     )
     return r
 
 
 @app.post("/chat/predict-public")
 async def fa_predict_public(body: MessageBody):
-    r = agentic_chat_service.generate_agent_response(
-        user_input=body.message.strip(), history=[]
+    text = body.message.strip()
+    ex = with_deadline(None)
+    if not Config.PUBLIC_CACHE_ENABLED:
+        return await agentic_chat_service.agenerate_agent_response(
+            user_input=text, history=[], extra_context=ex
+        )
+    return await public_response_cache.aget_or_compute(
+        text,
+        lambda: agentic_chat_service.agenerate_agent_response(
+            user_input=text, history=[], extra_context=ex
+        ),
     )
-    return r
+
+
+def _page_size(limit: Optional[int], default: int) -> int:
+    return max(1, min(limit or default, Config.MAX_PAGE_SIZE))
+
+
+def _page_filter(base: Dict[str, Any], field: str, cursor: Optional[str]) -> Dict[str, Any]:
+    """Listing filter, narrowed to documents older than `cursor` (newest-first keyset)."""
+    if not cursor:
+        return base
+    position = decode_cursor(cursor)
+    if position is None:
+        raise HTTPException(400, "Invalid cursor")
+    return {**base, **keyset_after(field, position)}
+
+
+async def _keyset_page(
+    collection: str,
+    base: Dict[str, Any],
+    field: str,
+    projection: Dict[str, int],
+    cursor: Optional[str],
+    limit: int,
+):
+    """One newest-first page over (field, _id); returns (docs, next_cursor or None)."""
+    col = await db.aget_collection(collection)
+    docs = await col.find(
+        _page_filter(base, field, cursor),
+        projection,
+        sort=[(field, -1), ("_id", -1)],
+        limit=limit + 1,
+    )
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(docs[-1][field], docs[-1]["_id"])
 
 
 @app.get("/chat/sessions")
-async def fa_sessions(user_id: str = Depends(require_user)):
-    sessions = list(
-        db.get_collection("chat_sessions").find({"user_id": user_id}).sort("last_updated", -1)
+async def fa_sessions(
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    user_id: str = Depends(require_user),
+):
+    sessions, next_cursor = await _keyset_page(
+        "chat_sessions",
+        {"user_id": user_id},
+        "last_updated",
+        {"title": 1, "created_at": 1, "last_updated": 1},
+        cursor,
+        _page_size(limit, Config.SESSIONS_PAGE_SIZE),
     )
     return {
         "sessions": [
@@ -209,7 +317,8 @@ async def fa_sessions(user_id: str = Depends(require_user)):
                 "last_updated": s["last_updated"].isoformat(),
             }
             for s in sessions
-        ]
+        ],
+        "next_cursor": next_cursor,
     }
 
 
@@ -227,8 +336,11 @@ async def fa_create_session(
         "title": title,
         "created_at": datetime.utcnow(),
         "last_updated": datetime.utcnow(),
+        "message_count": 0,
+        "recent_turns": [],
     }
-    r = db.get_collection("chat_sessions").insert_one(doc)
+    col = await db.aget_collection("chat_sessions")
+    r = await col.insert_one(doc)
     sid = str(r.inserted_id)
     return {
         "message": "Session created successfully",
@@ -241,11 +353,12 @@ async def fa_create_session(
     }
 
 
-def _load_session(sid: str, user_id: str):
+async def _load_session(sid: str, user_id: str):
     o = str_to_object_id(sid)
     if not o:
         raise HTTPException(400, "Invalid session ID")
-    s = db.get_collection("chat_sessions").find_one({"_id": o})
+    col = await db.aget_collection("chat_sessions")
+    s = await col.find_one({"_id": o})
     if not s:
         raise HTTPException(404, "Session not found")
     if s["user_id"] != user_id:
@@ -255,14 +368,22 @@ def _load_session(sid: str, user_id: str):
 
 @app.get("/chat/sessions/{session_id}/messages")
 async def fa_get_messages(
-    session_id: str, user_id: str = Depends(require_user)
+    session_id: str,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    user_id: str = Depends(require_user),
 ):
-    _load_session(session_id, user_id)
-    msgs = list(
-        db.get_collection("messages")
-        .find({"session_id": session_id})
-        .sort("created_at", 1)
+    """Latest page of messages in chronological order; `next_cursor` pages back to older ones."""
+    await _load_session(session_id, user_id)
+    msgs, next_cursor = await _keyset_page(
+        "messages",
+        {"session_id": session_id},
+        "created_at",
+        {"message": 1, "response": 1, "intent": 1, "created_at": 1},
+        cursor,
+        _page_size(limit, Config.MESSAGES_PAGE_SIZE),
     )
+    msgs.reverse()
     return {
         "messages": [
             {
@@ -273,55 +394,232 @@ async def fa_get_messages(
                 "created_at": m["created_at"].isoformat(),
             }
             for m in msgs
-        ]
+        ],
+        "next_cursor": next_cursor,
     }
 
 
-@app.post("/chat/sessions/{session_id}/messages")
-async def fa_add_message(
-    session_id: str, body: MessageBody, user_id: str = Depends(require_user)
-):
-    if not (body.message or "").strip():
-        raise HTTPException(400, "Message is required")
-    _load_session(session_id, user_id)
-    col = db.get_collection("messages")
-    past = list(col.find({"session_id": session_id}).sort("created_at", -1).limit(8))
+async def _session_history(session_id: str) -> List[Dict[str, Any]]:
+    """Last turns read from the messages collection (sessions without `recent_turns`)."""
+    col = await db.aget_collection("messages")
+    past = await col.find(
+        {"session_id": session_id},
+        {"message": 1, "response": 1, "created_at": 1},
+        sort=[("created_at", -1)],
+        limit=Config.SESSION_HISTORY_TURNS,
+    )
     past.reverse()
-    history = [
-        {"message": p.get("message", ""), "response": p.get("response", "")} for p in past
+    return [
+        {"message": p.get("message", ""), "response": p.get("response", ""), "at": p["created_at"]}
+        for p in past
     ]
-    ai = agentic_chat_service.generate_agent_response(
-        user_input=body.message.strip(),
-        history=history,
-        extra_context={"session_id": session_id},
-    )
-    existing = col.count_documents({"session_id": session_id})
-    is_first = existing == 0
+
+
+async def _session_and_history(session_id: str, user_id: str):
+    """
+    Ownership check plus history; raises like `_load_session`.
+
+    Returns (session doc, history). Sessions carry their rolling `recent_turns`
+    window, so this is a single find_one; legacy sessions (created before the
+    window existed) fall back to the messages query once and get seeded on
+    their next write.
+    """
+    s, _ = await _load_session(session_id, user_id)
+    if "recent_turns" in s:
+        return s, list(s["recent_turns"])
+    return s, await _session_history(session_id)
+
+
+def _session_context(session: Dict[str, Any], deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+    """extra_context for a stored session: id, its persisted memory summary, and the turn deadline."""
+    ex: Dict[str, Any] = {"session_id": str(session["_id"])}
+    if session.get("memory_summary"):
+        ex["memory_summary"] = session["memory_summary"]
+    return with_deadline(ex) if deadline is None else {**ex, "deadline": deadline}
+
+
+# Sessions whose summary is being refreshed in this process, and the tasks doing it
+_summarizing: set = set()
+_background_tasks: set = set()
+
+
+async def _refresh_summary(session_id: str) -> None:
+    """
+    Fold the session's `pending_evicted` turns into `memory_summary`.
+
+    Only turns that left the stored window since the last refresh are sent to
+    the model; they are removed by timestamp so turns evicted meanwhile stay queued.
+    """
+    if session_id in _summarizing:
+        return
+    _summarizing.add(session_id)
+    try:
+        sessions = await db.aget_collection("chat_sessions")
+        oid = str_to_object_id(session_id)
+        doc = await sessions.find_one({"_id": oid}, {"memory_summary": 1, "pending_evicted": 1})
+        pending = (doc or {}).get("pending_evicted") or []
+        if not pending:
+            return
+        summary = await agentic_chat_service.asummarize_evicted(
+            doc.get("memory_summary", ""), pending
+        )
+        if not summary:
+            return
+        await sessions.update_one(
+            {"_id": oid},
+            {
+                "$set": {"memory_summary": summary},
+                "$pull": {"pending_evicted": {"at": {"$lte": pending[-1]["at"]}}},
+            },
+        )
+        metrics.incr("session_summary.refreshed")
+    except Exception as e:
+        logger.warning("Summary refresh for %s failed: %s", session_id, e)
+    finally:
+        _summarizing.discard(session_id)
+
+
+def _schedule_summary(session_id: str) -> None:
+    task = asyncio.create_task(_refresh_summary(session_id))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _persist_turn(
+    session: Dict[str, Any],
+    message: str,
+    ai: Dict[str, Any],
+    history: List[Dict[str, Any]],
+) -> str:
+    """
+    Store one exchange and bump the session; returns the new message id.
+
+    `history` is what the turn was hydrated from: empty means first turn, and
+    for legacy sessions (no `recent_turns` yet) it seeds the rolling window.
+    Pairs pushed out of the window queue in `pending_evicted`; once
+    SESSION_SUMMARY_BATCH are waiting, a background task folds them into
+    `memory_summary`. Sessions created before `message_count` existed get it
+    backfilled from their stored messages. The session update and the insert
+    run in one transaction when MONGO_TRANSACTIONS is on, otherwise concurrently.
+    """
+    session_id = str(session["_id"])
+    now = datetime.utcnow()
     mdoc = {
+        "_id": ObjectId(),
         "session_id": session_id,
-        "message": body.message.strip(),
+        "message": message,
         "response": ai.get("response", ""),
         "intent": ai.get("intent", ""),
-        "created_at": datetime.utcnow(),
+        "created_at": now,
     }
-    ins = col.insert_one(mdoc)
-    upd: Dict[str, Any] = {"last_updated": datetime.utcnow()}
-    if is_first and ai.get("intent"):
+    upd: Dict[str, Any] = {"last_updated": now}
+    if not history and ai.get("intent"):
         t = str(ai.get("intent", "")).replace("_", " ").title()
         if t:
             upd["title"] = t
-    db.get_collection("chat_sessions").update_one(
-        {"_id": str_to_object_id(session_id)}, {"$set": upd}
+    turn = {"message": message, "response": mdoc["response"], "at": now}
+    legacy = "recent_turns" not in session
+    window = [*history, turn] if legacy else [turn]
+    evicted = [
+        {**t, "at": t.get("at") or now} for t in [*history, turn][: -Config.SESSION_HISTORY_TURNS]
+    ]
+    push: Dict[str, Any] = {
+        "recent_turns": {"$each": window, "$slice": -Config.SESSION_HISTORY_TURNS}
+    }
+    if evicted:
+        push["pending_evicted"] = {"$each": evicted}
+    session_filter = {"_id": session["_id"]}
+    session_update: Dict[str, Any] = {"$set": upd, "$push": push}
+    if "message_count" in session:
+        session_update["$inc"] = {"message_count": 1}
+    else:
+        messages = await db.aget_collection("messages")
+        upd["message_count"] = await messages.count_documents({"session_id": session_id}) + 1
+
+    if Config.MONGO_TRANSACTIONS:
+        def _write(s) -> None:
+            db.get_collection("messages").insert_one(mdoc, session=s)
+            db.get_collection("chat_sessions").update_one(session_filter, session_update, session=s)
+
+        await db.atransaction(_write)
+    else:
+        messages, sessions = await asyncio.gather(
+            db.aget_collection("messages"), db.aget_collection("chat_sessions")
+        )
+        await asyncio.gather(
+            messages.insert_one(mdoc), sessions.update_one(session_filter, session_update)
+        )
+    pending = len(session.get("pending_evicted") or []) + len(evicted)
+    if evicted and pending >= Config.SESSION_SUMMARY_BATCH:
+        _schedule_summary(session_id)
+    return str(mdoc["_id"])
+
+
+def _sse(event: Dict[str, Any]) -> str:
+    name = event.get("event", "message")
+    return f"event: {name}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+def _sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/chat/sessions/{session_id}/messages")
+async def fa_add_message(
+    session_id: str, body: MessageBody, user_id: str = Depends(require_user)
+):
+    if not (body.message or "").strip():
+        raise HTTPException(400, "Message is required")
+    deadline = Deadline(Config.CHAT_DEADLINE_SECONDS)  # covers the history load too
+    session, history = await _session_and_history(session_id, user_id)
+    ai = await agentic_chat_service.agenerate_agent_response(
+        user_input=body.message.strip(),
+        history=history,
+        extra_context=_session_context(session, deadline),
     )
+    message_id = await _persist_turn(session, body.message.strip(), ai, history)
     return {
         "message": "Message added successfully",
-        "message_id": str(ins.inserted_id),
+        "message_id": message_id,
         "response": ai.get("response", ""),
         "intent": ai.get("intent", ""),
         "agent": ai.get("agent", {}),
     }
 
 
+@app.post("/chat/sessions/{session_id}/messages/stream")
+async def fa_add_message_stream(
+    session_id: str, body: MessageBody, user_id: str = Depends(require_user)
+):
+    """SSE: triage/intent/token events, then `done` (final reply) and `saved` once persisted."""
+    if not (body.message or "").strip():
+        raise HTTPException(400, "Message is required")
+    deadline = Deadline(Config.CHAT_DEADLINE_SECONDS)
+    session, history = await _session_and_history(session_id, user_id)
+    text = body.message.strip()
+
+    async def events() -> AsyncIterator[str]:
+        async for event in agentic_chat_service.astream_agent_response(
+            user_input=text,
+            history=history,
+            extra_context=_session_context(session, deadline),
+        ):
+            yield _sse(event)
+            if event.get("event") == "done":
+                try:
+                    message_id = await _persist_turn(session, text, event, history)
+                    yield _sse({"event": "saved", "message_id": message_id})
+                except Exception as e:
+                    logger.error("Persist streamed message: %s", e)
+                    yield _sse({"event": "error", "detail": "Failed to save message"})
+
+    return _sse_response(events())
+
+
 class UpdateSessionBody(BaseModel):
     title: Optional[str] = None
 
@@ -331,14 +629,15 @@ class UpdateSessionBody(BaseModel):
 async def fa_update_session(
     session_id: str, body: UpdateSessionBody, user_id: str = Depends(require_user)
 ):
-    _, oid = _load_session(session_id, user_id)
+    _, oid = await _load_session(session_id, user_id)
+    col = await db.aget_collection("chat_sessions")
     upd: Dict[str, Any] = {}
     if body.title and body.title.strip():
         upd["title"] = body.title.strip()
     if upd:
         upd["last_updated"] = datetime.utcnow()
-        db.get_collection("chat_sessions").update_one({"_id": oid}, {"$set": upd})
-    s = db.get_collection("chat_sessions").find_one({"_id": oid})
+        await col.update_one({"_id": oid}, {"$set": upd})
+    s = await col.find_one({"_id": oid})
     return {
         "message": "Session updated successfully",
         "session": {
@@ -351,9 +650,12 @@ async def fa_update_session(
 
 @app.delete("/chat/sessions/{session_id}")
 async def fa_delete_session(session_id: str, user_id: str = Depends(require_user)):
-    _, oid = _load_session(session_id, user_id)
-    db.get_collection("messages").delete_many({"session_id": session_id})
-    db.get_collection("chat_sessions").delete_one({"_id": oid})
+    _, oid = await _load_session(session_id, user_id)
+    messages = await db.aget_collection("messages")
+    await messages.delete_many({"session_id": session_id})
+    sessions = await db.aget_collection("chat_sessions")
+    await sessions.delete_one({"_id": oid})
+    session_agents.discard(session_id)
     return {"message": "Session deleted successfully"}
 
 
@@ -365,7 +667,7 @@ class PlaylistBody(BaseModel):
 async def fa_playlists(body: PlaylistBody, user_id: str = Depends(require_user)):
     if not (body.mood or "").strip():
         raise HTTPException(400, "Mood is required")
-    return gemini_service.get_spotify_playlist_recommendations(body.mood.strip())
+    return await gemini_service.aget_spotify_playlist_recommendations(body.mood.strip())
 
 
 class AgentBody(BaseModel):
@@ -373,32 +675,42 @@ class AgentBody(BaseModel):
     session_id: str = ""
 
 
+async def _agent_context(body: AgentBody, user_id: str):
+    deadline = Deadline(Config.CHAT_DEADLINE_SECONDS)
+    history: List[Dict[str, Any]] = []
+    ex: Dict[str, Any] = {"deadline": deadline}
+    if (body.session_id or "").strip():
+        session, history = await _session_and_history(body.session_id.strip(), user_id)
+        ex = _session_context(session, deadline)
+    return history, ex
+
+
 @app.post("/chat/agent")
 async def fa_agent(body: AgentBody, user_id: str = Depends(require_user)):
     if not (body.message or "").strip():
         raise HTTPException(400, "Message is required")
-    history: List[Dict[str, Any]] = []
-    if (body.session_id or "").strip():
-        sid = body.session_id.strip()
-        _load_session(sid, user_id)
-        past = list(
-            db.get_collection("messages")
-            .find({"session_id": sid})
-            .sort("created_at", -1)
-            .limit(8)
-        )
-        past.reverse()
-        history = [
-            {"message": p.get("message", ""), "response": p.get("response", "")} for p in past
-        ]
-    ex: Dict[str, Any] = {}
-    if (body.session_id or "").strip():
-        ex["session_id"] = body.session_id.strip()
-    return agentic_chat_service.generate_agent_response(
-        user_input=body.message.strip(), history=history, extra_context=ex or None
+    history, ex = await _agent_context(body, user_id)
+    return await agentic_chat_service.agenerate_agent_response(
+        user_input=body.message.strip(), history=history, extra_context=ex
     )
 
 
+@app.post("/chat/agent/stream")
+async def fa_agent_stream(body: AgentBody, user_id: str = Depends(require_user)):
+    """SSE variant of /chat/agent: triage/intent/token events, then `done` with the final payload."""
+    if not (body.message or "").strip():
+        raise HTTPException(400, "Message is required")
+    history, ex = await _agent_context(body, user_id)
+
+    async def events() -> AsyncIterator[str]:
+        async for event in agentic_chat_service.astream_agent_response(
+            user_input=body.message.strip(), history=history, extra_context=ex
+        ):
+            yield _sse(event)
+
+    return _sse_response(events())
+
+
 @app.get("/")
 async def home():
     return {
@@ -407,11 +719,22 @@ async def home():
     }
 
 
+@app.get("/metrics")
+async def metrics_snapshot():
+    return metrics.snapshot()
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness for load balancers: 503 until the startup warm-up has finished."""
+    body = warmup_state.to_dict()
+    return body if body["ready"] else JSONResponse(status_code=503, content=body)
+
+
 @app.get("/health")
 async def health():
     try:
-        h = db.get_collection("users").database
-        h.client.admin.command("ping")
+        await db.aping()
         return {"status": "healthy", "database": "connected"}
     except Exception as e:
         logger.error("Health: %s", e)
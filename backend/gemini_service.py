@@ -1,6 +1,9 @@
+import json
 import logging
+import re
 import google.generativeai as genai
 from config import Config
+from llm import llm_client
 
 
 logger = logging.getLogger(__name__)
@@ -25,18 +28,24 @@ class GeminiService:
             except Exception as e:
                 logger.error("Failed to configure Gemini: %s", e)
     
-    def generate_mental_health_response(self, user_input: str) -> dict:
-       
-        if not self.api_key:
-            return {
-                "intent": "configuration_error",
-                "response": (
-                    "The AI service is not configured yet. Please contact the system "
-                    "administrator to set up the Gemini API key."
-                ),
-                "confidence": 0.0,
-            }
-        
+    def _not_configured_response(self) -> dict:
+        return {
+            "intent": "configuration_error",
+            "response": (
+                "The AI service is not configured yet. Please contact the system "
+                "administrator to set up the Gemini API key."
+            ),
+            "confidence": 0.0,
+        }
+
+    def _get_model(self):
+        """Shared handle for the configured model, or the first live one in the fallback chain."""
+        picked = llm_client.resolve(self.model_name)
+        if picked is None:
+            raise Exception("All Gemini models are unavailable")
+        return picked[1]
+
+    def _mental_health_prompt(self, user_input: str) -> str:
         system_instructions = (
             "You are SeraNova, a compassionate, supportive mental health assistant. "
             "You provide empathetic, non-judgmental support, offer coping strategies, "
@@ -50,99 +59,91 @@ class GeminiService:
             "to express emotions and make the conversation feel more human and supportive."
         )
         
-        prompt = (
+        return (
             f"{system_instructions}\n\n"
             f"User message (about their mental and emotional wellbeing):\n"
             f"\"{user_input}\"\n\n"
             "Assistant response:"
         )
+
+    def _mental_health_result(self, result) -> dict:
+        text = (result.text or "").strip() if result else ""
+        
+        if not text:
+            raise ValueError("Empty response from Gemini")
+        
+        logger.info("Successfully generated response (length: %d)", len(text))
+        return {
+            "intent": "mental_health_support",
+            "response": text,
+            "confidence": 0.9,
+        }
+
+    def _mental_health_error(self, e: Exception) -> dict:
+        error_msg = str(e)
+        logger.error("Gemini generation error: %s", error_msg)
+        logger.error("Error type: %s", type(e).__name__)
+        
+        # Provide more helpful error messages
+        if "API key" in error_msg or "authentication" in error_msg.lower():
+            error_response = (
+                "The AI service authentication failed. Please contact the administrator. "
+                "If you are in crisis, contact local emergency services immediately."
+            )
+        elif "model" in error_msg.lower() or "not found" in error_msg.lower():
+            error_response = (
+                "The AI model is not available. Please try again later. "
+                "If you are in crisis, contact local emergency services immediately."
+            )
+        elif "quota" in error_msg.lower() or "limit" in error_msg.lower():
+            error_response = (
+                "The AI service quota has been exceeded. Please try again later. "
+                "If you are in crisis, contact local emergency services immediately."
+            )
+        else:
+            error_response = (
+                f"I'm having trouble connecting to my AI service right now. "
+                f"Error: {error_msg[:100]}. Please try again later. "
+                "If you are in crisis, contact local emergency services or a trusted professional immediately."
+            )
         
+        return {
+            "intent": "error",
+            "response": error_response,
+            "confidence": 0.0,
+        }
+
+    def generate_mental_health_response(self, user_input: str) -> dict:
+        """Blocking variant for sync callers; async code should use `agenerate_mental_health_response`."""
+        if not self.api_key:
+            return self._not_configured_response()
         try:
-            # Try to use the configured model, fallback to gemini-2.5-flash if model not found
-            model = None
-            try:
-                model = genai.GenerativeModel(self.model_name)
-                logger.info("Using model: %s", self.model_name)
-            except Exception as model_error:
-                logger.warning("Model '%s' not available, falling back to 'gemini-2.5-flash': %s", self.model_name, model_error)
-                try:
-                    model = genai.GenerativeModel("gemini-2.5-flash")
-                    logger.info("Using fallback model: gemini-2.5-flash")
-                except Exception as fallback_error:
-                    logger.error("Fallback model also failed: %s", fallback_error)
-                    # Try one more fallback
-                    try:
-                        model = genai.GenerativeModel("gemini-pro-latest")
-                        logger.info("Using second fallback model: gemini-pro-latest")
-                    except Exception as second_fallback_error:
-                        logger.error("All fallback models failed: %s", second_fallback_error)
-                        raise Exception(f"All models failed. Original: {model_error}, First fallback: {fallback_error}, Second fallback: {second_fallback_error}")
-            
-            if not model:
-                raise Exception("Failed to initialize any Gemini model")
-            
-            result = model.generate_content(prompt)
-            text = (result.text or "").strip() if result else ""
-            
-            if not text:
-                raise ValueError("Empty response from Gemini")
-            
-            logger.info("Successfully generated response (length: %d)", len(text))
-            return {
-                "intent": "mental_health_support",
-                "response": text,
-                "confidence": 0.9,
-            }
+            model = self._get_model()
+            result = llm_client.generate_sync("gemini", model, self._mental_health_prompt(user_input))
+            return self._mental_health_result(result)
         except Exception as e:
-            error_msg = str(e)
-            logger.error("Gemini generation error: %s", error_msg)
-            logger.error("Error type: %s", type(e).__name__)
-            
-            # Provide more helpful error messages
-            if "API key" in error_msg or "authentication" in error_msg.lower():
-                error_response = (
-                    "The AI service authentication failed. Please contact the administrator. "
-                    "If you are in crisis, contact local emergency services immediately."
-                )
-            elif "model" in error_msg.lower() or "not found" in error_msg.lower():
-                error_response = (
-                    "The AI model is not available. Please try again later. "
-                    "If you are in crisis, contact local emergency services immediately."
-                )
-            elif "quota" in error_msg.lower() or "limit" in error_msg.lower():
-                error_response = (
-                    "The AI service quota has been exceeded. Please try again later. "
-                    "If you are in crisis, contact local emergency services immediately."
-                )
-            else:
-                error_response = (
-                    f"I'm having trouble connecting to my AI service right now. "
-                    f"Error: {error_msg[:100]}. Please try again later. "
-                    "If you are in crisis, contact local emergency services or a trusted professional immediately."
-                )
-            
-            return {
-                "intent": "error",
-                "response": error_response,
-                "confidence": 0.0,
-            }
-    
-    def get_spotify_playlist_recommendations(self, mood: str) -> dict:
+            return self._mental_health_error(e)
+
+    async def agenerate_mental_health_response(
+        self, user_input: str, timeout=None, deadline_bound: bool = False
+    ) -> dict:
         """
-        Get Spotify playlist recommendations based on mood using Gemini API.
-        
-        Args:
-            mood: User's current mood (e.g., "anxious", "sad", "happy", "calm", "stressed")
-        
-        Returns:
-            dict with playlists containing name, description, and spotify_url
+        Same as `generate_mental_health_response`, over the shared async LLM client
+        (optional timeout, s; `deadline_bound` when it comes from the caller's deadline).
         """
         if not self.api_key:
-            return {
-                "playlists": [],
-                "error": "AI service is not configured"
-            }
-        
+            return self._not_configured_response()
+        try:
+            model = self._get_model()
+            result = await llm_client.generate(
+                "gemini", model, self._mental_health_prompt(user_input),
+                timeout=timeout, deadline_bound=deadline_bound,
+            )
+            return self._mental_health_result(result)
+        except Exception as e:
+            return self._mental_health_error(e)
+    
+    def _playlist_prompt(self, mood: str) -> str:
         system_instructions = (
             "You are a music therapy assistant. Based on the user's mood, recommend 3-5 Spotify playlists "
             "that would help improve their mental wellbeing. For each playlist, provide:\n"
@@ -165,67 +166,84 @@ class GeminiService:
             "Make sure all URLs are valid Spotify links."
         )
         
-        prompt = (
+        return (
             f"{system_instructions}\n\n"
             f"User's current mood: {mood}\n\n"
             "Provide Spotify playlist recommendations in JSON format:"
         )
+
+    def _playlist_result(self, result, mood: str) -> dict:
+        text = (result.text or "").strip() if result else ""
         
-        try:
-            model = None
+        if not text:
+            raise ValueError("Empty response from Gemini")
+        
+        # Look for JSON in the response
+        json_match = re.search(r'\{[\s\S]*\}', text)
+        if json_match:
+            json_str = json_match.group(0)
             try:
-                model = genai.GenerativeModel(self.model_name)
-            except Exception:
-                try:
-                    model = genai.GenerativeModel("gemini-2.5-flash")
-                except Exception:
-                    model = genai.GenerativeModel("gemini-pro-latest")
-            
-            if not model:
-                raise Exception("Failed to initialize Gemini model")
-            
-            result = model.generate_content(prompt)
-            text = (result.text or "").strip() if result else ""
-            
-            if not text:
-                raise ValueError("Empty response from Gemini")
-            
-            # Try to extract JSON from the response
-            import json
-            import re
-            
-            # Look for JSON in the response
-            json_match = re.search(r'\{[\s\S]*\}', text)
-            if json_match:
-                json_str = json_match.group(0)
-                try:
-                    playlist_data = json.loads(json_str)
-                    playlists = playlist_data.get("playlists", [])
-                    
-                    # Validate and clean playlists
-                    valid_playlists = []
-                    for playlist in playlists:
-                        if isinstance(playlist, dict) and "name" in playlist:
-                            valid_playlists.append({
-                                "name": playlist.get("name", "Unknown Playlist"),
-                                "description": playlist.get("description", ""),
-                                "spotify_url": playlist.get("spotify_url", ""),
-                                "mood": playlist.get("mood", mood)
-                            })
-                    
-                    if valid_playlists:
-                        logger.info("Successfully generated %d Spotify playlist recommendations for mood: %s", len(valid_playlists), mood)
-                        return {
-                            "playlists": valid_playlists,
-                            "mood": mood
-                        }
-                except json.JSONDecodeError as e:
-                    logger.warning("Failed to parse JSON from Gemini response: %s", e)
-            
-            # Fallback: return default playlists if JSON parsing fails
-            logger.warning("Using fallback playlists for mood: %s", mood)
+                playlist_data = json.loads(json_str)
+                playlists = playlist_data.get("playlists", [])
+                
+                # Validate and clean playlists
+                valid_playlists = []
+                for playlist in playlists:
+                    if isinstance(playlist, dict) and "name" in playlist:
+                        valid_playlists.append({
+                            "name": playlist.get("name", "Unknown Playlist"),
+                            "description": playlist.get("description", ""),
+                            "spotify_url": playlist.get("spotify_url", ""),
+                            "mood": playlist.get("mood", mood)
+                        })
+                
+                if valid_playlists:
+                    logger.info("Successfully generated %d Spotify playlist recommendations for mood: %s", len(valid_playlists), mood)
+                    return {
+                        "playlists": valid_playlists,
+                        "mood": mood
+                    }
+            except json.JSONDecodeError as e:
+                logger.warning("Failed to parse JSON from Gemini response: %s", e)
+        
+        # Fallback: return default playlists if JSON parsing fails
+        logger.warning("Using fallback playlists for mood: %s", mood)
+        return self._get_fallback_playlists(mood)
+
+    def get_spotify_playlist_recommendations(self, mood: str) -> dict:
+        """
+        Get Spotify playlist recommendations based on mood using Gemini API.
+        
+        Args:
+            mood: User's current mood (e.g., "anxious", "sad", "happy", "calm", "stressed")
+        
+        Returns:
+            dict with playlists containing name, description, and spotify_url
+        """
+        if not self.api_key:
+            return {
+                "playlists": [],
+                "error": "AI service is not configured"
+            }
+        try:
+            model = self._get_model()
+            result = llm_client.generate_sync("gemini", model, self._playlist_prompt(mood))
+            return self._playlist_result(result, mood)
+        except Exception as e:
+            logger.error("Spotify playlist recommendation error: %s", e)
             return self._get_fallback_playlists(mood)
-            
+
+    async def aget_spotify_playlist_recommendations(self, mood: str) -> dict:
+        """Same as `get_spotify_playlist_recommendations`, over the shared async LLM client."""
+        if not self.api_key:
+            return {
+                "playlists": [],
+                "error": "AI service is not configured"
+            }
+        try:
+            model = self._get_model()
+            result = await llm_client.generate("gemini", model, self._playlist_prompt(mood))
+            return self._playlist_result(result, mood)
         except Exception as e:
             logger.error("Spotify playlist recommendation error: %s", e)
             return self._get_fallback_playlists(mood)
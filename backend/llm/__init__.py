@@ -0,0 +1,32 @@
+"""LLM transport shared by the agent pipeline, the direct Gemini service and Crew."""
+from .client import LLMClient, llm_client
+from .hedging import Hedger, hedger
+from .registry import MODEL_FALLBACK_CHAIN, ModelRegistry, model_registry
+from .resilience import (
+    BreakerBoard,
+    CircuitBreaker,
+    CircuitOpenError,
+    ErrorKind,
+    LLMUnavailableError,
+    RetryPolicy,
+    breakers,
+    classify_error,
+)
+
+__all__ = [
+    "BreakerBoard",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "ErrorKind",
+    "Hedger",
+    "LLMClient",
+    "LLMUnavailableError",
+    "MODEL_FALLBACK_CHAIN",
+    "ModelRegistry",
+    "RetryPolicy",
+    "breakers",
+    "classify_error",
+    "hedger",
+    "llm_client",
+    "model_registry",
+]
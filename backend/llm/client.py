@@ -0,0 +1,366 @@
+"""
+Shared Gemini transport for the agent, the direct Gemini service and Crew lite mode.
+
+Async callers go through the SDK's native `generate_content_async`, which
+rides one process-wide grpc.aio channel (HTTP/2, many concurrent streams)
+instead of parking a thread per call in asyncio's default executor. Every
+call names its pipeline stage; each stage has its own in-flight limit
+(LLM_STAGE_LIMITS) so, for example, a burst of summaries cannot starve
+user-facing responses.
+
+Model handles come from `model_registry`; a call failing because its model
+does not exist takes that model out of the fallback rotation. Every call is
+gated by and reported to its model's circuit breaker (see `resilience`), and
+`generate_resilient` adds classified, budgeted retries across the chain and,
+for the stages in LLM_HEDGE_STAGES, hedges slow attempts (see `hedging`).
+
+A timeout counts against the breaker unless the caller marks the call
+`deadline_bound`: its timeout was cut short by a turn's deadline, which says
+nothing about the model. Retry-budget cuts inside `generate_resilient` still
+count.
+
+Metrics: llm.<stage>.{calls,errors,timeouts,deadline_timeouts,queued,wait_ms}
+counters and the llm.<stage>.inflight gauge.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+import google.generativeai as genai
+
+from config import Config
+from observability.metrics import metrics
+
+from .hedging import hedger
+from .registry import model_name_of, model_registry
+from .resilience import (
+    ErrorKind,
+    LLMUnavailableError,
+    RetryPolicy,
+    breakers,
+    classify_error,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_limits(spec: str) -> Dict[str, int]:
+    limits: Dict[str, int] = {}
+    for part in (spec or "").split(","):
+        name, _, value = part.partition("=")
+        try:
+            limits[name.strip()] = max(1, int(value))
+        except ValueError:
+            continue
+    return limits
+
+
+class LLMClient:
+    """
+    Process-wide LLM client: per-stage concurrency limits around every Gemini call.
+
+    The SDK binds its grpc.aio channel to the first event loop that uses it
+    (the server's). Calls made from any other loop, such as the `asyncio.run`
+    shim behind sync agent callers, run the blocking API in a worker thread
+    instead, under that loop's own stage limits.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None, default_limit: int = 16) -> None:
+        self._limits = dict(limits or {})
+        self._default_limit = max(1, default_limit)
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, int] = {}
+        self._sync_sems: Dict[str, threading.BoundedSemaphore] = {}
+        self._async_sems: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._home_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def limit(self, stage: str) -> int:
+        return self._limits.get(stage, self._default_limit)
+
+    def model(self, name: str) -> genai.GenerativeModel:
+        """Shared `GenerativeModel` handle for `name` (see `ModelRegistry.handle`)."""
+        return model_registry.handle(name)
+
+    def resolve(self, preferred: Optional[str] = None) -> Optional[Tuple[str, genai.GenerativeModel]]:
+        """First (name, handle) in the fallback chain that is neither missing nor behind an open breaker."""
+        return model_registry.resolve(preferred, accept=breakers.allows)
+
+    def _hedge_target(
+        self, name: str, model: genai.GenerativeModel, preferred: Optional[str]
+    ) -> Tuple[str, genai.GenerativeModel]:
+        """Where a hedge for a call to `name` goes: the next usable chain model, or `name` itself."""
+        if Config.LLM_HEDGE_NEXT_MODEL:
+            chain = model_registry.chain(preferred)
+            later = chain[chain.index(name) + 1:] if name in chain else ()
+            for candidate in later:
+                if model_registry.available(candidate) and breakers.allows(candidate):
+                    return candidate, model_registry.handle(candidate)
+        return name, model
+
+    # ── Concurrency limits ───────────────────────────────────────────────────
+
+    def _track(self, stage: str, delta: int) -> None:
+        with self._lock:
+            if stage not in self._inflight:
+                metrics.register_gauge(f"llm.{stage}.inflight", lambda s=stage: self._inflight.get(s, 0))
+            self._inflight[stage] = self._inflight.get(stage, 0) + delta
+
+    def _async_sem(self, stage: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            sems = self._async_sems.setdefault(loop, {})
+            sem = sems.get(stage)
+            if sem is None:
+                sem = sems[stage] = asyncio.Semaphore(self.limit(stage))
+            return sem
+
+    def _sync_sem(self, stage: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            sem = self._sync_sems.get(stage)
+            if sem is None:
+                sem = self._sync_sems[stage] = threading.BoundedSemaphore(self.limit(stage))
+            return sem
+
+    def _native(self) -> bool:
+        """True when the SDK's async channel may be used from the running loop."""
+        loop = asyncio.get_running_loop()
+        if self._home_loop is None:
+            self._home_loop = loop
+        return loop is self._home_loop
+
+    def _failed(self, stage: str, name: str, exc: BaseException, deadline_bound: bool = False) -> None:
+        if isinstance(exc, asyncio.TimeoutError):
+            metrics.incr(f"llm.{stage}.timeouts")
+            if deadline_bound:
+                # Cut short by the caller's deadline: says nothing about the model's health
+                metrics.incr(f"llm.{stage}.deadline_timeouts")
+                breakers.get(name).release()
+                return
+        else:
+            metrics.incr(f"llm.{stage}.errors")
+        model_registry.note_failure(name, exc)
+        breakers.record(name, exc)
+
+    @asynccontextmanager
+    async def _slot(self, stage: str, model: Any, deadline_bound: bool = False) -> AsyncIterator[None]:
+        name = model_name_of(model)
+        breaker = breakers.get(name)
+        breaker.before_call()  # fail fast, before queueing
+        sem = self._async_sem(stage)
+        t0 = time.perf_counter()
+        if sem.locked():
+            metrics.incr(f"llm.{stage}.queued")
+        try:
+            async with sem:
+                metrics.incr(f"llm.{stage}.wait_ms", (time.perf_counter() - t0) * 1000.0)
+                metrics.incr(f"llm.{stage}.calls")
+                self._track(stage, 1)
+                try:
+                    yield
+                finally:
+                    self._track(stage, -1)
+        except Exception as exc:
+            self._failed(stage, name, exc, deadline_bound)
+            raise
+        except BaseException:
+            breaker.release()  # cancelled: no verdict on the model
+            raise
+        else:
+            breakers.record(name, None)
+
+    @contextmanager
+    def _sync_slot(self, stage: str, model: Any) -> Iterator[None]:
+        name = model_name_of(model)
+        breaker = breakers.get(name)
+        breaker.before_call()
+        try:
+            with self._sync_sem(stage):
+                metrics.incr(f"llm.{stage}.calls")
+                self._track(stage, 1)
+                try:
+                    yield
+                finally:
+                    self._track(stage, -1)
+        except Exception as exc:
+            self._failed(stage, name, exc)
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        else:
+            breakers.record(name, None)
+
+    # ── Calls ────────────────────────────────────────────────────────────────
+
+    async def generate(
+        self,
+        stage: str,
+        model: genai.GenerativeModel,
+        prompt: Any,
+        *,
+        generation_config: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        deadline_bound: bool = False,
+    ) -> Any:
+        """
+        One `generate_content` call under `stage`'s limit; `timeout` excludes
+        queueing. `deadline_bound`: the timeout was shortened by the caller's
+        deadline, so hitting it is not held against the model's breaker.
+        """
+        async with self._slot(stage, model, deadline_bound):
+            if self._native():
+                call = model.generate_content_async(prompt, generation_config=generation_config)
+            else:
+                call = asyncio.to_thread(
+                    model.generate_content, prompt, generation_config=generation_config
+                )
+            return await asyncio.wait_for(call, timeout=timeout)
+
+    async def stream(
+        self,
+        stage: str,
+        model: genai.GenerativeModel,
+        prompt: Any,
+        *,
+        generation_config: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        deadline_bound: bool = False,
+    ) -> AsyncIterator[Any]:
+        """
+        Yield response chunks as they arrive; `timeout` bounds the wait for the
+        stream to open (`deadline_bound` as in `generate`). Off the home loop
+        the whole response is one chunk.
+        """
+        async with self._slot(stage, model, deadline_bound):
+            if not self._native():
+                yield await asyncio.wait_for(
+                    asyncio.to_thread(model.generate_content, prompt, generation_config=generation_config),
+                    timeout=timeout,
+                )
+                return
+            response = await asyncio.wait_for(
+                model.generate_content_async(prompt, generation_config=generation_config, stream=True),
+                timeout=timeout,
+            )
+            async for chunk in response:
+                yield chunk
+
+    async def generate_resilient(
+        self,
+        stage: str,
+        prompt: Any,
+        *,
+        preferred: Optional[str] = None,
+        generation_config: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        deadline_bound: bool = False,
+        policy: Optional[RetryPolicy] = None,
+    ) -> Tuple[Any, str]:
+        """
+        `generate` with retries -> (response, model name). Transient errors back
+        off with jitter and retry (on the next model once a breaker opens),
+        missing / open-circuit models are skipped at once, and request-level
+        errors (safety block, 400) are raised unchanged. Attempts and sleeps
+        share `policy.budget_s`; raises `LLMUnavailableError` when it runs out.
+        `deadline_bound` marks `timeout` as cut by the caller's deadline; an
+        attempt the retry budget cut shorter still counts against the breaker.
+        """
+        policy = policy or RetryPolicy()
+        deadline = time.monotonic() + policy.budget_s
+        last_exc: Optional[BaseException] = None
+        attempt = 0
+        while attempt < policy.max_attempts:
+            remaining = deadline - time.monotonic()
+            picked = self.resolve(preferred)
+            if picked is None or remaining <= 0:
+                break
+            name, model = picked
+            attempt += 1
+            metrics.incr("llm.retry.attempts")
+            try:
+                call_timeout = min(timeout, remaining) if timeout else remaining
+                bound = deadline_bound and bool(timeout) and timeout <= remaining
+                if not hedger.enabled(stage):
+                    resp = await self.generate(
+                        stage, model, prompt, generation_config=generation_config,
+                        timeout=call_timeout, deadline_bound=bound,
+                    )
+                    return resp, name
+                return await self._hedged(
+                    stage, name, model, prompt, preferred, generation_config, call_timeout, bound
+                )
+            except Exception as exc:
+                last_exc = exc
+                kind = classify_error(exc)
+                if kind is ErrorKind.FATAL:
+                    raise
+                if kind is ErrorKind.NEXT_MODEL:
+                    continue  # resolve() now skips this model; no backoff needed
+                if attempt >= policy.max_attempts:
+                    break
+                wait = policy.backoff(attempt)
+                if time.monotonic() + wait >= deadline:
+                    metrics.incr("llm.retry.budget_exhausted")
+                    break
+                logger.warning(
+                    "%s call to %s failed (%s); retry %d/%d in %.2fs",
+                    stage, name, exc, attempt, policy.max_attempts - 1, wait,
+                )
+                metrics.incr("llm.retry.retries")
+                await asyncio.sleep(wait)
+        metrics.incr("llm.retry.exhausted")
+        raise LLMUnavailableError(f"{stage}: no model answered ({last_exc})") from last_exc
+
+    async def _hedged(
+        self,
+        stage: str,
+        name: str,
+        model: genai.GenerativeModel,
+        prompt: Any,
+        preferred: Optional[str],
+        generation_config: Optional[Dict[str, Any]],
+        call_timeout: float,
+        deadline_bound: bool,
+    ) -> Tuple[Any, str]:
+        """One `generate_resilient` attempt raced by `hedger` -> (response, model that answered)."""
+
+        async def primary() -> Tuple[Any, str]:
+            resp = await self.generate(
+                stage, model, prompt, generation_config=generation_config,
+                timeout=call_timeout, deadline_bound=deadline_bound,
+            )
+            return resp, name
+
+        async def hedge(waited: float) -> Tuple[Any, str]:
+            hedge_name, hedge_model = self._hedge_target(name, model, preferred)
+            resp = await self.generate(
+                stage, hedge_model, prompt,
+                generation_config=generation_config, timeout=max(0.0, call_timeout - waited),
+                deadline_bound=deadline_bound,
+            )
+            return resp, hedge_name
+
+        return await hedger.run(stage, primary, hedge)
+
+    def generate_sync(
+        self,
+        stage: str,
+        model: genai.GenerativeModel,
+        prompt: Any,
+        *,
+        generation_config: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """Blocking variant for callers without an event loop (scripts, worker threads)."""
+        with self._sync_slot(stage, model):
+            return model.generate_content(prompt, generation_config=generation_config)
+
+
+llm_client = LLMClient(_parse_limits(Config.LLM_STAGE_LIMITS), Config.LLM_DEFAULT_LIMIT)
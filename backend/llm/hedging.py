@@ -0,0 +1,173 @@
+"""
+Hedged LLM requests: cut tail latency by racing a second call against a slow one.
+
+If the primary call has not answered after the LLM_HEDGE_PERCENTILE latency
+of that stage's recent calls, a second request is fired (to the
+same model, or the next one in the fallback chain with LLM_HEDGE_NEXT_MODEL)
+and whichever answers first wins; the other is cancelled. Hedges are
+throttled by a token bucket that earns LLM_HEDGE_MAX_RATIO tokens per
+primary call, so hedging can never add more than that share of extra load.
+Opt-in via LLM_HEDGE_ENABLED, for the stages in LLM_HEDGE_STAGES.
+
+Metrics: llm.hedge.{eligible,fired,throttled} counters, llm.hedge.won (the
+hedge answered first) and llm.hedge.lost (the primary still won, so the hedge
+was pure extra cost), and the llm.hedge.cost_ratio (fired / eligible) and
+llm.hedge.<stage>.delay_ms gauges.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import threading
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from config import Config
+from observability.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies (seconds) per stage."""
+
+    def __init__(self, window: int, min_samples: int) -> None:
+        self._window = max(1, window)
+        self._min_samples = max(1, min_samples)
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            buf = self._samples.get(stage)
+            if buf is None:
+                buf = self._samples[stage] = deque(maxlen=self._window)
+            buf.append(seconds)
+
+    def percentile(self, stage: str, pct: float) -> Optional[float]:
+        """Nearest-rank percentile, or None until the stage has `min_samples` samples."""
+        with self._lock:
+            buf = self._samples.get(stage)
+            if buf is None or len(buf) < self._min_samples:
+                return None
+            ordered = sorted(buf)
+        rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+        return ordered[min(rank, len(ordered)) - 1]
+
+
+class HedgeBudget:
+    """Token bucket: each primary call earns `ratio` tokens (up to `burst`); a hedge spends one."""
+
+    def __init__(self, ratio: float, burst: float) -> None:
+        self._ratio = max(0.0, ratio)
+        self._burst = max(1.0, burst)
+        self._tokens = self._burst
+        self._lock = threading.Lock()
+
+    def earn(self) -> None:
+        with self._lock:
+            self._tokens = min(self._burst, self._tokens + self._ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+
+class Hedger:
+    """Runs a call, racing a hedge against it once it outlives the stage's latency percentile."""
+
+    def __init__(
+        self,
+        percentile: float = Config.LLM_HEDGE_PERCENTILE,
+        min_delay_s: float = Config.LLM_HEDGE_MIN_DELAY_SECONDS,
+        max_ratio: float = Config.LLM_HEDGE_MAX_RATIO,
+        window: int = Config.LLM_HEDGE_WINDOW,
+        min_samples: int = Config.LLM_HEDGE_MIN_SAMPLES,
+    ) -> None:
+        self.latency = LatencyTracker(window, min_samples)
+        self._percentile = percentile
+        self._min_delay_s = max(0.0, min_delay_s)
+        self._budget = HedgeBudget(max_ratio, burst=Config.LLM_HEDGE_BURST)
+        metrics.register_gauge("llm.hedge.cost_ratio", self._cost_ratio)
+
+    @staticmethod
+    def _cost_ratio() -> float:
+        eligible = metrics.counter("llm.hedge.eligible")
+        return round(metrics.counter("llm.hedge.fired") / eligible, 4) if eligible else 0.0
+
+    def enabled(self, stage: str) -> bool:
+        return Config.LLM_HEDGE_ENABLED and stage in Config.LLM_HEDGE_STAGES
+
+    def delay(self, stage: str) -> Optional[float]:
+        """How long the primary may run before a hedge is fired; None while there is too little history."""
+        p = self.latency.percentile(stage, self._percentile)
+        return None if p is None else max(self._min_delay_s, p)
+
+    async def run(
+        self,
+        stage: str,
+        primary: Callable[[], Awaitable[T]],
+        hedge: Callable[[float], Awaitable[T]],
+    ) -> T:
+        """
+        Await `primary()`; past `delay(stage)` also start `hedge(elapsed_s)` and
+        return the first successful result (the loser is cancelled). If both
+        fail, the primary's error is raised.
+        """
+        metrics.incr("llm.hedge.eligible")
+        self._budget.earn()
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        delay = self.delay(stage)
+        first = asyncio.ensure_future(primary())
+        second: Optional["asyncio.Future[T]"] = None
+        try:
+            if delay is not None:
+                metrics.set_gauge(f"llm.hedge.{stage}.delay_ms", round(delay * 1000.0, 1))
+                await asyncio.wait({first}, timeout=delay)
+                if not first.done():
+                    if self._budget.try_spend():
+                        metrics.incr("llm.hedge.fired")
+                        second = asyncio.ensure_future(hedge(delay))
+                    else:
+                        metrics.incr("llm.hedge.throttled")
+            if second is None:
+                result = await first
+            else:
+                result = await self._first_success(first, second)
+            # A primary that lost the race took at least this long (a censored sample)
+            self.latency.record(stage, loop.time() - t0)
+            return result
+        finally:
+            for task in (first, second):
+                _settle(task)
+
+    @staticmethod
+    async def _first_success(first: "asyncio.Future[T]", second: "asyncio.Future[T]") -> T:
+        pending = {first, second}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    metrics.incr("llm.hedge.won" if task is second else "llm.hedge.lost")
+                    return task.result()
+        return first.result()  # both failed: raises the primary's error
+
+
+def _settle(task: Optional["asyncio.Future[T]"]) -> None:
+    """Cancel a still-running loser; mark a finished one's error as retrieved."""
+    if task is None:
+        return
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled():
+        task.exception()
+
+
+hedger = Hedger()
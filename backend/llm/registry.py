@@ -0,0 +1,128 @@
+"""
+Process-wide Gemini model handles and the fallback chain they are picked from.
+
+Each `GenerativeModel` is built once and shared. Names that turn out not to
+exist for this API key (404 / "model not found") are kept in a negative
+cache for LLM_MODEL_RETRY_SECONDS, so callers skip straight to the next live
+model instead of re-probing a dead one on every request; once the entry
+expires the next caller tries that model again.
+
+Metrics: llm.models.{marked_unavailable,reprobed} counters and the
+llm.models.unavailable gauge.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import google.generativeai as genai
+
+from config import Config
+from observability.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+MODEL_FALLBACK_CHAIN: Tuple[str, ...] = (
+    "gemini-2.5-flash",
+    "gemini-2.0-flash",
+    "gemini-pro-latest",
+    "gemini-pro",
+)
+
+
+def model_name_of(model: Any) -> str:
+    """Short name of a model handle ("models/gemini-2.5-flash" -> "gemini-2.5-flash")."""
+    name = str(getattr(model, "model_name", "") or "")
+    return name[len("models/"):] if name.startswith("models/") else name
+
+
+def is_missing_model(exc: BaseException) -> bool:
+    """True if `exc` says the model itself is unknown or unsupported (not a transient failure)."""
+    if getattr(exc, "code", None) == 404:
+        return True
+    msg = str(exc).lower()
+    return "model" in msg and ("not found" in msg or "not supported" in msg)
+
+
+class ModelRegistry:
+    """Shared model handles plus a TTL'd record of which chain entries are unavailable."""
+
+    def __init__(
+        self,
+        chain: Tuple[str, ...] = MODEL_FALLBACK_CHAIN,
+        unavailable_ttl: float = Config.LLM_MODEL_RETRY_SECONDS,
+    ) -> None:
+        self._chain = tuple(chain)
+        self._ttl = max(0.0, unavailable_ttl)
+        self._lock = threading.Lock()
+        self._handles: Dict[str, genai.GenerativeModel] = {}
+        self._down: Dict[str, float] = {}  # name -> monotonic time it may be tried again
+        self._chains: Dict[Optional[str], Tuple[str, ...]] = {}
+        metrics.register_gauge("llm.models.unavailable", lambda: len(self._down))
+
+    def chain(self, preferred: Optional[str] = None) -> Tuple[str, ...]:
+        """`preferred` (if any) followed by the fallback chain, without duplicates."""
+        cached = self._chains.get(preferred)
+        if cached is None:
+            names = ((preferred,) if preferred else ()) + self._chain
+            cached = self._chains[preferred] = tuple(dict.fromkeys(names))
+        return cached
+
+    def handle(self, name: str) -> genai.GenerativeModel:
+        """The shared handle for `name`, built on first use."""
+        with self._lock:
+            model = self._handles.get(name)
+            if model is None:
+                model = self._handles[name] = genai.GenerativeModel(name)
+            return model
+
+    def available(self, name: str) -> bool:
+        with self._lock:
+            until = self._down.get(name)
+            if until is None:
+                return True
+            if time.monotonic() < until:
+                return False
+            del self._down[name]
+        metrics.incr("llm.models.reprobed")
+        return True
+
+    def resolve(
+        self,
+        preferred: Optional[str] = None,
+        accept: Optional[Callable[[str], bool]] = None,
+    ) -> Optional[Tuple[str, genai.GenerativeModel]]:
+        """
+        First available (name, handle) in `chain(preferred)` that also passes
+        `accept` (if given); None if every entry is down.
+        """
+        for name in self.chain(preferred):
+            if not self.available(name) or (accept is not None and not accept(name)):
+                continue
+            try:
+                return name, self.handle(name)
+            except Exception as exc:  # noqa: BLE001
+                self.mark_unavailable(name, exc)
+        return None
+
+    def mark_unavailable(self, name: str, reason: Any = "") -> None:
+        with self._lock:
+            self._down[name] = time.monotonic() + self._ttl
+        metrics.incr("llm.models.marked_unavailable")
+        logger.warning("Model '%s' unavailable for %.0fs: %s", name, self._ttl, reason)
+
+    def mark_available(self, name: str) -> None:
+        with self._lock:
+            self._down.pop(name, None)
+
+    def note_failure(self, name: str, exc: BaseException) -> bool:
+        """Record a failed call; returns True if `name` was taken out of rotation."""
+        if name and is_missing_model(exc):
+            self.mark_unavailable(name, exc)
+            return True
+        return False
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,213 @@
+"""
+Failure handling for LLM calls: error classification, a jittered retry policy
+bounded by a time budget, and per-model circuit breakers.
+
+Only transient provider failures (429, 5xx, timeouts, dropped connections)
+are retried, and they count against the model's breaker. After
+LLM_BREAKER_FAILURES consecutive transient failures the breaker opens: calls
+to that model fail fast with `CircuitOpenError` for LLM_BREAKER_RESET_SECONDS,
+so callers move straight to the next model or to their static fallback. Then
+a single probe call is let through (half-open); its outcome closes or reopens
+the breaker.
+
+Metrics: llm.breaker.<model>.state gauge (0 closed, 1 half-open, 2 open) and
+llm.breaker.<model>.{opened,rejected} counters.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, Optional
+
+from config import Config
+from observability.metrics import metrics
+
+from .registry import is_missing_model
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(RuntimeError):
+    """The model's breaker is open (or its half-open probe is in flight)."""
+
+
+class LLMUnavailableError(RuntimeError):
+    """Every attempt allowed by the retry policy failed; `__cause__` is the last error."""
+
+
+class ErrorKind(str, Enum):
+    RETRY = "retry"            # transient: back off and try again (same or next model)
+    NEXT_MODEL = "next_model"  # this model cannot serve the call: move on without waiting
+    FATAL = "fatal"            # the request itself is rejected (safety block, 400): stop
+
+
+_RETRY_GRPC_CODES = {"RESOURCE_EXHAUSTED", "UNAVAILABLE", "DEADLINE_EXCEEDED", "INTERNAL", "ABORTED"}
+_FATAL_EXCEPTIONS = {"BlockedPromptException", "StopCandidateException", "InvalidArgument"}
+_RETRY_HINTS = ("429", "quota", "rate limit", "unavailable", "overloaded", "deadline", "timed out", "503", "500")
+
+
+def classify_error(exc: BaseException) -> ErrorKind:
+    """Map an exception from the SDK (or from asyncio) to what the caller should do next."""
+    if isinstance(exc, CircuitOpenError) or is_missing_model(exc):
+        return ErrorKind.NEXT_MODEL
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return ErrorKind.RETRY
+    if type(exc).__name__ in _FATAL_EXCEPTIONS:
+        return ErrorKind.FATAL
+    code: Any = getattr(exc, "code", None)
+    if callable(code):  # raw grpc.aio errors expose code() -> StatusCode
+        try:
+            code = code()
+        except Exception:  # noqa: BLE001
+            code = None
+    if isinstance(code, int):
+        return ErrorKind.RETRY if code in (408, 429) or code >= 500 else ErrorKind.FATAL
+    if code is not None and getattr(code, "name", "") in _RETRY_GRPC_CODES:
+        return ErrorKind.RETRY
+    msg = str(exc).lower()
+    if any(hint in msg for hint in _RETRY_HINTS):
+        return ErrorKind.RETRY
+    return ErrorKind.FATAL
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Attempt cap, full-jitter exponential backoff, and a wall-clock budget for all attempts."""
+    max_attempts: int = Config.LLM_RETRY_ATTEMPTS
+    base_s: float = Config.LLM_RETRY_BASE_SECONDS
+    max_backoff_s: float = Config.LLM_RETRY_MAX_BACKOFF_SECONDS
+    budget_s: float = Config.LLM_RETRY_BUDGET_SECONDS
+
+    def backoff(self, attempt: int) -> float:
+        """Sleep before attempt `attempt + 1`: uniform in [0, min(max, base * 2^(attempt-1))]."""
+        return random.uniform(0.0, min(self.max_backoff_s, self.base_s * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one model."""
+
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, name: str, failure_threshold: int, reset_s: float) -> None:
+        self.name = name
+        self._threshold = max(1, failure_threshold)
+        self._reset_s = max(0.0, reset_s)
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._state = self.CLOSED
+        self._probing = False
+        metrics.register_gauge(f"llm.breaker.{name}.state", lambda: self.state)
+
+    @property
+    def state(self) -> int:
+        with self._lock:
+            return self._current()
+
+    def _current(self) -> int:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self._reset_s:
+            self._state = self.HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected outright (a free half-open probe slot counts as usable)."""
+        with self._lock:
+            state = self._current()
+            return state == self.OPEN or (state == self.HALF_OPEN and self._probing)
+
+    def before_call(self) -> None:
+        """Admit a call or raise `CircuitOpenError`; in half-open state only one probe is admitted."""
+        with self._lock:
+            state = self._current()
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            if state == self.CLOSED:
+                return
+        metrics.incr(f"llm.breaker.{self.name}.rejected")
+        raise CircuitOpenError(f"circuit open for model '{self.name}'")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("Circuit for model '%s' closed", self.name)
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == self.OPEN:
+                return
+            if self._state == self.HALF_OPEN or self._failures >= self._threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                opened = True
+            else:
+                opened = False
+        if opened:
+            metrics.incr(f"llm.breaker.{self.name}.opened")
+            logger.warning(
+                "Circuit for model '%s' opened after %d failures; retry in %.0fs",
+                self.name, self._failures, self._reset_s,
+            )
+
+    def release(self) -> None:
+        """Give back a half-open probe slot without an outcome (e.g. the call was cancelled)."""
+        with self._lock:
+            self._probing = False
+
+
+class BreakerBoard:
+    """One `CircuitBreaker` per model name, created on first use."""
+
+    def __init__(
+        self,
+        failure_threshold: int = Config.LLM_BREAKER_FAILURES,
+        reset_s: float = Config.LLM_BREAKER_RESET_SECONDS,
+    ) -> None:
+        self._threshold = failure_threshold
+        self._reset_s = reset_s
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(name, self._threshold, self._reset_s)
+            return breaker
+
+    def allows(self, name: str) -> bool:
+        return not self.get(name).is_open()
+
+    def states(self) -> Dict[str, int]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {b.name: b.state for b in breakers}
+
+    def record(self, name: str, exc: Optional[BaseException]) -> None:
+        """
+        Feed a call outcome. Transient failures count against the breaker; a
+        success or a request-level rejection (the provider answered) closes it;
+        a missing model is left to the model registry.
+        """
+        breaker = self.get(name)
+        kind = None if exc is None else classify_error(exc)
+        if kind is ErrorKind.RETRY:
+            breaker.record_failure()
+        elif kind is ErrorKind.NEXT_MODEL:
+            breaker.release()
+        else:
+            breaker.record_success()
+
+
+breakers = BreakerBoard()
@@ -1,4 +1,5 @@
 """Request timing and lightweight LLM call observability."""
+from .metrics import MetricsRegistry, metrics
 from .request_metrics import RequestTimingMiddleware, estimate_tokens
 
-__all__ = ["RequestTimingMiddleware", "estimate_tokens"]
+__all__ = ["MetricsRegistry", "RequestTimingMiddleware", "estimate_tokens", "metrics"]
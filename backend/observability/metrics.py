@@ -0,0 +1,51 @@
+"""In-process counters and gauges (caches, pools, breakers); exposed as JSON at GET /metrics."""
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsRegistry:
+    """Thread-safe named counters plus gauges (static values or callables read on snapshot)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._gauge_fns: Dict[str, Callable[[], Any]] = {}
+
+    def incr(self, name: str, value: float = 1.0) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0.0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def register_gauge(self, name: str, fn: Callable[[], Any]) -> None:
+        """Gauge computed lazily (e.g. current cache size) each time metrics are read."""
+        with self._lock:
+            self._gauge_fns[name] = fn
+
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0.0)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges: Dict[str, Any] = dict(self._gauges)
+            fns = dict(self._gauge_fns)
+        for name, fn in fns.items():
+            try:
+                gauges[name] = fn()
+            except Exception as exc:  # noqa: BLE001
+                logger.debug("Gauge %s failed: %s", name, exc)
+        return {"counters": counters, "gauges": gauges}
+
+
+# Process-wide registry
+metrics = MetricsRegistry()
@@ -1,4 +1,4 @@
 """LangGraph + CrewAI multi-agent mental-health orchestration."""
-from .orchestrator_service import run_langgraph_pipeline
+from .orchestrator_service import arun_langgraph_pipeline, run_langgraph_pipeline
 
-__all__ = ["run_langgraph_pipeline"]
+__all__ = ["arun_langgraph_pipeline", "run_langgraph_pipeline"]
@@ -1,95 +1,213 @@
 """
 CrewAI: specialized agents (emotion framing + CBT focus) with Gemini via LiteLLM.
 Falls back to an empty string if Crew is disabled or the stack is unavailable.
+
+The LLM, agents, tasks and crews are built once per process (`get_crew_factory`);
+each call only passes the user text through task templating. CREW_MODE=lite skips
+the crew and asks Gemini for both lines in a single request through the shared
+async LLM client (stage "crew"); it needs neither CrewAI nor LiteLLM.
 """
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
-from typing import Any
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
 
 from config import Config
+from llm import llm_client
 
 logger = logging.getLogger(__name__)
 
+_factory: Optional["CrewFactory"] = None
+_factory_failed = False
+_factory_lock = threading.Lock()
+# Dedicated, bounded pool for blocking crew kickoffs (one thread per pooled crew), so slow
+# crews never occupy asyncio's default executor, which RAG and off-loop LLM calls share
+_executor = ThreadPoolExecutor(max_workers=max(1, Config.CREW_POOL_SIZE), thread_name_prefix="crew")
+
+_LITE_PROMPT = (
+    "You support a mental-health assistant; you never diagnose.\n"
+    "User message:\n\"{user_text}\"\n\n"
+    "Output exactly three short plain-text lines, no JSON, no labels:\n"
+    "line 1 = emotional tone / needs; line 2 = what would help them feel heard;\n"
+    "line 3 = ONE CBT-consistent micro-technique the main assistant can weave in."
+)
+
 
 def _gemini_crew() -> bool:
     return bool((Config.GEMINI_API_KEY or "").strip())
 
 
-def run_crew_assessment(user_text: str, crisis_level: int) -> str:
+def _crew_model_name() -> str:
+    # LiteLLM-style provider path used by Crew against Gemini
+    return f"gemini/{Config.GEMINI_MODEL_NAME.split('/')[-1]}"
+
+
+class CrewFactory:
     """
-    Run a tiny sequential crew: (1) emotional tone/summary, (2) one CBT angle.
+    Warm, thread-safe CrewAI objects shared by all requests.
+
+    Crew.kickoff mutates its tasks' outputs, so concurrent callers each borrow a
+    prebuilt crew from a small pool (CREW_POOL_SIZE) and return it afterwards.
     """
+
+    def __init__(self, pool_size: int) -> None:
+        from crewai import LLM
+
+        key = (Config.GEMINI_API_KEY or "").strip()
+        for env_key in ("GEMINI_API_KEY", "GOOGLE_API_KEY", "GOOGLE_GEMINI_API_KEY"):
+            os.environ.setdefault(env_key, key or "")
+        self._llm = LLM(model=_crew_model_name(), api_key=key)
+        self._size = max(1, pool_size)
+        self._pool: "queue.Queue[Any]" = queue.Queue()
+        for _ in range(self._size):
+            self._pool.put(self._build_crew())
+
+    def _build_crew(self) -> Any:
+        from crewai import Agent, Crew, Process, Task
+
+        agent_emotion = Agent(
+            role="Emotion analyst",
+            goal="Describe the user’s likely emotional need in 2 short lines (no advice).",
+            backstory="You are precise and compassionate; you never diagnose.",
+            llm=self._llm,
+            allow_delegation=False,
+        )
+        agent_cbt = Agent(
+            role="CBT coach (informational)",
+            goal="Propose one evidence-based CBT micro-step appropriate to the message (1–2 sentences).",
+            backstory="You only suggest CBT ideas; you are not a replacement for a clinician.",
+            llm=self._llm,
+            allow_delegation=False,
+        )
+        # {user_text} is filled per call by crew.kickoff(inputs=...)
+        t1 = Task(
+            description=(
+                "User message:\n\"{user_text}\"\n\n"
+                "Output exactly two short lines: line 1 = emotional tone / needs; line 2 = what would help them feel heard."
+            ),
+            expected_output="Two plain-text lines, no JSON.",
+            agent=agent_emotion,
+        )
+        t2 = Task(
+            description=(
+                "User message (same as before):\n\"{user_text}\"\n\n"
+                "Offer ONE CBT-consistent micro-technique the main assistant can weave in (1–2 sentences; not a list). "
+            ),
+            expected_output="One or two sentences.",
+            agent=agent_cbt,
+        )
+        return Crew(
+            agents=[agent_emotion, agent_cbt],
+            tasks=[t1, t2],
+            process=Process.sequential,
+            verbose=False,
+        )
+
+    def kickoff(self, user_text: str, wait_s: float) -> str:
+        """Run a pooled crew; returns "" if none frees up within `wait_s`."""
+        try:
+            crew = self._pool.get(timeout=wait_s)
+        except queue.Empty:
+            logger.info("All %d warm crews busy; skipping Crew notes", self._size)
+            return ""
+        try:
+            out: Any = crew.kickoff(inputs={"user_text": _sanitize(user_text)})
+        finally:
+            self._pool.put(crew)
+        return str(getattr(out, "raw", None) or out)
+
+
+def _sanitize(user_text: str) -> str:
+    # Braces would be read as template fields by CrewAI's input interpolation
+    return (user_text or "")[:2000].replace("{", "(").replace("}", ")")
+
+
+def get_crew_factory() -> Optional[CrewFactory]:
+    """Build the process-wide factory once; None if Crew is disabled or unavailable."""
+    global _factory, _factory_failed
+    if _factory is not None or _factory_failed:
+        return _factory
     if not _gemini_crew() or not Config.CREW_ENABLED:
-        return ""
-    if crisis_level >= 2:
-        # Crisis path already uses crisis tools; keep crew very light
-        return ""
+        return None
+    with _factory_lock:
+        if _factory is None and not _factory_failed:
+            try:
+                _factory = CrewFactory(Config.CREW_POOL_SIZE)
+            except Exception as exc:
+                logger.warning("CrewAI unavailable: %s", exc)
+                _factory_failed = True
+    return _factory
 
+
+def _lite_prompt(user_text: str) -> str:
+    return _LITE_PROMPT.format(user_text=_sanitize(user_text))
+
+
+def _lite_model() -> Any:
+    picked = llm_client.resolve(Config.GEMINI_MODEL_NAME)
+    return picked[1] if picked else None
+
+
+def _lite_text(resp: Any) -> str:
     try:
-        from crewai import LLM, Agent, Task, Crew, Process
-    except Exception as exc:
-        logger.debug("CrewAI not importable: %s", exc)
+        return resp.text or ""
+    except Exception:  # blocked / empty candidates
         return ""
 
-    # LiteLLM-style provider path used by Crew against Gemini
-    model_name = f"gemini/{Config.GEMINI_MODEL_NAME.split('/')[-1] if '/' in Config.GEMINI_MODEL_NAME else Config.GEMINI_MODEL_NAME}"
-    key = (Config.GEMINI_API_KEY or "").strip()
-    for env_key in ("GEMINI_API_KEY", "GOOGLE_API_KEY", "GOOGLE_GEMINI_API_KEY"):
-        os.environ.setdefault(env_key, key or "")
 
+def _crew_enabled(crisis_level: int) -> bool:
+    # Crisis path already uses crisis tools; keep crew very light
+    return _gemini_crew() and Config.CREW_ENABLED and crisis_level < 2
+
+
+def _clip(text: Any) -> str:
+    text = str(text or "").strip()
+    return text[:2000] if text else ""
+
+
+def run_crew_assessment(user_text: str, crisis_level: int) -> str:
+    """
+    Run a tiny sequential crew: (1) emotional tone/summary, (2) one CBT angle.
+    """
+    if not _crew_enabled(crisis_level):
+        return ""
     try:
-        llm = LLM(
-            model=model_name,
-            api_key=key,
-        )
+        if Config.CREW_MODE == "lite":
+            model = _lite_model()
+            if model is None:
+                return ""
+            return _clip(_lite_text(llm_client.generate_sync("crew", model, _lite_prompt(user_text))))
+        factory = get_crew_factory()
+        if factory is None:
+            return ""
+        return _clip(factory.kickoff(user_text, wait_s=Config.CREW_TIMEOUT_SECONDS))
     except Exception as exc:
-        logger.warning("Crew LLM init failed: %s", exc)
+        logger.warning("Crew run failed: %s", exc)
         return ""
 
-    agent_emotion = Agent(
-        role="Emotion analyst",
-        goal="Describe the user\u2019s likely emotional need in 2 short lines (no advice).",
-        backstory="You are precise and compassionate; you never diagnose.",
-        llm=llm,
-        allow_delegation=False,
-    )
-    agent_cbt = Agent(
-        role="CBT coach (informational)",
-        goal="Propose one evidence-based CBT micro-step appropriate to the message (1\u20132 sentences).",
-        backstory="You only suggest CBT ideas; you are not a replacement for a clinician.",
-        llm=llm,
-        allow_delegation=False,
-    )
-    t1 = Task(
-        description=(
-            f"User message:\n\"{user_text[:2000]}\"\n\n"
-            "Output exactly two short lines: line 1 = emotional tone / needs; line 2 = what would help them feel heard."
-        ),
-        expected_output="Two plain-text lines, no JSON.",
-        agent=agent_emotion,
-    )
-    t2 = Task(
-        description=(
-            f"User message (same as before):\n\"{user_text[:2000]}\"\n\n"
-            "Offer ONE CBT-consistent micro-technique the main assistant can weave in (1\u20132 sentences; not a list). "
-        ),
-        expected_output="One or two sentences.",
-        agent=agent_cbt,
-    )
+
+async def arun_crew_assessment(user_text: str, crisis_level: int) -> str:
+    """
+    Async `run_crew_assessment`. Lite mode awaits the shared LLM client; the
+    full crew still runs CrewAI (and its LiteLLM calls) on the crew's own
+    thread pool. Calls beyond CREW_POOL_SIZE queue there, and a caller that
+    times out drops its queued call.
+    """
+    if not _crew_enabled(crisis_level):
+        return ""
+    if Config.CREW_MODE != "lite":
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, run_crew_assessment, user_text, crisis_level)
+    model = _lite_model()
+    if model is None:
+        return ""
     try:
-        crew = Crew(
-            agents=[agent_emotion, agent_cbt],
-            tasks=[t1, t2],
-            process=Process.sequential,
-            verbose=False,
-        )
-        out: Any = crew.kickoff()
-        text = str(getattr(out, "raw", None) or out)
-        if not (text and text.strip()):
-            return ""
-        return text.strip()[:2000]
+        return _clip(_lite_text(await llm_client.generate("crew", model, _lite_prompt(user_text))))
     except Exception as exc:
         logger.warning("Crew run failed: %s", exc)
         return ""
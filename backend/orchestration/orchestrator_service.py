@@ -1,16 +1,20 @@
 """
-LangGraph pipeline: triage (guardrails) -> optional Crew (emotion/CBT) -> RAG -> Agentic generation.
+LangGraph pipeline: triage (guardrails) -> [optional Crew (emotion/CBT) || RAG] -> Agentic generation.
+Crew and RAG run as parallel branches, each under its own time budget, joined before synthesis.
+Branch budgets are also cut to fit the turn's deadline (state["deadline"]), keeping the reply's reserve.
 Crisis levels HIGH/IMMINENT take a fast crisis pathway with hotlines + safety content.
 """
 from __future__ import annotations
 
+import asyncio
 import logging
 import time
 import uuid
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, TypedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, TypedDict, Union
 
 from config import Config
+from deadline import Deadline, deadline_of, with_deadline
 
 logger = logging.getLogger(__name__)
 
@@ -27,25 +31,46 @@ class GraphState(TypedDict, total=False):
     rag_context: str
     result: Dict[str, Any]
     t0: float
+    triage_ms: float
+    crew_ms: float
+    rag_ms: float
+    crew_timed_out: bool
+    rag_timed_out: bool
+    crew_skipped: bool
+    rag_skipped: bool
+    deadline: Deadline  # whole-turn budget, also in extra["deadline"] for the agent
 
 
-def _route_after_triage(st: GraphState) -> str:
+def _route_after_triage(st: GraphState) -> Union[str, List[str]]:
     cl = int(st.get("crisis_level", 0) or 0)
     if cl >= 3:  # HIGH (3) or IMMINENT (4)
         return "crisis"
-    return "crew"
+    return ["crew", "rag"]  # fan out; joined at synthesize
 
 
 def _node_triage(st: GraphState) -> Dict[str, Any]:
     from agent_service import assess_crisis_text
 
     t0 = st.get("t0", time.perf_counter())
+    t1 = time.perf_counter()
     return {
         "crisis_level": assess_crisis_text(st.get("user_input", "")),
         "t0": t0,
+        "triage_ms": (time.perf_counter() - t1) * 1000.0,
     }
 
 
+async def _within_budget(fn: Any, budget_s: float, *args: Any) -> Tuple[Any, bool]:
+    """
+    Run blocking `fn` off-loop for at most `budget_s` seconds -> (result, timed_out).
+    A timed-out call keeps running in its worker thread, but the graph no longer waits for it.
+    """
+    try:
+        return await asyncio.wait_for(asyncio.to_thread(fn, *args), timeout=budget_s), False
+    except asyncio.TimeoutError:
+        return None, True
+
+
 def _node_crisis(st: GraphState) -> Dict[str, Any]:
     from agent_service import ToolRegistry
 
@@ -85,47 +110,78 @@ def _node_crisis(st: GraphState) -> Dict[str, Any]:
     }
 
 
-def _node_crew(st: GraphState) -> Dict[str, Any]:
+def _branch_budget(st: GraphState, cap: float) -> float:
+    """
+    Budget for an optional branch: `cap`, shortened so the reply keeps its
+    reserve of the turn deadline; 0.0 means skip the branch.
+    """
+    deadline = st.get("deadline")
+    if deadline is None:
+        return cap
+    return deadline.optional_budget(cap, reserve=Config.DEADLINE_RESPONSE_RESERVE_SECONDS)
+
+
+async def _node_crew(st: GraphState) -> Dict[str, Any]:
     if not Config.CREW_ENABLED or int(st.get("crisis_level", 0) or 0) >= 2:
         return {"crew_notes": ""}
+    budget = _branch_budget(st, Config.CREW_TIMEOUT_SECONDS)
+    if budget == 0.0:
+        return {"crew_notes": "", "crew_skipped": True}
     t1 = time.perf_counter()
-    from .crew_assessment import run_crew_assessment
+    from .crew_assessment import arun_crew_assessment
 
-    notes = run_crew_assessment(
-        st.get("user_input", ""),
-        int(st.get("crisis_level", 0) or 0),
-    )
+    notes, timed_out = "", False
+    try:
+        notes = await asyncio.wait_for(
+            arun_crew_assessment(st.get("user_input", ""), int(st.get("crisis_level", 0) or 0)),
+            timeout=budget,
+        )
+    except asyncio.TimeoutError:
+        timed_out = True
+    if timed_out:
+        logger.info("Crew branch exceeded %.1fs budget; skipped", budget)
     return {
         "crew_notes": notes or "",
         "crew_ms": (time.perf_counter() - t1) * 1000.0,
+        "crew_timed_out": timed_out,
     }
 
 
-def _node_rag(st: GraphState) -> Dict[str, Any]:
-    if not Config.RAG_ENABLED:
-        return {"rag_context": ""}
-    t1 = time.perf_counter()
+def _rag_retrieve(st: GraphState) -> str:
     from rag.vector_store import get_rag_index
 
     idx = get_rag_index()
     if not idx:
-        return {"rag_context": ""}
+        return ""
     ex = st.get("extra") or {}
     sid = st.get("session_id") or (ex.get("session_id") if isinstance(ex, dict) else None) or "anon"
-    ctx = idx.retrieve(
+    return idx.retrieve(
         str(sid),
         st.get("user_input", "") or "",
         k=3,
     )
+
+
+async def _node_rag(st: GraphState) -> Dict[str, Any]:
+    if not Config.RAG_ENABLED:
+        return {"rag_context": ""}
+    budget = _branch_budget(st, Config.RAG_TIMEOUT_SECONDS)
+    if budget == 0.0:
+        return {"rag_context": "", "rag_skipped": True}
+    t1 = time.perf_counter()
+    ctx, timed_out = await _within_budget(_rag_retrieve, budget, st)
+    if timed_out:
+        logger.info("RAG branch exceeded %.1fs budget; skipped", budget)
     return {
         "rag_context": ctx or "",
         "rag_ms": (time.perf_counter() - t1) * 1000.0,
+        "rag_timed_out": timed_out,
     }
 
 
-def _node_synthesize(st: GraphState) -> Dict[str, Any]:
-    t1 = time.perf_counter()
-    from agent_service import AgenticChatService
+def _synthesis_agent(st: GraphState) -> Tuple[Any, Dict[str, Any]]:
+    """Per-session agent + extra context (RAG/Crew blocks) for the synthesize step."""
+    from agent_service import AgenticChatService, session_agents
 
     ex = dict(st.get("extra") or {}) if isinstance(st.get("extra"), dict) else {}
     sid = st.get("session_id") or ex.get("session_id")
@@ -134,15 +190,12 @@ def _node_synthesize(st: GraphState) -> Dict[str, Any]:
     ex["retrieval_context"] = (st.get("rag_context", "") or "")[:8000]
     ex["crew_notes"] = (st.get("crew_notes", "") or "")[:4000]
 
-    chat = AgenticChatService(session_id=sid)
-    raw = chat.generate(
-        st.get("user_input", "") or "",
-        st.get("history") or [],
-        extra_context=ex,
-    )
-    if not raw:
-        raise RuntimeError("Empty agent generate result")
-    gen_ms = (time.perf_counter() - t1) * 1000.0
+    # Real sessions reuse cached per-session state; anonymous turns stay ephemeral
+    chat = session_agents.get(sid) if ex.get("session_id") else AgenticChatService(session_id=sid)
+    return chat, ex
+
+
+def _with_synthesis_meta(st: GraphState, raw: Dict[str, Any], gen_ms: float) -> Dict[str, Any]:
     t0 = st.get("t0", time.perf_counter())
     total_ms = (time.perf_counter() - t0) * 1000.0
     om = (raw.get("orchestration_meta") or {}) if isinstance(raw.get("orchestration_meta"), dict) else {}
@@ -154,9 +207,34 @@ def _node_synthesize(st: GraphState) -> Dict[str, Any]:
         "graph_total_ms": round(total_ms, 2),
         "crew_ran": bool((st.get("crew_notes") or "").strip()),
         "rag_hits": bool((st.get("rag_context") or "").strip()),
+        "crew_timed_out": bool(st.get("crew_timed_out")),
+        "rag_timed_out": bool(st.get("rag_timed_out")),
+        "crew_skipped": bool(st.get("crew_skipped")),
+        "rag_skipped": bool(st.get("rag_skipped")),
+        "deadline_left_ms": round(st["deadline"].remaining() * 1000, 1) if st.get("deadline") else None,
+        "node_ms": {
+            "triage": round(float(st.get("triage_ms", 0.0) or 0.0), 2),
+            "crew": round(float(st.get("crew_ms", 0.0) or 0.0), 2),
+            "rag": round(float(st.get("rag_ms", 0.0) or 0.0), 2),
+            "synthesize": round(gen_ms, 2),
+        },
         **om,
     }
-    return {"result": raw}
+    return raw
+
+
+async def _node_synthesize(st: GraphState) -> Dict[str, Any]:
+    t1 = time.perf_counter()
+    chat, ex = _synthesis_agent(st)
+    raw = await chat.agenerate_from_history(
+        st.get("user_input", "") or "",
+        st.get("history") or [],
+        extra_context=ex,
+    )
+    if not raw:
+        raise RuntimeError("Empty agent generate result")
+    gen_ms = (time.perf_counter() - t1) * 1000.0
+    return {"result": _with_synthesis_meta(st, raw, gen_ms)}
 
 
 def _build_graph() -> Any:
@@ -169,10 +247,11 @@ def _build_graph() -> Any:
     g.add_node("rag", _node_rag)
     g.add_node("synthesize", _node_synthesize)
     g.set_entry_point("triage")
-    g.add_conditional_edges("triage", _route_after_triage, {"crisis": "crisis", "crew": "crew"})
+    g.add_conditional_edges(
+        "triage", _route_after_triage, {"crisis": "crisis", "crew": "crew", "rag": "rag"}
+    )
     g.add_edge("crisis", END)
-    g.add_edge("crew", "rag")
-    g.add_edge("rag", "synthesize")
+    g.add_edge(["crew", "rag"], "synthesize")  # join: waits for both branches
     g.add_edge("synthesize", END)
     return g.compile()
 
@@ -184,46 +263,117 @@ def get_compiled_graph() -> Any:
     return _compiled
 
 
-def run_langgraph_pipeline(
+def _initial_state(
     user_input: str,
-    history: Optional[List[Dict[str, Any]]] = None,
-    extra_context: Optional[Dict[str, Any]] = None,
-) -> Dict[str, Any]:
-    """
-    Run the full LangGraph; returns a flat dict compatible with AgentResponse.to_dict()
-    (plus optional orchestration_meta for the API wrapper).
-    """
-    extra = dict(extra_context) if extra_context else {}
+    history: Optional[List[Dict[str, Any]]],
+    extra_context: Optional[Dict[str, Any]],
+) -> GraphState:
+    extra = with_deadline(extra_context)
     sid = str(extra.get("session_id") or "") or uuid.uuid4().hex
-    t0 = time.perf_counter()
-    initial: GraphState = {
+    return {
         "user_input": user_input,
         "history": list(history or []),
         "extra": extra,
         "session_id": sid,
-        "t0": t0,
+        "deadline": deadline_of(extra),
+        "t0": time.perf_counter(),
     }
-    g = get_compiled_graph()
-    out = g.invoke(initial)
-    result = (out or {}).get("result")
-    if not isinstance(result, dict):
-        raise RuntimeError("LangGraph returned no result")
 
-    # Post-index the exchange for the next turn (RAG for continuity; skip acuity fast-path)
+
+async def _post_index(sid: str, user_input: str, result: Dict[str, Any]) -> None:
+    """Post-index the exchange for the next turn (RAG for continuity; skip acuity fast-path)."""
     try:
         if result.get("model_used") == "guardrail_crisis":
             pass
         elif Config.RAG_ENABLED and sid and sid != "anon":
             from rag.vector_store import get_rag_index
-
+            from rag.write_behind import rag_write_behind
+
+            response = (result.get("response") or "").strip()
+            if not response:
+                return
+            if rag_write_behind.running:
+                # Batched off the request path (server lifespan started the writer)
+                rag_write_behind.submit(sid, user_input, response)
+                return
             idx = get_rag_index()
-            if idx and (result.get("response") or "").strip():
-                idx.add_turn(
-                    sid,
-                    user_input,
-                    (result.get("response") or "").strip(),
-                )
+            if idx:
+                await asyncio.to_thread(idx.add_turn, sid, user_input, response)
     except Exception as exc:  # noqa: BLE001
         logger.debug("RAG index write skipped: %s", exc)
 
+
+async def arun_langgraph_pipeline(
+    user_input: str,
+    history: Optional[List[Dict[str, Any]]] = None,
+    extra_context: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Run the full LangGraph on the caller's event loop (`ainvoke`); returns a flat dict
+    compatible with AgentResponse.to_dict() (plus optional orchestration_meta for the API wrapper).
+    """
+    initial = _initial_state(user_input, history, extra_context)
+    g = get_compiled_graph()
+    out = await g.ainvoke(initial)
+    result = (out or {}).get("result")
+    if not isinstance(result, dict):
+        raise RuntimeError("LangGraph returned no result")
+
+    await _post_index(initial["session_id"], user_input, result)
     return result
+
+
+async def astream_langgraph_pipeline(
+    user_input: str,
+    history: Optional[List[Dict[str, Any]]] = None,
+    extra_context: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming twin of `arun_langgraph_pipeline`. Walks the same nodes as the
+    compiled graph (triage -> crisis | [crew || rag] -> synthesize) so events can
+    be emitted between them: "triage" immediately, then the agent's "intent"
+    and "token" events, then {"event": "done", "result": ...}.
+    """
+    st = _initial_state(user_input, history, extra_context)
+    st.update(_node_triage(st))
+    yield {"event": "triage", "crisis_level": int(st.get("crisis_level", 0) or 0)}
+
+    if _route_after_triage(st) == "crisis":
+        result = _node_crisis(st)["result"]
+        yield {"event": "done", "result": result}
+        return
+
+    crew, rag = await asyncio.gather(_node_crew(st), _node_rag(st))
+    st.update(crew)
+    st.update(rag)
+
+    t1 = time.perf_counter()
+    chat, ex = _synthesis_agent(st)
+    raw: Optional[Dict[str, Any]] = None
+    async for event in chat.astream_from_history(
+        st.get("user_input", "") or "",
+        st.get("history") or [],
+        extra_context=ex,
+    ):
+        if event.get("event") == "done":
+            raw = event.get("result")
+        elif event.get("event") != "triage":  # already emitted above
+            yield event
+    if not raw:
+        raise RuntimeError("Empty agent stream result")
+    result = _with_synthesis_meta(st, raw, (time.perf_counter() - t1) * 1000.0)
+    result["orchestration_meta"]["streamed"] = True
+
+    await _post_index(st["session_id"], user_input, result)
+    yield {"event": "done", "result": result}
+
+
+def run_langgraph_pipeline(
+    user_input: str,
+    history: Optional[List[Dict[str, Any]]] = None,
+    extra_context: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Sync wrapper around `arun_langgraph_pipeline` for scripts and callers without a loop.
+    """
+    return asyncio.run(arun_langgraph_pipeline(user_input, history, extra_context))
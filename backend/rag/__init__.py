@@ -1,4 +1,16 @@
 """RAG layer (vector retrieval for session-aware context)."""
-from .vector_store import SessionRAGIndex, get_rag_index
+from .response_cache import PublicResponseCache, public_response_cache
+from .vector_store import RAGIndex, SessionRAGIndex, TurnRecord, get_rag_index, open_rag_index
+from .write_behind import RAGWriteBehind, rag_write_behind
 
-__all__ = ["SessionRAGIndex", "get_rag_index"]
+__all__ = [
+    "PublicResponseCache",
+    "RAGIndex",
+    "RAGWriteBehind",
+    "SessionRAGIndex",
+    "TurnRecord",
+    "get_rag_index",
+    "open_rag_index",
+    "public_response_cache",
+    "rag_write_behind",
+]
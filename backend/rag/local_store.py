@@ -0,0 +1,338 @@
+"""
+Local session RAG backend: per-session float32 vectors on memory-mapped files.
+
+Every session is its own partition, so retrieval is an exact, vectorized
+cosine scan over a few dozen rows instead of a metadata-filtered search
+through one global HNSW graph. Partitions above RAG_ANN_THRESHOLD rows switch
+to an in-memory hnswlib graph (built lazily from the mapped vectors) when
+hnswlib is installed. Same interface as `SessionRAGIndex`; select with
+RAG_BACKEND=local.
+
+Layout under RAG_LOCAL_DIR:
+    meta.json                      {"dim": D}, written once by the first writer
+    .lock                          guards creating meta.json
+    <h[:2]>/<h>/vectors.f32        row-major float32, L2-normalized, D per row
+    <h[:2]>/<h>/docs.jsonl         one {"id", "doc"} line per row (same order)
+    <h[:2]>/<h>/.lock              advisory lock taken by every writer (all workers)
+where h = sha1(session_id).
+
+Vectors are appended before their doc lines, so a doc line is only ever
+visible once its vector is on disk. Writers hold the partition's file lock,
+pick up rows other workers appended, and cut anything a crash left half
+written (a torn docs line, vector rows without a doc line) before appending,
+so row i of docs.jsonl always pairs with row i of vectors.f32. Readers pick
+up other workers' rows without the lock.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from cache import TTLCache
+from config import Config
+
+from .vector_store import TurnRecord, _batches, _join_hits
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes run a single worker
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def _local_root() -> Path:
+    p = Path(Config.RAG_LOCAL_DIR)
+    if not p.is_absolute():
+        p = Path(__file__).resolve().parent.parent / p
+    return p
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """Exclusive advisory lock on `path`, shared by every worker process (no-op without fcntl)."""
+    if fcntl is None:
+        yield
+        return
+    with path.open("a+b") as fh:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+class _Partition:
+    """One session's rows: ids/docs in memory, vectors memory-mapped from disk."""
+
+    def __init__(self, path: Path, dim: int) -> None:
+        self.path = path
+        self.dim = dim
+        self.lock = threading.Lock()
+        self.ids: List[str] = []
+        self.docs: List[str] = []
+        self.id_set: Set[str] = set()
+        self._docs_end = 0  # byte offset in docs.jsonl just past the last row read
+        self._mm: Optional[np.memmap] = None
+        self._ann: Any = None
+        self._ann_rows = 0
+        if (path / "docs.jsonl").exists():
+            with _file_lock(path / ".lock"):
+                self.sync(repair=True)
+
+    @property
+    def rows(self) -> int:
+        return len(self.ids)
+
+    def sync(self, repair: bool = False) -> None:
+        """
+        Read rows appended to docs.jsonl since the last call (by any worker).
+        With `repair` (caller holds the file lock, so no append is in flight)
+        also truncate a torn docs tail and vector rows that have no doc line.
+        """
+        docs_file = self.path / "docs.jsonl"
+        try:
+            size = docs_file.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        if size > self._docs_end:
+            with docs_file.open("rb") as fh:
+                fh.seek(self._docs_end)
+                lines = fh.read(size - self._docs_end).split(b"\n")
+            for line in lines[:-1]:  # the last piece has no newline: torn, or still being written
+                self._docs_end += len(line) + 1
+                try:
+                    row = json.loads(line)
+                    rid, doc = str(row["id"]), str(row["doc"])
+                except (ValueError, KeyError, TypeError):
+                    rid, doc = "", ""  # unreadable row: keep its slot so later rows stay aligned
+                self.ids.append(rid)
+                self.docs.append(doc)
+                if rid:
+                    self.id_set.add(rid)
+        if repair:
+            self._repair(docs_file, size)
+
+    def _repair(self, docs_file: Path, docs_size: int) -> None:
+        row_bytes = self.dim * 4
+        vec_file = self.path / "vectors.f32"
+        vec_size = vec_file.stat().st_size if vec_file.exists() else 0
+        if vec_size // row_bytes < self.rows:  # vectors lost (damaged file): drop the unpaired rows
+            keep = vec_size // row_bytes
+            logger.warning("RAG partition %s: %d doc rows without vectors dropped", self.path, self.rows - keep)
+            with docs_file.open("rb") as fh:
+                data = fh.read(self._docs_end)
+            self._docs_end = sum(len(line) + 1 for line in data.split(b"\n")[:keep])
+            del self.ids[keep:], self.docs[keep:]
+            self.id_set = {i for i in self.ids if i}
+            self._mm, self._ann, self._ann_rows = None, None, 0
+        if docs_size > self._docs_end:
+            logger.warning("RAG partition %s: torn docs.jsonl tail truncated", self.path)
+            os.truncate(docs_file, self._docs_end)
+        if vec_size > self.rows * row_bytes:
+            logger.warning("RAG partition %s: vector rows without docs truncated", self.path)
+            os.truncate(vec_file, self.rows * row_bytes)
+
+    def vectors(self) -> np.ndarray:
+        if self.rows == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        if self._mm is None or self._mm.shape[0] != self.rows:
+            self._mm = np.memmap(
+                self.path / "vectors.f32", dtype=np.float32, mode="r", shape=(self.rows, self.dim)
+            )
+        return self._mm
+
+    def append(self, ids: List[str], docs: List[str], vecs: np.ndarray) -> int:
+        """Append the rows whose id is not stored yet (by any worker); returns how many were written."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        with _file_lock(self.path / ".lock"):
+            self.sync(repair=True)
+            fresh = [j for j, i in enumerate(ids) if i not in self.id_set]
+            if not fresh:
+                return 0
+            # Vectors first: a doc line is only ever visible once its vector is on disk
+            with (self.path / "vectors.f32").open("ab") as fh:
+                fh.write(np.ascontiguousarray(vecs[fresh], dtype=np.float32).tobytes())
+            with (self.path / "docs.jsonl").open("a", encoding="utf-8") as fh:
+                for j in fresh:
+                    fh.write(json.dumps({"id": ids[j], "doc": docs[j]}) + "\n")
+            self.sync()
+        return len(fresh)
+
+    def _ann_index(self) -> Any:
+        if self.rows < Config.RAG_ANN_THRESHOLD:
+            return None
+        try:
+            import hnswlib
+        except ImportError:
+            return None
+        vecs = self.vectors()
+        if self._ann is None:
+            self._ann = hnswlib.Index(space="cosine", dim=self.dim)
+            self._ann.init_index(max_elements=max(2 * self.rows, 1024), ef_construction=100, M=16)
+            self._ann_rows = 0
+        if self._ann_rows < self.rows:
+            if self.rows > self._ann.get_max_elements():
+                self._ann.resize_index(2 * self.rows)
+            self._ann.add_items(np.asarray(vecs[self._ann_rows:]), np.arange(self._ann_rows, self.rows))
+            self._ann_rows = self.rows
+        return self._ann
+
+    def search(self, queries: np.ndarray, k: int) -> List[List[int]]:
+        """Row indices of the top-k rows per (normalized) query, best first."""
+        n = self.rows
+        if n == 0:
+            return [[] for _ in range(len(queries))]
+        k = min(k, n)
+        ann = self._ann_index()
+        if ann is not None:
+            ann.set_ef(max(50, 2 * k))
+            labels, _ = ann.knn_query(queries, k=k)
+            return [list(map(int, row)) for row in labels]
+        sims = queries @ np.asarray(self.vectors()).T
+        if k < n:
+            top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(n), (len(queries), 1))
+        order = np.take_along_axis(sims, top, axis=1).argsort(axis=1)[:, ::-1]
+        return np.take_along_axis(top, order, axis=1).tolist()
+
+
+class LocalSessionIndex:
+    """Drop-in `SessionRAGIndex` alternative with per-session mmap partitions."""
+
+    def __init__(self, root: Optional[Path] = None, batch_size: Optional[int] = None) -> None:
+        from chromadb.utils import embedding_functions
+
+        self._root = Path(root) if root else _local_root()
+        self._root.mkdir(parents=True, exist_ok=True)
+        self._batch_size = max(1, batch_size or Config.RAG_EMBED_BATCH_SIZE)
+        self._ef = embedding_functions.DefaultEmbeddingFunction()
+        self._lock = threading.Lock()
+        self._dim: Optional[int] = self._read_dim()
+        # Open partitions (ids/docs/mapped vectors/ANN graph); evicted ones reload from disk
+        self._open = TTLCache(
+            maxsize=Config.RAG_LOCAL_OPEN_PARTITIONS, ttl=3600, name="rag.local.partitions"
+        )
+
+    # ── Embedding ────────────────────────────────────────────────────────────
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        return self._embed(texts).tolist()
+
+    def _embed(self, texts: Sequence[str]) -> np.ndarray:
+        chunks = [
+            np.asarray(self._ef(list(chunk)), dtype=np.float32)
+            for chunk in _batches(list(texts), self._batch_size)
+        ]
+        if not chunks:
+            return np.zeros((0, self._dim or 0), dtype=np.float32)
+        vecs = np.vstack(chunks)
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        return vecs / np.where(norms == 0, 1.0, norms)
+
+    # ── Partitions ───────────────────────────────────────────────────────────
+
+    def _read_dim(self) -> Optional[int]:
+        try:
+            return int(json.loads((self._root / "meta.json").read_text(encoding="utf-8"))["dim"])
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError) as exc:
+            logger.warning("Unreadable %s: %s", self._root / "meta.json", exc)
+            return None
+
+    def _known_dim(self) -> Optional[int]:
+        """The store's dim, re-read from meta.json until some worker has created it."""
+        if self._dim is None:
+            with self._lock:
+                if self._dim is None:
+                    self._dim = self._read_dim()
+        return self._dim
+
+    def _partition(self, session_id: str) -> Optional[_Partition]:
+        self._known_dim()
+        with self._lock:
+            part = self._open.get(session_id)
+            if part is None and self._dim is not None:
+                h = hashlib.sha1(str(session_id).encode("utf-8")).hexdigest()
+                part = _Partition(self._root / h[:2] / h, self._dim)
+                self._open.set(session_id, part)
+            return part
+
+    def _ensure_dim(self, dim: int) -> None:
+        with self._lock:
+            if self._dim is None:
+                # Another worker may have created the store since this one started
+                with _file_lock(self._root / ".lock"):
+                    self._dim = self._read_dim()
+                    if self._dim is None:
+                        tmp = self._root / f"meta.json.{os.getpid()}"
+                        tmp.write_text(json.dumps({"dim": dim}), encoding="utf-8")
+                        os.replace(tmp, self._root / "meta.json")
+                        self._dim = dim
+            if self._dim != dim:
+                raise ValueError(f"Embedding dim {dim} does not match store dim {self._dim}")
+
+    # ── Writes ───────────────────────────────────────────────────────────────
+
+    def add_turn(self, session_id: str, user_text: str, assistant_text: str) -> None:
+        self.add_turns([TurnRecord(str(session_id), user_text, assistant_text)])
+
+    def add_turns(self, turns: Sequence[TurnRecord]) -> int:
+        """Insert turns whose id is not stored yet (re-writes of the same id are no-ops)."""
+        rows = list({t.doc_id: t for t in turns if not t.is_empty()}.values())
+        if not rows:
+            return 0
+        vecs = self._embed([t.document for t in rows])
+        self._ensure_dim(vecs.shape[1])
+        by_session: Dict[str, List[int]] = {}
+        for i, t in enumerate(rows):
+            by_session.setdefault(str(t.session_id), []).append(i)
+        written = 0
+        for sid, idxs in by_session.items():
+            part = self._partition(sid)
+            with part.lock:
+                written += part.append(
+                    [rows[i].doc_id for i in idxs],
+                    [rows[i].document for i in idxs],
+                    vecs[idxs],
+                )
+        return written
+
+    # ── Reads ────────────────────────────────────────────────────────────────
+
+    def retrieve(self, session_id: str, query: str, k: int = 3) -> str:
+        return self.retrieve_many([(session_id, query)], k=k)[0]
+
+    def retrieve_many(self, requests: Sequence[Tuple[str, str]], k: int = 3) -> List[str]:
+        out = [""] * len(requests)
+        live = [(i, str(sid), q) for i, (sid, q) in enumerate(requests) if (q or "").strip()]
+        if not live or self._known_dim() is None:
+            return out
+        try:
+            vecs = self._embed([q for _, _, q in live])
+        except Exception as exc:
+            logger.debug("RAG embed failed: %s", exc)
+            return out
+        by_session: Dict[str, List[int]] = {}
+        for j, (_, sid, _) in enumerate(live):
+            by_session.setdefault(sid, []).append(j)
+        for sid, js in by_session.items():
+            part = self._partition(sid)
+            if part is None:
+                continue
+            with part.lock:
+                part.sync()  # rows other workers appended since this partition was opened
+                hits = part.search(vecs[js], k)
+                for j, rows in zip(js, hits):
+                    out[live[j][0]] = _join_hits([part.docs[r] for r in rows])
+        return out
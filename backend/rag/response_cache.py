@@ -0,0 +1,215 @@
+"""Opt-in response cache for stateless public chat: exact + semantic (embedding) match."""
+from __future__ import annotations
+
+import asyncio
+import copy
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from cache import TTLCache, normalize_cache_key
+from config import Config
+from observability.metrics import metrics
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python scan (numpy ships with the RAG extras)
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Stamped per request: never shared between users through the cache, restamped on a hit
+_PER_REQUEST_AGENT_FIELDS = (
+    "session_id", "spans", "generated_at", "deadline_left_ms", "llm_path_ms", "graph_total_ms", "node_ms",
+)
+
+
+def _cacheable(payload: Dict[str, Any]) -> bool:
+    """Only store clean, non-crisis agent replies (never fallbacks or errors)."""
+    if not (payload.get("response") or "").strip():
+        return False
+    if payload.get("intent") in ("error", "configuration_error", "crisis"):
+        return False
+    ag = payload.get("agent") or {}
+    if int(ag.get("crisis_level", 0) or 0) > 0:
+        return False
+    if ag.get("fallback") or ag.get("error") or ag.get("model_used") in ("error", "fallback"):
+        return False
+    return True
+
+
+def _shareable(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Deep copy of `payload` without the per-request agent fields."""
+    out = copy.deepcopy(payload)
+    ag = out.get("agent")
+    if isinstance(ag, dict):
+        out["agent"] = {k: v for k, v in ag.items() if k not in _PER_REQUEST_AGENT_FIELDS}
+    return out
+
+
+class _VectorRows:
+    """
+    One preallocated float32 row per cached entry (capacity = cache size), so a
+    semantic lookup is a single matrix-vector product. Rows are written on
+    insert and freed when the cache evicts or expires the entry.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self._capacity = max(1, capacity)
+        self._lock = threading.Lock()
+        self._mat: Any = None  # (capacity, dim) float32, allocated on the first insert
+        self._live: Any = None
+        self._keys: List[Optional[str]] = [None] * self._capacity
+        self._rows: Dict[str, int] = {}
+        self._free: List[int] = list(range(self._capacity - 1, -1, -1))
+        self._plain: Dict[str, List[float]] = {}  # used instead of the matrix without numpy
+
+    def add(self, key: str, vec: List[float]) -> None:
+        with self._lock:
+            if np is None:
+                self._plain[key] = vec
+                return
+            if self._mat is None:
+                self._mat = np.zeros((self._capacity, len(vec)), dtype=np.float32)
+                self._live = np.zeros(self._capacity, dtype=bool)
+            row = self._rows.get(key)
+            if row is None:
+                if not self._free:
+                    return
+                row = self._rows[key] = self._free.pop()
+                self._keys[row] = key
+            self._mat[row] = vec
+            self._live[row] = True
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._plain.pop(key, None)
+            row = self._rows.pop(key, None)
+            if row is None:
+                return
+            self._live[row] = False
+            self._keys[row] = None
+            self._free.append(row)
+
+    def nearest(self, vec: List[float]) -> Tuple[Optional[str], float]:
+        with self._lock:
+            if np is None:
+                scored = [(sum(a * b for a, b in zip(v, vec)), k) for k, v in self._plain.items()]
+                if not scored:
+                    return None, 0.0
+                score, key = max(scored, key=lambda t: t[0])
+                return key, score
+            if self._mat is None or not self._live.any():
+                return None, 0.0
+            sims = self._mat @ np.asarray(vec, dtype=np.float32)
+            sims[~self._live] = -np.inf
+            best = int(sims.argmax())
+            return self._keys[best], float(sims[best])
+
+
+class PublicResponseCache:
+    """
+    Exact-match (normalized text) and semantic (cosine over the RAG embedding
+    model) cache of full API payloads for anonymous, history-free requests.
+
+    Any message the crisis triage flags bypasses the cache in both directions.
+    Stored payloads drop the per-request agent fields (session id, spans,
+    timings); a hit is restamped with its own. Embedding and the semantic scan
+    run in a worker thread. Metrics: public_cache.{hit_exact,hit_semantic,miss,bypass,store}.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = Config.PUBLIC_CACHE_SIZE,
+        ttl: float = Config.PUBLIC_CACHE_TTL_SECONDS,
+        similarity: float = Config.PUBLIC_CACHE_SIMILARITY,
+    ) -> None:
+        self._vectors = _VectorRows(maxsize)
+        self._entries = TTLCache(
+            maxsize=maxsize,
+            ttl=ttl,
+            name="public_cache.entries",
+            on_evict=lambda key, _payload: self._vectors.remove(key),
+        )
+        self._similarity = similarity
+
+    def _embed(self, key: str) -> Optional[List[float]]:
+        if self._similarity <= 0:
+            return None
+        from rag.vector_store import get_rag_index
+
+        idx = get_rag_index()
+        if idx is None:
+            return None
+        try:
+            vec = idx.embed([key])[0]
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("Response cache embed failed: %s", exc)
+            return None
+        norm = sum(x * x for x in vec) ** 0.5
+        return [x / norm for x in vec] if norm else None
+
+    def _semantic_lookup(self, key: str) -> Tuple[Optional[List[float]], Optional[str], float]:
+        """(embedding of `key`, nearest cached key, cosine); runs in a worker thread."""
+        vec = self._embed(key)
+        if vec is None:
+            return None, None, 0.0
+        near, score = self._vectors.nearest(vec)
+        return vec, near, score
+
+    @staticmethod
+    def _hit(payload: Dict[str, Any], kind: str, started: float) -> Dict[str, Any]:
+        out = copy.deepcopy(payload)
+        ag = out.setdefault("agent", {})
+        ag.update(
+            session_id=uuid.uuid4().hex,
+            generated_at=datetime.now(timezone.utc).isoformat(),
+            spans=[{
+                "name": "response_cache",
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                "kind": "cache",
+            }],
+            cache=kind,
+        )
+        return out
+
+    async def aget_or_compute(
+        self,
+        text: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        from agent_service import assess_crisis_text
+
+        if assess_crisis_text(text) > 0:
+            metrics.incr("public_cache.bypass")
+            return await compute()
+
+        started = time.perf_counter()
+        key = normalize_cache_key(text)
+        payload = self._entries.get(key)
+        if payload is not None:
+            metrics.incr("public_cache.hit_exact")
+            return self._hit(payload, "exact", started)
+
+        vec = None
+        if self._similarity > 0:
+            vec, near, score = await asyncio.to_thread(self._semantic_lookup, key)
+            payload = self._entries.get(near) if near is not None and score >= self._similarity else None
+            if payload is not None:
+                metrics.incr("public_cache.hit_semantic")
+                return self._hit(payload, "semantic", started)
+
+        metrics.incr("public_cache.miss")
+        result = await compute()
+        if _cacheable(result):
+            self._entries.set(key, _shareable(result))
+            if vec is not None:
+                self._vectors.add(key, vec)
+            metrics.incr("public_cache.store")
+        return result
+
+
+public_response_cache = PublicResponseCache()
@@ -1,37 +1,91 @@
-"""Chroma-backed session RAG: retrieve prior turns to ground the LLM pipeline."""
+"""Session RAG: retrieve prior turns to ground the LLM pipeline (Chroma, or the local mmap backend)."""
 from __future__ import annotations
 
 import logging
 import uuid
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Protocol, Sequence, Tuple, TypeVar
 
 from config import Config
 
 logger = logging.getLogger(__name__)
 
-_rag_index: Optional["SessionRAGIndex"] = None
+_rag_index: Optional["RAGIndex"] = None
 
+T = TypeVar("T")
 
-def get_rag_index() -> Optional["SessionRAGIndex"]:
-    """Lazily open persistent Chroma; returns None if unavailable (missing deps or disk)."""
+
+def _batches(items: Sequence[T], size: int) -> Iterator[Sequence[T]]:
+    size = max(1, size)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _join_hits(docs: Optional[Sequence[Any]]) -> str:
+    out: List[str] = [d for d in (docs or []) if d and str(d).strip()]
+    return "\n---\n".join(out) if out else ""
+
+
+class RAGIndex(Protocol):
+    """Interface shared by the Chroma and local backends."""
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]: ...
+    def add_turn(self, session_id: str, user_text: str, assistant_text: str) -> None: ...
+    def add_turns(self, turns: Sequence["TurnRecord"]) -> int: ...
+    def retrieve(self, session_id: str, query: str, k: int = 3) -> str: ...
+    def retrieve_many(self, requests: Sequence[Tuple[str, str]], k: int = 3) -> List[str]: ...
+
+
+def open_rag_index(backend: Optional[str] = None) -> "RAGIndex":
+    """New index for `backend` ("chroma" | "local"; default Config.RAG_BACKEND)."""
+    backend = (backend or Config.RAG_BACKEND).lower()
+    if backend == "local":
+        from .local_store import LocalSessionIndex
+
+        return LocalSessionIndex()
+    return SessionRAGIndex()
+
+
+def get_rag_index() -> Optional["RAGIndex"]:
+    """Lazily open the configured store; returns None if unavailable (missing deps or disk)."""
     global _rag_index
     if not Config.RAG_ENABLED:
         return None
     if _rag_index is not None:
         return _rag_index
     try:
-        _rag_index = SessionRAGIndex()
+        _rag_index = open_rag_index()
     except Exception as exc:
         logger.warning("RAG index unavailable: %s", exc)
         _rag_index = None
     return _rag_index
 
 
+@dataclass(frozen=True)
+class TurnRecord:
+    """One exchange to index; `turn_id` is fixed up front so re-writes upsert instead of duplicating."""
+    session_id: str
+    user_text: str
+    assistant_text: str
+    turn_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+
+    @property
+    def doc_id(self) -> str:
+        return f"{self.session_id}_{self.turn_id}"
+
+    @property
+    def document(self) -> str:
+        return f"User: {self.user_text}\nAssistant: {self.assistant_text}"
+
+    def is_empty(self) -> bool:
+        return not (self.user_text or "").strip() and not (self.assistant_text or "").strip()
+
+
 class SessionRAGIndex:
     """Per-session turn storage + similarity search (Chroma persistent store)."""
 
-    def __init__(self, persist_dir: Optional[Path] = None) -> None:
+    def __init__(self, persist_dir: Optional[Path] = None, batch_size: Optional[int] = None) -> None:
         import chromadb
         from chromadb.utils import embedding_functions
 
@@ -40,6 +94,8 @@ class SessionRAGIndex:
         p.mkdir(parents=True, exist_ok=True)
 
         self._client = chromadb.PersistentClient(path=str(p))
+        self._batch_size = max(1, batch_size or Config.RAG_EMBED_BATCH_SIZE)
+        # One ONNX session per process: every embed below goes through this function
         self._ef = embedding_functions.DefaultEmbeddingFunction()
         self._col = self._client.get_or_create_collection(
             name="serenova_turns",
@@ -47,36 +103,66 @@ class SessionRAGIndex:
             metadata={"hnsw:space": "cosine"},
         )
 
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """Embed with the collection's ONNX model (shared with other callers, e.g. the response cache)."""
+        out: List[List[float]] = []
+        for chunk in _batches(list(texts), self._batch_size):
+            out.extend(list(map(float, v)) for v in self._ef(list(chunk)))
+        return out
+
     def add_turn(
         self,
         session_id: str,
         user_text: str,
         assistant_text: str,
     ) -> None:
-        if not (user_text or "").strip() and not (assistant_text or "").strip():
-            return
-        doc = f"User: {user_text}\nAssistant: {assistant_text}"
-        uid = f"{session_id}_{uuid.uuid4().hex[:16]}"
-        self._col.add(
-            documents=[doc],
-            ids=[uid],
-            metadatas=[{"session_id": str(session_id)}],
-        )
+        self.add_turns([TurnRecord(str(session_id), user_text, assistant_text)])
+
+    def add_turns(self, turns: Sequence[TurnRecord]) -> int:
+        """Upsert many turns (any mix of sessions) in one collection write; returns how many."""
+        rows = list({t.doc_id: t for t in turns if not t.is_empty()}.values())
+        for chunk in _batches(rows, self._batch_size):
+            docs = [t.document for t in chunk]
+            self._col.upsert(
+                documents=docs,
+                embeddings=self.embed(docs),
+                ids=[t.doc_id for t in chunk],
+                metadatas=[{"session_id": str(t.session_id)} for t in chunk],
+            )
+        return len(rows)
 
     def retrieve(self, session_id: str, query: str, k: int = 3) -> str:
-        if not (query or "").strip():
-            return ""
+        return self.retrieve_many([(session_id, query)], k=k)[0]
+
+    def retrieve_many(self, requests: Sequence[Tuple[str, str]], k: int = 3) -> List[str]:
+        """
+        Context for many (session_id, query) pairs, in order ("" where nothing
+        matched). All queries are embedded in batches up front; Chroma is then
+        queried once per session with that session's query vectors.
+        """
+        out = [""] * len(requests)
+        live = [(i, str(sid), q) for i, (sid, q) in enumerate(requests) if (q or "").strip()]
+        if not live:
+            return out
         try:
-            res = self._col.query(
-                query_texts=[query],
-                n_results=k,
-                where={"session_id": str(session_id)},
-            )
+            vectors = self.embed([q for _, _, q in live])
         except Exception as exc:
-            logger.debug("RAG query failed: %s", exc)
-            return ""
-        docs: List[Any] = (res or {}).get("documents") or []
-        if not docs or not docs[0]:
-            return ""
-        out: List[str] = [d for d in docs[0] if d and str(d).strip()]
-        return "\n---\n".join(out) if out else ""
+            logger.debug("RAG embed failed: %s", exc)
+            return out
+        by_session: Dict[str, List[Tuple[int, List[float]]]] = {}
+        for (i, sid, _), vec in zip(live, vectors):
+            by_session.setdefault(sid, []).append((i, vec))
+        for sid, items in by_session.items():
+            try:
+                res = self._col.query(
+                    query_embeddings=[vec for _, vec in items],
+                    n_results=k,
+                    where={"session_id": sid},
+                )
+            except Exception as exc:
+                logger.debug("RAG query failed: %s", exc)
+                continue
+            docs: List[Any] = (res or {}).get("documents") or []
+            for (i, _), hits in zip(items, docs):
+                out[i] = _join_hits(hits)
+        return out
@@ -0,0 +1,273 @@
+"""
+Write-behind RAG indexing: finished turns are queued in-process and upserted
+to the session index in batches, so embedding and disk writes never sit on
+the request path.
+
+Every queued turn is first appended to a JSONL spill file; the file is
+truncated once the queue drains and replayed on the next start, so a crash
+loses nothing that was accepted. Turn ids are fixed at submit time, which
+makes replays idempotent upserts.
+
+Each worker process owns its own spill file (RAG_SPILL_PATH with the pid
+before the suffix: write_behind.<pid>.jsonl), so gunicorn workers never
+truncate each other's pending turns. On start a worker also adopts the files
+of dead pids: it renames each one to a name carrying its own pid (only one
+worker can win the rename), replays it, and deletes it once the turns are in
+its own file.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from collections import deque
+from dataclasses import asdict
+from pathlib import Path
+from typing import Deque, Iterable, List, Optional, Tuple
+
+from config import Config
+from observability.metrics import metrics
+
+from .vector_store import TurnRecord, get_rag_index
+
+logger = logging.getLogger(__name__)
+
+_MAX_ATTEMPTS = 3
+_RETRY_BACKOFF_S = 0.5
+_COMPACT_BYTES = 1 << 20  # rewrite the spill file from the live queue past this size
+
+
+def _spill_path() -> Path:
+    p = Path(Config.RAG_SPILL_PATH)
+    if not p.is_absolute():
+        p = Path(__file__).resolve().parent.parent / p
+    return p
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":  # os.kill(pid, 0) sends CTRL_C there; Windows dev servers run one worker
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class RAGWriteBehind:
+    """
+    Bounded async queue in front of `SessionRAGIndex.add_turns`.
+
+    `submit` never blocks: past `max_pending` queued turns new ones are dropped
+    (indexing is best-effort context, not the source of truth). A single worker
+    drains up to `batch_size` turns per write, lingering briefly to fill
+    batches. Failed batches are retried with backoff, then parked in the spill
+    file for the next start. Metrics: rag.write_behind.{queued,dropped,written,
+    batches,failed,replayed} and the rag.write_behind.pending gauge.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = Config.RAG_WRITE_BATCH_SIZE,
+        linger_s: float = Config.RAG_WRITE_LINGER_SECONDS,
+        max_pending: int = Config.RAG_WRITE_MAX_PENDING,
+        spill_path: Optional[Path] = None,
+    ) -> None:
+        self._batch_size = max(1, batch_size)
+        self._linger_s = max(0.0, linger_s)
+        self._max_pending = max(1, max_pending)
+        self._base_path = spill_path or _spill_path()
+        self._spill_path = self._base_path  # this worker's own file, fixed in start()
+        self._pending: Deque[TurnRecord] = deque()
+        self._attempts: dict = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._spill = None
+        self._closing = False
+        # Turns that exhausted their retries: kept in the spill file for the next start only
+        self._parked: Deque[TurnRecord] = deque(maxlen=self._max_pending)
+        metrics.register_gauge("rag.write_behind.pending", lambda: len(self._pending))
+
+    @property
+    def running(self) -> bool:
+        """True when the worker runs on the caller's event loop (the server's)."""
+        try:
+            return self._task is not None and self._loop is asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+
+    # ── Spill file ───────────────────────────────────────────────────────────
+
+    def _worker_path(self, pid: int, tag: str = "") -> Path:
+        base = self._base_path
+        return base.with_name(f"{base.stem}.{pid}{tag}{base.suffix}")
+
+    def _orphans(self) -> Iterable[Path]:
+        """Spill files whose owning pid is gone (plus a pre-per-worker unsuffixed file)."""
+        base = self._base_path
+        if base.exists():
+            yield base
+        for path in base.parent.glob(f"{base.stem}.*{base.suffix}"):
+            owner = path.name[len(base.stem) + 1:len(path.name) - len(base.suffix)].split(".")[0]
+            if owner.isdigit() and not _pid_alive(int(owner)):
+                yield path
+
+    def _claim_orphans(self) -> List[Path]:
+        """Rename dead workers' files to names carrying our pid; a lost race just skips the file."""
+        pid = os.getpid()
+        base = self._base_path
+        # Adopted by an earlier process with our (reused) pid that died before deleting them
+        claimed = list(base.parent.glob(f"{base.stem}.{pid}.adopted*{base.suffix}"))
+        n = 0
+        for path in list(self._orphans()):
+            mine = self._worker_path(pid, f".adopted{n}")
+            while mine.exists():
+                n += 1
+                mine = self._worker_path(pid, f".adopted{n}")
+            try:
+                os.rename(path, mine)
+            except OSError:
+                continue  # another worker adopted it first
+            claimed.append(mine)
+        return claimed
+
+    @staticmethod
+    def _read_spill(path: Path, into: dict) -> None:
+        with path.open("r", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    t = TurnRecord(**json.loads(line))
+                except (ValueError, TypeError):
+                    continue  # torn last line after a crash
+                into[t.doc_id] = t
+
+    def _replay(self) -> Tuple[List[TurnRecord], List[Path]]:
+        """Turns from our own file (pid reuse after a restart) and adopted ones -> (turns, adopted files)."""
+        turns: dict = {}
+        adopted = self._claim_orphans()
+        for path in (self._spill_path, *adopted):
+            if path.exists():
+                self._read_spill(path, turns)
+        return list(turns.values()), adopted
+
+    def _rewrite_spill(self) -> None:
+        if self._spill:
+            self._spill.close()
+        self._spill = self._spill_path.open("w", encoding="utf-8")
+        for t in (*self._parked, *self._pending):
+            self._spill.write(json.dumps(asdict(t)) + "\n")
+        self._spill.flush()
+
+    def _after_write(self) -> None:
+        # Drop indexed turns from the spill file: at once when the queue drains, else once it grows
+        if not self._pending or self._spill.tell() > _COMPACT_BYTES:
+            self._rewrite_spill()
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._spill_path = self._worker_path(os.getpid())
+        self._spill_path.parent.mkdir(parents=True, exist_ok=True)
+        replayed, adopted = await asyncio.to_thread(self._replay)
+        self._pending.extend(replayed)
+        self._rewrite_spill()
+        for path in adopted:  # their turns are in our own file now
+            path.unlink(missing_ok=True)
+        if replayed:
+            metrics.incr("rag.write_behind.replayed", len(replayed))
+            logger.info("Replaying %d unindexed RAG turns from %s", len(replayed), self._spill_path)
+        self._closing = False
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="rag-write-behind")
+        if self._pending:
+            self._wakeup.set()
+
+    async def stop(self) -> None:
+        """Flush everything queued (used at shutdown), then close the spill file."""
+        if self._task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        try:
+            await self._task
+        finally:
+            self._task = None
+            if self._spill:
+                self._spill.close()
+                self._spill = None
+            if not self._pending and not self._parked:
+                self._spill_path.unlink(missing_ok=True)
+
+    # ── Producer ─────────────────────────────────────────────────────────────
+
+    def submit(self, session_id: str, user_text: str, assistant_text: str) -> bool:
+        """Queue one turn for indexing; False if it was dropped (empty, full, or stopped)."""
+        turn = TurnRecord(str(session_id), user_text or "", assistant_text or "")
+        if turn.is_empty() or self._task is None or self._closing:
+            return False
+        if len(self._pending) >= self._max_pending:
+            metrics.incr("rag.write_behind.dropped")
+            return False
+        self._spill.write(json.dumps(asdict(turn)) + "\n")
+        self._spill.flush()
+        self._pending.append(turn)
+        metrics.incr("rag.write_behind.queued")
+        self._wakeup.set()
+        return True
+
+    # ── Worker ───────────────────────────────────────────────────────────────
+
+    async def _run(self) -> None:
+        while True:
+            if not self._pending:
+                if self._closing:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if len(self._pending) < self._batch_size and not self._closing and self._linger_s:
+                await asyncio.sleep(self._linger_s)
+            n = min(self._batch_size, len(self._pending))
+            batch = [self._pending.popleft() for _ in range(n)]
+            await self._write(batch)
+
+    async def _write(self, batch: List[TurnRecord]) -> None:
+        try:
+            idx = await asyncio.to_thread(get_rag_index)
+            if idx is None:
+                raise RuntimeError("RAG index unavailable")
+            written = await asyncio.to_thread(idx.add_turns, batch)
+        except Exception as exc:  # noqa: BLE001
+            metrics.incr("rag.write_behind.failed")
+            retry = []
+            for t in batch:
+                self._attempts[t.doc_id] = self._attempts.get(t.doc_id, 0) + 1
+                if self._attempts[t.doc_id] < _MAX_ATTEMPTS:
+                    retry.append(t)
+                else:
+                    self._attempts.pop(t.doc_id, None)
+                    self._parked.append(t)
+            logger.warning(
+                "RAG write-behind batch of %d failed (%s); %d will retry", len(batch), exc, len(retry)
+            )
+            self._pending.extendleft(reversed(retry))
+            if not self._closing:
+                await asyncio.sleep(_RETRY_BACKOFF_S)
+            return
+        for t in batch:
+            self._attempts.pop(t.doc_id, None)
+        metrics.incr("rag.write_behind.written", written)
+        metrics.incr("rag.write_behind.batches")
+        self._after_write()
+
+
+rag_write_behind = RAGWriteBehind()
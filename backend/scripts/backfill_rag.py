@@ -0,0 +1,96 @@
+"""
+Backfill the session RAG store (RAG_BACKEND: Chroma or local) from the Mongo `messages` collection.
+
+Streams messages in _id order, CHUNK at a time, and bulk-upserts each chunk
+with batched embeddings. Turn ids are the message _ids, so re-running (or
+resuming with --after) never duplicates backfilled turns. Turns indexed live
+by the API carry their own ids: restrict with --until to the time live
+indexing started to avoid indexing those twice.
+
+Run from backend/:  python scripts/backfill_rag.py [--chunk 500] [--session ID]
+                    [--since 2024-01-01] [--until 2024-06-01] [--after OBJECTID] [--dry-run]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+# Ensure backend root is on path
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+
+def _parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--chunk", type=int, default=500, help="messages read and indexed per round")
+    ap.add_argument("--session", help="only this session id")
+    ap.add_argument("--since", type=datetime.fromisoformat, help="created_at >= (ISO date)")
+    ap.add_argument("--until", type=datetime.fromisoformat, help="created_at < (ISO date)")
+    ap.add_argument("--after", help="resume after this message _id (printed as progress)")
+    ap.add_argument("--dry-run", action="store_true", help="count only; write nothing")
+    return ap.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+
+    from bson import ObjectId
+
+    from database import db
+    from rag.vector_store import TurnRecord, open_rag_index
+
+    query: dict = {}
+    if args.session:
+        query["session_id"] = args.session
+    if args.since or args.until:
+        query["created_at"] = {}
+        if args.since:
+            query["created_at"]["$gte"] = args.since
+        if args.until:
+            query["created_at"]["$lt"] = args.until
+    if args.after:
+        query["_id"] = {"$gt": ObjectId(args.after)}
+
+    messages = db.get_collection("messages")
+    idx = None if args.dry_run else open_rag_index()
+    cursor = (
+        messages.find(query, {"session_id": 1, "message": 1, "response": 1})
+        .sort("_id", 1)
+        .batch_size(args.chunk)
+    )
+
+    seen = indexed = 0
+    started = time.perf_counter()
+    chunk = []
+    last_id = None
+
+    def flush() -> None:
+        nonlocal indexed
+        if idx is not None and chunk:
+            indexed += idx.add_turns(chunk)
+        rate = seen / max(time.perf_counter() - started, 1e-6)
+        print(f"{seen} messages read, {indexed} turns indexed ({rate:.0f}/s), last _id {last_id}")
+        chunk.clear()
+
+    for m in cursor:
+        seen += 1
+        last_id = m["_id"]
+        chunk.append(
+            TurnRecord(
+                session_id=str(m.get("session_id", "")),
+                user_text=m.get("message", "") or "",
+                assistant_text=m.get("response", "") or "",
+                turn_id=str(m["_id"]),
+            )
+        )
+        if len(chunk) >= args.chunk:
+            flush()
+    flush()
+
+
+if __name__ == "__main__":
+    main()
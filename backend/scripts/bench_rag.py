@@ -0,0 +1,111 @@
+"""
+Benchmark the session RAG backends (Chroma vs local mmap) on a synthetic corpus.
+
+Both backends embed with the same ONNX model, so ingest and query timings
+include identical embedding work; the difference is the store / search.
+Each backend writes to its own temporary directory (deleted afterwards).
+
+Run from backend/:  python scripts/bench_rag.py [--sessions 200] [--turns 40]
+                    [--queries 200] [--k 3] [--backends chroma,local]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# Ensure backend root is on path
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+_TOPICS = [
+    "anxious before exams", "cannot sleep at night", "argued with my partner",
+    "miss my grandmother", "stressed about work deadlines", "feel lonely on weekends",
+    "panic in crowded places", "low energy every morning", "worried about money",
+    "proud I went for a run",
+]
+
+
+def _corpus(sessions: int, turns: int, seed: int):
+    from rag.vector_store import TurnRecord
+
+    rnd = random.Random(seed)
+    for s in range(sessions):
+        for t in range(turns):
+            topic = rnd.choice(_TOPICS)
+            yield TurnRecord(
+                session_id=f"bench{s}",
+                user_text=f"Turn {t}: I {topic}, day {rnd.randint(1, 30)}",
+                assistant_text=f"That sounds hard. Let's look at {topic} together.",
+                turn_id=f"{t}",
+            )
+
+
+def _open(backend: str, path: str):
+    if backend == "local":
+        from rag.local_store import LocalSessionIndex
+
+        return LocalSessionIndex(root=path)
+    from rag.vector_store import SessionRAGIndex
+
+    return SessionRAGIndex(persist_dir=path)
+
+
+def _pct(xs, p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p * len(xs)))]
+
+
+def bench(backend: str, args: argparse.Namespace) -> None:
+    rows = list(_corpus(args.sessions, args.turns, args.seed))
+    rnd = random.Random(args.seed + 1)
+    queries = [(f"bench{rnd.randrange(args.sessions)}", rnd.choice(_TOPICS)) for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory(prefix=f"bench_rag_{backend}_") as tmp:
+        idx = _open(backend, tmp)
+        t0 = time.perf_counter()
+        for i in range(0, len(rows), 500):
+            idx.add_turns(rows[i:i + 500])
+        ingest_s = time.perf_counter() - t0
+
+        idx.retrieve(*queries[0], k=args.k)  # warm caches / lazy structures
+        lat = []
+        for sid, q in queries:
+            t = time.perf_counter()
+            idx.retrieve(sid, q, k=args.k)
+            lat.append((time.perf_counter() - t) * 1000.0)
+
+        t = time.perf_counter()
+        idx.retrieve_many(queries, k=args.k)
+        many_ms = (time.perf_counter() - t) * 1000.0
+
+    print(
+        f"{backend:>7}: ingest {len(rows)} turns in {ingest_s:.1f}s ({len(rows) / ingest_s:.0f}/s) | "
+        f"retrieve p50 {statistics.median(lat):.2f}ms p95 {_pct(lat, 0.95):.2f}ms | "
+        f"retrieve_many({len(queries)}) {many_ms:.1f}ms"
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark session RAG backends")
+    ap.add_argument("--sessions", type=int, default=200)
+    ap.add_argument("--turns", type=int, default=40, help="turns per session")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--backends", default="chroma,local")
+    args = ap.parse_args()
+    for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        try:
+            bench(backend, args)
+        except ImportError as e:
+            print(f"{backend:>7}: skipped (missing dependency: {e})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""Shared pytest setup: backend modules are imported as top-level packages (as the server does)."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,27 @@
+import agent_service
+from agent_service import SessionAgentRegistry
+
+
+def test_sessionless_calls_do_not_reconfigure_the_client(monkeypatch):
+    calls = []
+    monkeypatch.setattr(agent_service.genai, "configure", lambda **kw: calls.append(kw))
+    monkeypatch.setattr(agent_service.Config, "GEMINI_API_KEY", "key-1")
+    monkeypatch.setattr(agent_service, "_configured_key", agent_service._UNCONFIGURED)
+    registry = SessionAgentRegistry(maxsize=4, ttl=60)
+
+    first, second = registry.get(None), registry.get(None)
+    assert first is not second  # no conversation state shared between sessionless callers
+    registry.get("s1")
+    assert calls == [{"api_key": "key-1"}]
+
+    monkeypatch.setattr(agent_service.Config, "GEMINI_API_KEY", "key-2")
+    registry.get(None)
+    assert calls[-1] == {"api_key": "key-2"}
+
+
+def test_sessions_are_cached_and_discarded():
+    registry = SessionAgentRegistry(maxsize=4, ttl=60)
+    svc = registry.get("s1")
+    assert registry.get("s1") is svc
+    registry.discard("s1")
+    assert registry.get("s1") is not svc
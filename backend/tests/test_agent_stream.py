@@ -0,0 +1,48 @@
+import asyncio
+import sys
+import types
+
+import agent_service
+from agent_service import AgenticChatService
+
+
+class _LegacyAgent:
+    async def astream_from_history(self, user_input, history, extra_context):
+        yield {"event": "triage", "crisis_level": 0}
+        yield {"event": "intent", "intent": "general"}
+        yield {"event": "token", "text": "hello"}
+        yield {"event": "done", "result": {"response": "hello"}}
+
+
+def _stream_with_failing_graph(monkeypatch, sent_before_failure):
+    async def astream_langgraph_pipeline(user_input, history, extra_context):
+        for event in sent_before_failure:
+            yield event
+        raise RuntimeError("graph node failed")
+
+    module = types.ModuleType("orchestration.orchestrator_service")
+    module.astream_langgraph_pipeline = astream_langgraph_pipeline
+    monkeypatch.setitem(sys.modules, "orchestration.orchestrator_service", module)
+    monkeypatch.setattr(agent_service.Config, "ORCHESTRATION_MODE", "langgraph")
+    monkeypatch.setattr(agent_service.session_agents, "for_context", lambda ctx: _LegacyAgent())
+
+    async def passthrough(result, user_input, deadline=None):
+        return result
+
+    monkeypatch.setattr(agent_service, "aapply_degraded_gemini_fallback", passthrough)
+
+    async def collect():
+        return [e async for e in AgenticChatService().astream_agent_response("hi", [], {})]
+
+    return asyncio.run(collect())
+
+
+def test_fallback_does_not_repeat_triage(monkeypatch):
+    events = _stream_with_failing_graph(monkeypatch, [{"event": "triage", "crisis_level": 0}])
+    assert [e["event"] for e in events] == ["triage", "intent", "token", "done"]
+    assert events[-1]["response"] == "hello"
+
+
+def test_fallback_sends_everything_when_the_graph_failed_first(monkeypatch):
+    events = _stream_with_failing_graph(monkeypatch, [])
+    assert [e["event"] for e in events] == ["triage", "intent", "token", "done"]
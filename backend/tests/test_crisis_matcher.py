@@ -0,0 +1,78 @@
+import pytest
+
+from agent_service import _CRISIS_LEVEL_KEYWORDS, CrisisLevel, assess_crisis_text, scan_crisis_text
+from crisis_matcher import CrisisMatcher
+
+
+def _substring_level(text: str) -> int:
+    """The pre-automaton rule: highest level whose keyword occurs anywhere in the lowercased text."""
+    lower = text.lower()
+    for level in sorted(CrisisLevel, reverse=True):
+        if level != CrisisLevel.NONE and any(kw in lower for kw in _CRISIS_LEVEL_KEYWORDS[level]):
+            return int(level)
+    return 0
+
+
+BASELINE_CAUGHT = [
+    "I self harmed last night",
+    "I have been self-harmed again",
+    "I keep self-harming",
+    "thinking about suicides",
+    "I feel hopelessly stuck",
+    "so much hopelessness",
+    "I keep disappearing from everyone",
+    "I just want to disappear",
+    "feeling worthless lately",
+    "the worthlessness is crushing",
+    "I'm going to kill myself tonight",
+    "I want to end my life",
+    "i want to die",
+    "I'm trapped",
+    "I can't go on like this",
+    "I plan to take them all",
+    "nobody cares about me",
+    "I'm writing my final note",
+]
+
+
+@pytest.mark.parametrize("text", BASELINE_CAUGHT)
+def test_keeps_every_level_the_substring_scan_found(text):
+    assert _substring_level(text) > 0
+    assert assess_crisis_text(text) == _substring_level(text)
+
+
+@pytest.mark.parametrize(
+    "text, level",
+    [
+        ("I self harmed last night", CrisisLevel.MODERATE),
+        ("thinking about suicides", CrisisLevel.HIGH),
+        ("I feel hopelessly stuck", CrisisLevel.LOW),
+        ("I have a gun and I'm saying goodbye", CrisisLevel.IMMINENT),
+        ("Had a nice walk today", CrisisLevel.NONE),
+    ],
+)
+def test_levels(text, level):
+    assert assess_crisis_text(text) == int(level)
+
+
+def test_normalizes_case_punctuation_and_apostrophes():
+    assert assess_crisis_text("SELF—HARM") == int(CrisisLevel.MODERATE)
+    assert assess_crisis_text("I can’t   go on") == int(CrisisLevel.MODERATE)
+
+
+def test_match_starts_on_a_word_boundary():
+    matcher = CrisisMatcher({2: ["harm"]})
+    assert matcher.level("the pharmacy is closed") == 0
+    assert matcher.level("harmed") == 2
+
+
+def test_span_covers_the_inflected_word():
+    text = "Lately I self-harmed twice"
+    scan = scan_crisis_text(text)
+    assert scan.level == int(CrisisLevel.MODERATE)
+    assert any(text[m.start:m.end] == "self-harmed" for m in scan.matches)
+
+
+def test_unspaced_scripts_match_as_substrings():
+    matcher = CrisisMatcher({3: ["自杀"]})
+    assert matcher.level("我想自杀了") == 3
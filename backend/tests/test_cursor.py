@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+bson = pytest.importorskip("bson")
+
+from utils import decode_cursor, encode_cursor, keyset_after  # noqa: E402
+
+_OPS = {"$lt": lambda a, b: a < b, "$gt": lambda a, b: a > b}
+
+
+def _matches(doc, clause):
+    """Evaluate the {"$or": [...]} fragment from keyset_after against one document."""
+    def ok(cond):
+        for field, want in cond.items():
+            if isinstance(want, dict):
+                (op, val), = want.items()
+                if not _OPS[op](doc[field], val):
+                    return False
+            elif doc[field] != want:
+                return False
+        return True
+
+    return any(ok(c) for c in clause["$or"])
+
+
+def _page(docs, cursor, limit):
+    """What the newest-first listing returns for one page: (docs, next_cursor)."""
+    rows = sorted(docs, key=lambda d: (d["last_updated"], d["_id"]), reverse=True)
+    if cursor:
+        rows = [d for d in rows if _matches(d, keyset_after("last_updated", decode_cursor(cursor)))]
+    page = rows[:limit]
+    more = len(rows) > limit
+    return page, encode_cursor(page[-1]["last_updated"], page[-1]["_id"]) if more else None
+
+
+def test_round_trip():
+    ts, oid = datetime(2025, 5, 1, 12, 30, 15, 123000), bson.ObjectId()
+    assert decode_cursor(encode_cursor(ts, oid)) == (ts, oid)
+    assert "=" not in encode_cursor(ts, oid)
+
+
+@pytest.mark.parametrize("bad", ["", "not-a-cursor", "e30", encode_cursor(datetime(2025, 1, 1), "x")])
+def test_malformed_cursor_decodes_to_none(bad):
+    assert decode_cursor(bad) is None
+
+
+def test_pages_cover_every_document_once_across_timestamp_ties():
+    t0 = datetime(2025, 1, 1)
+    # Groups of three documents share a timestamp, so page boundaries fall inside ties
+    docs = [{"_id": bson.ObjectId(), "last_updated": t0 + timedelta(minutes=i // 3)} for i in range(10)]
+    seen, cursor = [], None
+    for _ in range(10):
+        page, cursor = _page(docs, cursor, limit=4)
+        seen.extend(d["_id"] for d in page)
+        if cursor is None:
+            break
+    assert sorted(seen) == sorted(d["_id"] for d in docs)
+    assert len(seen) == len(set(seen))
+
+
+def test_keyset_after_direction():
+    ts, oid = datetime(2025, 1, 1), bson.ObjectId()
+    assert keyset_after("created_at", (ts, oid)) == {
+        "$or": [{"created_at": {"$lt": ts}}, {"created_at": ts, "_id": {"$lt": oid}}]
+    }
+    assert "$gt" in keyset_after("created_at", (ts, oid), direction=1)["$or"][0]["created_at"]
@@ -0,0 +1,54 @@
+import pytest
+
+import deadline as deadline_module
+from config import Config
+from deadline import Deadline, deadline_of, output_token_cap, with_deadline
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(deadline_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_timeout_keeps_the_reserve_and_respects_the_cap(clock):
+    d = Deadline(10)
+    clock[0] += 4
+    assert d.remaining() == pytest.approx(6)
+    assert d.timeout(reserve=2) == pytest.approx(4)
+    assert d.timeout(cap=3, reserve=2) == pytest.approx(3)
+    assert d.timeout(reserve=8) == 0.0
+
+
+def test_optional_budget_skips_below_the_minimum_stage_time(clock, monkeypatch):
+    monkeypatch.setattr(Config, "DEADLINE_MIN_STAGE_SECONDS", 1.5)
+    d = Deadline(10)
+    assert d.optional_budget(reserve=8) == pytest.approx(2)
+    clock[0] += 1
+    assert d.optional_budget(reserve=8) == 0.0  # 1s left after the reserve: skip the stage
+    assert d.optional_budget(cap=1.0) == 0.0    # a cap under the minimum also skips
+    clock[0] += 20
+    assert d.expired() and d.optional_budget() == 0.0
+
+
+def test_with_deadline_keeps_an_existing_one():
+    d = Deadline(5)
+    extra = {"session_id": "s", "deadline": d}
+    assert deadline_of(with_deadline(extra)) is d
+    fresh = with_deadline(None, budget_s=3)
+    assert deadline_of(fresh).budget_s == 3
+    assert deadline_of({"deadline": "soon"}) is None
+
+
+def test_output_token_cap_shrinks_with_the_time_left(clock, monkeypatch):
+    monkeypatch.setattr(Config, "DEADLINE_FULL_OUTPUT_SECONDS", 8)
+    monkeypatch.setattr(Config, "DEADLINE_MAX_OUTPUT_TOKENS", 1024)
+    monkeypatch.setattr(Config, "DEADLINE_MIN_OUTPUT_TOKENS", 128)
+    d = Deadline(10)
+    assert output_token_cap(None) is None
+    assert output_token_cap(d) is None
+    clock[0] += 6
+    assert output_token_cap(d) == 512
+    clock[0] += 3.9
+    assert output_token_cap(d) == 128
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from llm.hedging import HedgeBudget, Hedger, LatencyTracker
+from observability.metrics import metrics
+
+
+def _hedger(max_ratio=1.0, burst=5):
+    h = Hedger(percentile=95, min_delay_s=0.0, max_ratio=max_ratio, window=200, min_samples=3)
+    h._budget = HedgeBudget(max_ratio, burst)
+    # Enough history that a few slow calls in one test don't move the p95 delay
+    for _ in range(50):
+        h.latency.record("response", 0.02)
+    return h
+
+
+async def _reply(label, delay, log, fail=False):
+    try:
+        await asyncio.sleep(delay)
+    except asyncio.CancelledError:
+        log.append(f"{label} cancelled")
+        raise
+    if fail:
+        raise RuntimeError(f"{label} failed")
+    return label
+
+
+def _counts():
+    return {k: metrics.counter(f"llm.hedge.{k}") for k in ("fired", "won", "lost", "throttled")}
+
+
+def _delta(before):
+    return {k: v - before[k] for k, v in _counts().items()}
+
+
+def test_no_hedge_until_there_is_latency_history():
+    h = Hedger(percentile=95, min_delay_s=0.0, max_ratio=1.0, window=20, min_samples=3)
+    assert h.delay("response") is None
+
+
+def test_hedge_wins_and_slow_primary_is_cancelled():
+    h, log, before = _hedger(), [], _counts()
+
+    async def run():
+        return await h.run(
+            "response",
+            lambda: _reply("primary", 1.0, log),
+            lambda waited: _reply("hedge", 0.01, log),
+        )
+
+    assert asyncio.run(run()) == "hedge"
+    assert log == ["primary cancelled"]
+    assert _delta(before) == {"fired": 1, "won": 1, "lost": 0, "throttled": 0}
+
+
+def test_primary_still_wins_and_hedge_is_cancelled():
+    h, log, before = _hedger(), [], _counts()
+
+    async def run():
+        return await h.run(
+            "response",
+            lambda: _reply("primary", 0.06, log),
+            lambda waited: _reply("hedge", 1.0, log),
+        )
+
+    assert asyncio.run(run()) == "primary"
+    assert log == ["hedge cancelled"]
+    assert _delta(before) == {"fired": 1, "won": 0, "lost": 1, "throttled": 0}
+
+
+def test_failed_hedge_falls_back_to_the_primary():
+    h, log = _hedger(), []
+
+    async def run():
+        return await h.run(
+            "response",
+            lambda: _reply("primary", 0.08, log),
+            lambda waited: _reply("hedge", 0.0, log, fail=True),
+        )
+
+    assert asyncio.run(run()) == "primary"
+
+
+def test_both_failing_raises_the_primary_error():
+    h, log = _hedger(), []
+
+    async def run():
+        return await h.run(
+            "response",
+            lambda: _reply("primary", 0.05, log, fail=True),
+            lambda waited: _reply("hedge", 0.0, log, fail=True),
+        )
+
+    with pytest.raises(RuntimeError, match="primary failed"):
+        asyncio.run(run())
+
+
+def test_budget_throttles_hedges():
+    h, log, before = _hedger(max_ratio=0.0, burst=1), [], _counts()
+    fired = []
+
+    async def run():
+        for _ in range(3):
+            await h.run(
+                "response",
+                lambda: _reply("primary", 0.1, log),
+                lambda waited: fired.append(waited) or _reply("hedge", 1.0, log),
+            )
+
+    asyncio.run(run())
+    assert len(fired) == 1  # the single burst token; no ratio to earn more
+    assert _delta(before)["throttled"] == 2
+
+
+def test_latency_percentile_is_nearest_rank():
+    t = LatencyTracker(window=100, min_samples=1)
+    for ms in range(1, 101):
+        t.record("s", ms / 1000)
+    assert t.percentile("s", 95) == pytest.approx(0.095)
+    assert t.percentile("s", 50) == pytest.approx(0.05)
@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+import pytest
+
+from config import Config
+from llm import client as client_module
+from llm.client import LLMClient
+from llm.resilience import (
+    BreakerBoard,
+    CircuitBreaker,
+    CircuitOpenError,
+    ErrorKind,
+    LLMUnavailableError,
+    RetryPolicy,
+    classify_error,
+)
+
+
+class _Status(Exception):
+    def __init__(self, code):
+        super().__init__(f"status {code}")
+        self.code = code
+
+
+@pytest.mark.parametrize(
+    "exc, kind",
+    [
+        (asyncio.TimeoutError(), ErrorKind.RETRY),
+        (_Status(429), ErrorKind.RETRY),
+        (_Status(503), ErrorKind.RETRY),
+        (_Status(400), ErrorKind.FATAL),
+        (_Status(404), ErrorKind.NEXT_MODEL),
+        (CircuitOpenError("open"), ErrorKind.NEXT_MODEL),
+        (RuntimeError("model is overloaded"), ErrorKind.RETRY),
+        (ValueError("bad prompt"), ErrorKind.FATAL),
+    ],
+)
+def test_classify_error(exc, kind):
+    assert classify_error(exc) is kind
+
+
+def test_backoff_is_full_jitter_under_the_cap():
+    policy = RetryPolicy(max_attempts=5, base_s=1.0, max_backoff_s=3.0, budget_s=10.0)
+    for attempt in range(1, 6):
+        cap = min(3.0, 2 ** (attempt - 1))
+        assert all(0.0 <= policy.backoff(attempt) <= cap for _ in range(50))
+
+
+def test_breaker_opens_half_opens_and_closes(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker("t-model-a", failure_threshold=2, reset_s=30)
+
+    breaker.record_failure()
+    breaker.before_call()  # still closed after one failure
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    now[0] += 30
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()  # the single probe
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()  # failed probe reopens at once
+    assert breaker.state == CircuitBreaker.OPEN
+
+    now[0] += 30
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_board_counts_only_transient_failures():
+    board = BreakerBoard(failure_threshold=1, reset_s=30)
+    board.record("t-model-b", _Status(400))  # request rejected: the model answered
+    board.record("t-model-b", _Status(404))  # missing model: left to the registry
+    assert board.allows("t-model-b")
+    board.record("t-model-b", _Status(503))
+    assert not board.allows("t-model-b")
+
+
+class _SlowModel:
+    def __init__(self, name):
+        self.model_name = f"models/{name}"
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        await asyncio.sleep(1)
+
+
+@pytest.mark.parametrize("deadline_bound, opens", [(True, False), (False, True)])
+def test_only_timeouts_not_cut_by_a_deadline_count_against_the_breaker(monkeypatch, deadline_bound, opens):
+    board = BreakerBoard(failure_threshold=1, reset_s=30)
+    monkeypatch.setattr(client_module, "breakers", board)
+    name = f"t-slow-{opens}"
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await LLMClient().generate(
+                "intent", _SlowModel(name), "hi", timeout=0.01, deadline_bound=deadline_bound
+            )
+
+    asyncio.run(run())
+    assert board.allows(name) is not opens
+
+
+def test_retry_budget_cuts_count_even_for_deadline_bound_calls(monkeypatch):
+    """The caller's 5s timeout never fires: the 0.05s retry budget cuts the attempt, so it counts."""
+    board = BreakerBoard(failure_threshold=1, reset_s=30)
+    monkeypatch.setattr(client_module, "breakers", board)
+    monkeypatch.setattr(Config, "LLM_HEDGE_ENABLED", False)
+    client = LLMClient()
+    model = _SlowModel("t-hung")
+    monkeypatch.setattr(client, "resolve", lambda preferred=None: ("t-hung", model))
+    policy = RetryPolicy(max_attempts=1, base_s=0.0, max_backoff_s=0.0, budget_s=0.05)
+
+    async def run():
+        with pytest.raises(LLMUnavailableError):
+            await client.generate_resilient(
+                "response", "hi", timeout=5.0, deadline_bound=True, policy=policy
+            )
+
+    asyncio.run(run())
+    assert not board.allows("t-hung")
@@ -0,0 +1,106 @@
+import sys
+import types
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from rag.local_store import LocalSessionIndex, _Partition  # noqa: E402
+
+DIM = 4
+
+
+def _vecs(*rows):
+    out = np.zeros((len(rows), DIM), dtype=np.float32)
+    for i, r in enumerate(rows):
+        out[i, r % DIM] = 1.0
+    return out
+
+
+def _nearest(part, row):
+    return part.docs[part.search(_vecs(row), 1)[0][0]]
+
+
+def test_append_and_reopen(tmp_path):
+    part = _Partition(tmp_path, DIM)
+    assert part.append(["a", "b"], ["doc a", "doc b"], _vecs(0, 1)) == 2
+    assert part.append(["b", "c"], ["doc b", "doc c"], _vecs(1, 2)) == 1  # "b" is already stored
+
+    reopened = _Partition(tmp_path, DIM)
+    assert reopened.ids == ["a", "b", "c"]
+    assert [_nearest(reopened, r) for r in (0, 1, 2)] == ["doc a", "doc b", "doc c"]
+
+
+def test_reopen_after_torn_write_keeps_rows_aligned(tmp_path):
+    part = _Partition(tmp_path, DIM)
+    part.append(["a"], ["doc a"], _vecs(0))
+    # Crash mid-append: the vector made it to disk, its doc line only half way
+    with (tmp_path / "vectors.f32").open("ab") as fh:
+        fh.write(_vecs(3).tobytes())
+    with (tmp_path / "docs.jsonl").open("a", encoding="utf-8") as fh:
+        fh.write('{"id": "x", "do')
+
+    reopened = _Partition(tmp_path, DIM)
+    assert reopened.ids == ["a"]
+    assert (tmp_path / "vectors.f32").stat().st_size == DIM * 4
+    assert (tmp_path / "docs.jsonl").read_text(encoding="utf-8").endswith("\n")
+
+    reopened.append(["b"], ["doc b"], _vecs(1))
+    again = _Partition(tmp_path, DIM)
+    assert again.ids == ["a", "b"]
+    assert [_nearest(again, r) for r in (0, 1)] == ["doc a", "doc b"]
+
+
+def test_unreadable_line_keeps_its_slot(tmp_path):
+    part = _Partition(tmp_path, DIM)
+    part.append(["a"], ["doc a"], _vecs(0))
+    with (tmp_path / "vectors.f32").open("ab") as fh:
+        fh.write(_vecs(1).tobytes())
+    with (tmp_path / "docs.jsonl").open("a", encoding="utf-8") as fh:
+        fh.write("not json\n")
+    part.append(["c"], ["doc c"], _vecs(2))
+
+    reopened = _Partition(tmp_path, DIM)
+    assert reopened.ids == ["a", "", "c"]
+    assert _nearest(reopened, 2) == "doc c"
+
+
+def test_sees_rows_appended_by_another_worker(tmp_path):
+    mine = _Partition(tmp_path, DIM)
+    mine.append(["a"], ["doc a"], _vecs(0))
+    other = _Partition(tmp_path, DIM)
+    other.append(["b"], ["doc b"], _vecs(1))
+
+    assert mine.append(["b", "c"], ["doc b", "doc c"], _vecs(1, 2)) == 1
+    assert mine.ids == ["a", "b", "c"]
+    assert _nearest(mine, 2) == "doc c"
+
+
+class _WordEmbedding:
+    """One-hot bag of words over a tiny vocabulary, standing in for chromadb's model."""
+
+    VOCAB = ("sleep", "exam", "family", "work")
+
+    def __call__(self, texts):
+        return [[float(w in t.lower()) + 1e-3 for w in self.VOCAB] for t in texts]
+
+
+@pytest.fixture
+def index_factory(tmp_path, monkeypatch):
+    utils = types.ModuleType("chromadb.utils")
+    utils.embedding_functions = types.SimpleNamespace(DefaultEmbeddingFunction=_WordEmbedding)
+    monkeypatch.setitem(sys.modules, "chromadb", types.ModuleType("chromadb"))
+    monkeypatch.setitem(sys.modules, "chromadb.utils", utils)
+    return lambda: LocalSessionIndex(root=tmp_path)
+
+
+def test_worker_started_before_the_store_existed_reads_other_workers_rows(index_factory):
+    early = index_factory()  # no meta.json yet: dim unknown
+    assert early.retrieve("s1", "sleep") == ""
+
+    writer = index_factory()
+    writer.add_turn("s1", "I can't sleep", "Try a wind-down routine.")
+    writer.add_turn("s1", "My exam is tomorrow", "Let's plan your revision.")
+
+    assert "wind-down" in early.retrieve("s1", "how do I sleep better")
+    assert "revision" in early.retrieve("s1", "exam nerves")
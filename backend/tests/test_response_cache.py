@@ -0,0 +1,78 @@
+import asyncio
+
+from rag.response_cache import PublicResponseCache
+
+_VECS = {
+    "how do i sleep better": [1.0, 0.0, 0.0],
+    "tips to sleep better": [0.99, 0.141, 0.0],
+    "what is mindfulness": [0.0, 0.0, 1.0],
+}
+
+
+def _payload(session_id):
+    return {
+        "intent": "sleep",
+        "response": "Try a steady bedtime.",
+        "confidence": 0.9,
+        "agent": {
+            "session_id": session_id,
+            "spans": [{"name": "response", "duration_ms": 812.0, "span_id": "abc123"}],
+            "generated_at": "2025-01-01T00:00:00+00:00",
+            "graph_total_ms": 900.0,
+            "crisis_level": 0,
+            "model_used": "gemini-2.5-flash",
+        },
+    }
+
+
+def _cache(**kw):
+    cache = PublicResponseCache(maxsize=kw.pop("maxsize", 8), ttl=60, similarity=0.95)
+    cache._embed = lambda key: _VECS.get(key)
+    return cache
+
+
+def _ask(cache, text, calls):
+    async def compute():
+        calls.append(text)
+        return _payload(f"user-{len(calls)}")
+
+    return asyncio.run(cache.aget_or_compute(text, compute))
+
+
+def test_hits_do_not_leak_the_first_requests_fields():
+    cache, calls = _cache(), []
+    first = _ask(cache, "How do I sleep better?", calls)
+    assert first["agent"]["session_id"] == "user-1"
+
+    for text, kind in (("how do I sleep better", "exact"), ("Tips to sleep better", "semantic")):
+        hit = _ask(cache, text, calls)
+        ag = hit["agent"]
+        assert ag["cache"] == kind
+        assert ag["session_id"] and ag["session_id"] != "user-1"
+        assert [s["name"] for s in ag["spans"]] == ["response_cache"]
+        assert "graph_total_ms" not in ag
+        assert ag["model_used"] == "gemini-2.5-flash"
+        assert hit["response"] == first["response"]
+    assert calls == ["How do I sleep better?"]
+
+
+def test_dissimilar_question_misses():
+    cache, calls = _cache(), []
+    _ask(cache, "How do I sleep better?", calls)
+    _ask(cache, "What is mindfulness?", calls)
+    assert len(calls) == 2
+
+
+def test_evicted_entries_free_their_vector_rows():
+    cache, calls = _cache(maxsize=1), []
+    _ask(cache, "How do I sleep better?", calls)
+    _ask(cache, "What is mindfulness?", calls)  # evicts the sleep entry
+    _ask(cache, "Tips to sleep better", calls)
+    assert len(calls) == 3
+
+
+def test_crisis_text_bypasses_the_cache():
+    cache, calls = _cache(), []
+    _ask(cache, "I want to end my life", calls)
+    _ask(cache, "I want to end my life", calls)
+    assert len(calls) == 2
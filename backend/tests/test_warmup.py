@@ -0,0 +1,48 @@
+import asyncio
+
+import warmup
+from config import Config
+from warmup import WarmupState
+
+
+def _run(monkeypatch, components, max_wait):
+    monkeypatch.setattr(warmup, "_COMPONENTS", components)
+    monkeypatch.setattr(warmup, "_RETRY_INTERVAL_S", 0.01)
+    monkeypatch.setattr(Config, "WARMUP_COMPONENTS", [name for name, _, _ in components])
+    monkeypatch.setattr(Config, "WARMUP_MAX_WAIT_SECONDS", max_wait)
+    state = WarmupState()
+    asyncio.run(state.run())
+    return state
+
+
+def test_ready_once_every_component_succeeds(monkeypatch):
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RuntimeError("db not up yet")
+
+    async def fine():
+        pass
+
+    state = _run(monkeypatch, [("db", flaky, lambda: True), ("rag", fine, lambda: True)], max_wait=5)
+    assert state.ready and not state.degraded
+    assert state.components["db"] == {**state.components["db"], "ok": True, "attempts": 3}
+
+
+def test_permanent_failure_is_ready_but_degraded_after_the_wait(monkeypatch):
+    async def broken():
+        raise RuntimeError("no API key")
+
+    state = _run(monkeypatch, [("crew", broken, lambda: True)], max_wait=0.05)
+    body = state.to_dict()
+    assert body["ready"] and body["degraded"]
+    assert body["components"]["crew"]["ok"] is False
+    assert body["components"]["crew"]["attempts"] > 1
+
+
+def test_graph_probe_is_not_crisis_text():
+    from agent_service import assess_crisis_text
+
+    assert assess_crisis_text(warmup._GRAPH_PROBE) == 0
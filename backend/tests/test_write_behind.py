@@ -0,0 +1,89 @@
+import asyncio
+import json
+import os
+from dataclasses import asdict
+
+import pytest
+
+from rag import write_behind
+from rag.vector_store import TurnRecord
+from rag.write_behind import RAGWriteBehind
+
+
+class _Index:
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+        self.turns = {}
+
+    def add_turns(self, turns):
+        if self.fail:
+            raise RuntimeError("index down")
+        fresh = [t for t in turns if t.doc_id not in self.turns]
+        self.turns.update((t.doc_id, t) for t in turns)
+        return len(fresh)
+
+
+@pytest.fixture
+def index(monkeypatch):
+    idx = _Index()
+    monkeypatch.setattr(write_behind, "get_rag_index", lambda: idx)
+    monkeypatch.setattr(write_behind, "_RETRY_BACKOFF_S", 0)
+    return idx
+
+
+def _writer(tmp_path):
+    return RAGWriteBehind(batch_size=8, linger_s=0, max_pending=100, spill_path=tmp_path / "wb.jsonl")
+
+
+def _spill(path, *turns):
+    path.write_text("".join(json.dumps(asdict(t)) + "\n" for t in turns), encoding="utf-8")
+
+
+def test_flushes_queued_turns_and_removes_its_spill_file(tmp_path, index):
+    async def run():
+        wb = _writer(tmp_path)
+        await wb.start()
+        assert wb.submit("s1", "hi", "hello")
+        assert wb.submit("s1", "how are you", "fine")
+        await wb.stop()
+
+    asyncio.run(run())
+    assert len(index.turns) == 2
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_failed_turns_stay_in_the_workers_own_spill_file(tmp_path, index):
+    index.fail = True
+
+    async def run():
+        wb = _writer(tmp_path)
+        await wb.start()
+        wb.submit("s1", "hi", "hello")
+        await wb.stop()
+
+    asyncio.run(run())
+    own = tmp_path / f"wb.{os.getpid()}.jsonl"
+    assert [p.name for p in tmp_path.iterdir()] == [own.name]
+    assert "hello" in own.read_text(encoding="utf-8")
+
+
+def test_replays_dead_workers_files_but_not_live_ones(tmp_path, index, monkeypatch):
+    dead, live = 999_991, 999_992
+    monkeypatch.setattr(write_behind, "_pid_alive", lambda pid: pid in (live, os.getpid()))
+    a = TurnRecord("s1", "from the dead worker", "ok")
+    b = TurnRecord("s2", "from the live worker", "ok")
+    c = TurnRecord("s3", "from the old single spill file", "ok")
+    _spill(tmp_path / f"wb.{dead}.jsonl", a)
+    _spill(tmp_path / f"wb.{live}.jsonl", b)
+    _spill(tmp_path / "wb.jsonl", c)
+    with (tmp_path / f"wb.{dead}.jsonl").open("a") as fh:
+        fh.write('{"session_id": "s9", "us')  # torn tail
+
+    async def run():
+        wb = _writer(tmp_path)
+        await wb.start()
+        await wb.stop()
+
+    asyncio.run(run())
+    assert set(index.turns) == {a.doc_id, c.doc_id}
+    assert [p.name for p in tmp_path.iterdir()] == [f"wb.{live}.jsonl"]
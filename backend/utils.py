@@ -1,6 +1,9 @@
 """Utility functions for the backend."""
+import base64
+import json
+from datetime import datetime
 from bson import ObjectId
-from typing import Optional
+from typing import Optional, Tuple
 
 
 def object_id_to_str(obj_id) -> str:
@@ -31,3 +34,53 @@ def str_to_object_id(id_str: str) -> Optional[ObjectId]:
     except Exception:
         return None
 
+
+
+def encode_cursor(ts: datetime, obj_id) -> str:
+    """Encode a keyset pagination position as an opaque URL-safe token.
+    
+    Args:
+        ts: Sort key of the last returned document (e.g. last_updated)
+        obj_id: _id of the last returned document (tiebreaker)
+        
+    Returns:
+        Cursor string for the next page
+    """
+    raw = json.dumps({"t": ts.isoformat(), "id": object_id_to_str(obj_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[datetime, ObjectId]]:
+    """Decode a cursor from `encode_cursor`.
+    
+    Args:
+        cursor: Opaque cursor string
+        
+    Returns:
+        (timestamp, ObjectId) tuple, or None if the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        obj_id = str_to_object_id(data["id"])
+        if obj_id is None:
+            return None
+        return datetime.fromisoformat(data["t"]), obj_id
+    except Exception:
+        return None
+
+
+def keyset_after(field: str, position: Tuple[datetime, ObjectId], direction: int = -1) -> dict:
+    """Filter for documents strictly after `position` in a (field, _id) sort.
+    
+    Args:
+        field: Timestamp field the listing is sorted by
+        position: Decoded cursor (timestamp, _id)
+        direction: Sort direction of the listing (-1 = newest first)
+        
+    Returns:
+        Query fragment to merge into the listing filter
+    """
+    op = "$lt" if direction < 0 else "$gt"
+    ts, obj_id = position
+    return {"$or": [{field: {op: ts}}, {field: ts, "_id": {op: obj_id}}]}
@@ -0,0 +1,134 @@
+"""
+Startup warm-up: pay one-time initialization before traffic instead of on the first chat request.
+
+Run from the FastAPI lifespan as a background task; GET /ready reports 503
+until it finishes. Each component is timed independently (warmup.<name>.ms
+and warmup.<name>.ok gauges). Failed components are retried every few
+seconds; once WARMUP_MAX_WAIT_SECONDS has passed the worker reports ready
+anyway, flagged "degraded" (warmup.failed gauge, error log), since requests
+degrade gracefully without an optional component (no API key, missing
+dependency) and a permanent failure must not keep the worker out of rotation.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from config import Config
+from observability.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Ordinary (non-crisis) text, so the probe takes the slow cold path: crew + rag branches, then synthesize
+_GRAPH_PROBE = "warm-up probe: what helps me relax before bed?"
+_RETRY_INTERVAL_S = 5.0
+
+
+async def _warm_db() -> None:
+    from database import db
+
+    await db.aping()
+
+
+async def _warm_rag() -> None:
+    from rag.vector_store import get_rag_index
+
+    idx = await asyncio.to_thread(get_rag_index)
+    if idx is None:
+        raise RuntimeError("RAG index unavailable")
+    # Loads the ONNX embedding session
+    await asyncio.to_thread(idx.embed, ["warm-up"])
+
+
+async def _warm_graph() -> None:
+    from orchestration.orchestrator_service import _initial_state, get_compiled_graph
+
+    g = await asyncio.to_thread(get_compiled_graph)
+    # Invoke the compiled graph directly: no RAG post-indexing of the probe. No session id:
+    # the probe gets a throwaway agent instead of an entry in the session registry
+    out = await g.ainvoke(_initial_state(_GRAPH_PROBE, [], {}))
+    if not isinstance((out or {}).get("result"), dict):
+        raise RuntimeError("graph returned no result")
+
+
+async def _warm_crew() -> None:
+    from orchestration.crew_assessment import get_crew_factory
+
+    if await asyncio.to_thread(get_crew_factory) is None:
+        raise RuntimeError("Crew disabled or unavailable")
+
+
+_COMPONENTS: List[Tuple[str, Callable[[], Awaitable[None]], Callable[[], bool]]] = [
+    ("db", _warm_db, lambda: True),
+    ("rag", _warm_rag, lambda: Config.RAG_ENABLED),
+    ("graph", _warm_graph, lambda: True),
+    ("crew", _warm_crew, lambda: Config.CREW_ENABLED),
+]
+
+
+class WarmupState:
+    """Readiness flag plus per-component timings, as served by GET /ready."""
+
+    def __init__(self) -> None:
+        self.ready = not Config.WARMUP_ENABLED
+        self.degraded = False
+        self.started_at: float = 0.0
+        self.total_ms: float = 0.0
+        self.components: Dict[str, Dict[str, Any]] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "degraded": self.degraded,
+            "total_ms": round(self.total_ms, 1),
+            "components": self.components,
+        }
+
+    async def _run_one(self, name: str, fn: Callable[[], Awaitable[None]]) -> bool:
+        t0 = time.perf_counter()
+        attempts = self.components.get(name, {}).get("attempts", 0) + 1
+        entry: Dict[str, Any] = {"ok": True, "attempts": attempts}
+        try:
+            await asyncio.wait_for(fn(), timeout=Config.WARMUP_TIMEOUT_SECONDS)
+        except Exception as exc:  # noqa: BLE001
+            entry.update(ok=False, error=str(exc) or type(exc).__name__)
+            logger.warning("Warm-up of %s failed (attempt %d): %s", name, attempts, entry["error"])
+        entry["ms"] = round((time.perf_counter() - t0) * 1000.0, 1)
+        metrics.set_gauge(f"warmup.{name}.ms", entry["ms"])
+        metrics.set_gauge(f"warmup.{name}.ok", 1.0 if entry["ok"] else 0.0)
+        self.components[name] = entry
+        return entry["ok"]
+
+    async def run(self) -> None:
+        """
+        Warm every enabled component concurrently, retrying failures until
+        WARMUP_MAX_WAIT_SECONDS, then flip `ready` (degraded if any still fail).
+        """
+        self.started_at = time.perf_counter()
+        wanted = set(Config.WARMUP_COMPONENTS)
+        pending = [(name, fn) for name, fn, enabled in _COMPONENTS if name in wanted and enabled()]
+        while pending:
+            ok = await asyncio.gather(*(self._run_one(name, fn) for name, fn in pending))
+            pending = [job for job, done in zip(pending, ok) if not done]
+            waited = time.perf_counter() - self.started_at
+            if not pending or waited + _RETRY_INTERVAL_S > Config.WARMUP_MAX_WAIT_SECONDS:
+                break
+            await asyncio.sleep(_RETRY_INTERVAL_S)
+        self.total_ms = (time.perf_counter() - self.started_at) * 1000.0
+        failed = [name for name, _ in pending]
+        self.degraded = bool(failed)
+        metrics.set_gauge("warmup.total.ms", round(self.total_ms, 1))
+        metrics.set_gauge("warmup.failed", len(failed))
+        if failed:
+            logger.error(
+                "Warm-up gave up after %.0f ms; serving without: %s (%s)",
+                self.total_ms, ", ".join(failed), self.components,
+            )
+        else:
+            logger.info("Warm-up finished in %.0f ms: %s", self.total_ms, self.components)
+        self.ready = True
+
+
+warmup_state = WarmupState()
@@ -34,6 +34,20 @@ const handleResponse = async (response) => {
   return await response.json();
 };
 
+// Helper function to read one page of a cursor-paginated listing.
+// The page holds its items and a `next_cursor` for the next (older) page,
+// or null on the last one; pass it back to load more on demand.
+const fetchPage = async (path, cursor = null) => {
+  const url = cursor
+    ? `${API_BASE_URL}${path}?cursor=${encodeURIComponent(cursor)}`
+    : `${API_BASE_URL}${path}`;
+  const response = await fetch(url, {
+    method: 'GET',
+    headers: getAuthHeaders(),
+  });
+  return await handleResponse(response);
+};
+
 // Test backend connection
 export const testConnection = async () => {
   try {
@@ -224,15 +238,10 @@ export const chatAPI = {
     }
   },
 
-  // Get chat sessions
-  getSessions: async () => {
+  // Get one page of chat sessions, newest first
+  getSessions: async (cursor = null) => {
     try {
-      const response = await fetch(`${API_BASE_URL}/chat/sessions`, {
-        method: 'GET',
-        headers: getAuthHeaders(),
-      });
-      
-      return await handleResponse(response);
+      return await fetchPage('/chat/sessions', cursor);
     } catch (error) {
       console.error('Get sessions error:', error);
       throw error;
@@ -255,15 +264,10 @@ export const chatAPI = {
     }
   },
 
-  // Get messages for a session
-  getSessionMessages: async (sessionId) => {
+  // Get one page of a session's messages (chronological; next_cursor pages back)
+  getSessionMessages: async (sessionId, cursor = null) => {
     try {
-      const response = await fetch(`${API_BASE_URL}/chat/sessions/${sessionId}/messages`, {
-        method: 'GET',
-        headers: getAuthHeaders(),
-      });
-      
-      return await handleResponse(response);
+      return await fetchPage(`/chat/sessions/${sessionId}/messages`, cursor);
     } catch (error) {
       console.error('Get session messages error:', error);
       throw error;
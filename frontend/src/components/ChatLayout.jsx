@@ -29,13 +29,52 @@ const ChatLayout = () => {
   const [contextMenu, setContextMenu] = useState({ visible: false, x: 0, y: 0, chatId: null });
   const [showSettings, setShowSettings] = useState(false);
   const [showProfile, setShowProfile] = useState(false);
+  // Cursors for the next (older) page of sessions / messages; null when there is none
+  const [sessionsCursor, setSessionsCursor] = useState(null);
+  const [messagesCursor, setMessagesCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const messageEndRef = useRef(null);
   const inputRef = useRef(null);
+  const activeSessionRef = useRef(null);
+  const keepScrollRef = useRef(false);
   
-  // Auto-scroll to bottom when messages change
+  // Auto-scroll to bottom when messages change (not when older ones are prepended)
   useEffect(() => {
+    if (keepScrollRef.current) {
+      keepScrollRef.current = false;
+      return;
+    }
     messageEndRef.current?.scrollIntoView({ behavior: 'smooth' });
   }, [conversation]);
+
+  useEffect(() => {
+    activeSessionRef.current = currentSessionId;
+  }, [currentSessionId]);
+
+  // Transform database messages (which have 'message' and 'response') into conversation format
+  const toConversation = (messages) => {
+    const conversationMessages = [];
+    messages.forEach((msg, idx) => {
+      // Add user message
+      if (msg.message) {
+        conversationMessages.push({
+          id: `user-${msg.id || idx}-${Date.now()}`,
+          text: msg.message,
+          isUser: true
+        });
+      }
+      // Add AI response
+      if (msg.response) {
+        conversationMessages.push({
+          id: `bot-${msg.id || idx}-${Date.now()}`,
+          text: msg.response,
+          isUser: false,
+          intent: msg.intent || null
+        });
+      }
+    });
+    return conversationMessages;
+  };
   
   // Initialize user and sessions on component mount
   useEffect(() => {
@@ -54,6 +93,7 @@ const ChatLayout = () => {
         // Load existing sessions
         const sessionsData = await chatAPI.getSessions();
         const sessionsList = sessionsData.sessions || [];
+        setSessionsCursor(sessionsData.next_cursor || null);
         
         // Mark the first session as active or create a new one
         if (sessionsList.length > 0) {
@@ -88,6 +128,7 @@ const ChatLayout = () => {
     try {
       const messagesData = await chatAPI.getSessionMessages(sessionId);
       const messages = messagesData.messages || [];
+      setMessagesCursor(messagesData.next_cursor || null);
       
       if (messages.length === 0) {
         // If no messages, start with greeting
@@ -95,37 +136,57 @@ const ChatLayout = () => {
           { id: `greeting-${Date.now()}`, text: "Hi there! How can I help you today?", isUser: false, intent: "greeting" }
         ]);
       } else {
-        // Transform database messages (which have 'message' and 'response') into conversation format
-        const conversationMessages = [];
-        messages.forEach((msg, idx) => {
-          // Add user message
-          if (msg.message) {
-            conversationMessages.push({
-              id: `user-${msg.id || idx}-${Date.now()}`,
-              text: msg.message,
-              isUser: true
-            });
-          }
-          // Add AI response
-          if (msg.response) {
-            conversationMessages.push({
-              id: `bot-${msg.id || idx}-${Date.now()}`,
-              text: msg.response,
-              isUser: false,
-              intent: msg.intent || null
-            });
-          }
-        });
-        setConversation(conversationMessages);
+        setConversation(toConversation(messages));
       }
     } catch (error) {
       console.error('Failed to load session messages:', error);
+      setMessagesCursor(null);
       setConversation([
         { id: `greeting-error-${Date.now()}`, text: "Hi there! How can I help you today?", isUser: false, intent: "greeting" }
       ]);
     }
   };
 
+  // Load the next page of older messages above the current ones
+  const loadOlderMessages = async () => {
+    if (!messagesCursor || isLoadingMore) return;
+    const sessionId = currentSessionId;
+    setIsLoadingMore(true);
+    try {
+      const messagesData = await chatAPI.getSessionMessages(sessionId, messagesCursor);
+      // Ignore the page if the user switched sessions meanwhile
+      if (activeSessionRef.current !== sessionId) return;
+      setMessagesCursor(messagesData.next_cursor || null);
+      keepScrollRef.current = true;
+      setConversation(prev => [...toConversation(messagesData.messages || []), ...prev]);
+    } catch (error) {
+      console.error('Failed to load older messages:', error);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
+  // Load the next page of older sessions below the current ones
+  const loadMoreSessions = async () => {
+    if (!sessionsCursor || isLoadingMore) return;
+    setIsLoadingMore(true);
+    try {
+      const sessionsData = await chatAPI.getSessions(sessionsCursor);
+      setSessionsCursor(sessionsData.next_cursor || null);
+      setConversations(prev => {
+        const known = new Set(prev.map(c => c.id));
+        const older = (sessionsData.sessions || [])
+          .filter(session => !known.has(session.id))
+          .map(session => ({ ...session, active: false }));
+        return [...prev, ...older];
+      });
+    } catch (error) {
+      console.error('Failed to load more sessions:', error);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   // Create a new chat session
   const createNewSession = async () => {
     try {
@@ -142,6 +203,7 @@ const ChatLayout = () => {
       ]);
       
       setCurrentSessionId(newSession.session.id);
+      setMessagesCursor(null);
       setHasUpdatedTitle(false); // Reset flag for new session
       setConversation([
         { id: `greeting-new-session-${Date.now()}`, text: "Hi there! How can I help you today?", isUser: false, intent: "greeting" }
@@ -384,6 +446,16 @@ const ChatLayout = () => {
               </button>
             ))}
           </div>
+          {sessionsCursor && (
+            <button
+              type="button"
+              onClick={loadMoreSessions}
+              disabled={isLoadingMore}
+              className="mt-2 w-full rounded-xl p-2 text-xs text-zinc-500 transition hover:bg-white/[0.05] hover:text-zinc-300 disabled:opacity-50"
+            >
+              {isLoadingMore ? 'Loading…' : 'Load older sessions'}
+            </button>
+          )}
           
           {/* Context Menu */}
           {contextMenu.visible && (
@@ -439,6 +511,18 @@ const ChatLayout = () => {
             
             {/* Messages container */}
             <div className="flex-1 space-y-4 overflow-y-auto p-5 sm:p-6">
+              {messagesCursor && (
+                <div className="flex justify-center">
+                  <button
+                    type="button"
+                    onClick={loadOlderMessages}
+                    disabled={isLoadingMore}
+                    className="rounded-full border border-white/10 bg-white/[0.04] px-3 py-1 text-xs text-zinc-400 transition hover:bg-white/[0.08] hover:text-zinc-200 disabled:opacity-50"
+                  >
+                    {isLoadingMore ? 'Loading…' : 'Load earlier messages'}
+                  </button>
+                </div>
+              )}
               {conversation.map((entry, index) => (
                 <div
                   key={entry.id || `msg-${index}-${entry.text?.substring(0, 10)}-${entry.isUser}`}